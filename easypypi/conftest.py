@@ -0,0 +1,78 @@
+# pytest fixtures for running easypypi tests headless and in parallel
+import keyring
+import pytest
+
+from easypypi.easypypi import Package
+from easypypi.testing import MemoryKeyring
+from easypypi.testing import ScriptedUI
+
+# Template for new packages' tests, not a test for easypypi itself:
+collect_ignore = ["test_template.py"]
+
+
+@pytest.fixture
+def ui(monkeypatch):
+    """ Scripted popups;  Add responses with ui.responses.extend([...]) """
+    scripted_ui = ScriptedUI()
+    monkeypatch.setattr(Package, "ui", scripted_ui)
+    return scripted_ui
+
+
+@pytest.fixture
+def memory_keyring():
+    """ Swaps the real keyring for one which only exists during the test """
+    original = keyring.get_keyring()
+    backend = MemoryKeyring()
+    keyring.set_keyring(backend)
+    yield backend
+    keyring.set_keyring(original)
+
+
+@pytest.fixture
+def headless(ui, memory_keyring, tmp_path, monkeypatch):
+    """
+    Scripted popups, in-memory keyring, and a new config file and working
+    folder for each test.
+    """
+    monkeypatch.setattr(
+        Package, "config_filepath", tmp_path / "easyPyPI" / "config.json"
+    )
+    monkeypatch.setattr(Package, "main_window", None)
+    monkeypatch.chdir(tmp_path)
+    return ui
+
+
+@pytest.fixture
+def create_package(headless, tmp_path):
+    """
+    Makes new packages in tmp_path with their essential files, e.g.
+    create_package("test") or create_package("test", "Apache License 2.0")
+    """
+
+    def create(name, license_name="MIT License"):
+        headless.responses.append(str(tmp_path))
+        package = Package(name, _break=True)
+        package.author = "Test User"
+        package.email = "testuser@example.com"
+        package.description = "A test package"
+        package.Github_username = "testuser"
+        package.license_name_github = license_name
+        package.create_essential_files()
+        return package
+
+    return create
+
+
+@pytest.fixture
+def package(create_package):
+    """ A package called "test" with everything needed to build it """
+    package = create_package("test")
+    package.url = "https://github.com/testuser/test"
+    package.keywords = "test"
+    package.requirements = "cleverdict"
+    package.classifiers = "License :: OSI Approved :: MIT License"
+    package.update_license_names()
+    package.create_license()
+    package.update_script_lines()
+    package.create_metadata_file()
+    return package
@@ -0,0 +1,177 @@
+"""
+Finds every package managed by easyPyPI (i.e. with a setup.py or
+pyproject.toml starting with the "Auto-generated by easyPyPI" header) under
+a root folder such as a monorepo:
+
+python -m easypypi.discovery path/to/root
+
+Folders are scanned and files read in parallel.  Results are kept in a JSON
+index so later scans only re-read files which have been changed or added:
+
+{filepath: {"mtime_ns", "size", "managed", "name", "version", "requirements"}}
+"""
+
+from .logger import logger
+from .pyproject import PYPROJECT_FILENAME
+from .pyproject import read_pyproject_fields
+from .shared_functions import create_file
+from .shared_functions import read_setup_fields
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import click
+import json
+import os
+
+MANAGED_HEADER = "# Auto-generated by easyPyPI"
+METADATA_FILENAMES = ["setup.py", PYPROJECT_FILENAME]
+DEFAULT_INDEX_FILEPATH = Path(click.get_app_dir("easyPyPI")) / "package_index.json"
+
+# Folders which can be large but never contain packages' metadata files:
+SKIP_DIRNAMES = ["build", "dist", "node_modules", "venv", "__pycache__"]
+
+
+def is_skipped(dirname):
+    """ Returns: True for hidden folders, build output and environments """
+    return (
+        dirname.startswith(".")
+        or dirname in SKIP_DIRNAMES
+        or dirname.endswith(".egg-info")
+    )
+
+
+def walk_for_metadata_files(dirpath):
+    """ Returns: list of setup.py and pyproject.toml files in dirpath and below """
+    filepaths = []
+    for dirpath, dirnames, filenames in os.walk(dirpath):
+        dirnames[:] = [x for x in dirnames if not is_skipped(x)]
+        filepaths += [Path(dirpath) / x for x in filenames if x in METADATA_FILENAMES]
+    return filepaths
+
+
+def find_metadata_files(root, max_workers=None):
+    """
+    Walks each of root's subfolders in parallel.
+    Returns: sorted list of setup.py and pyproject.toml files
+    """
+    root = Path(root)
+    filepaths = [root / x for x in METADATA_FILENAMES if (root / x).is_file()]
+    dirpaths = [x for x in root.iterdir() if x.is_dir() and not is_skipped(x.name)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for results in executor.map(walk_for_metadata_files, dirpaths):
+            filepaths += results
+    return sorted(filepaths)
+
+
+def read_managed_metadata(filepath):
+    """
+    Reads name, version and requirements, but only reads beyond the first
+    line if it's the easyPyPI header.  For setup.py, stops reading at the
+    first function definition since the metadata lines all come before it.
+
+    Returns: dictionary of values, or None if not managed by easyPyPI
+    """
+    filepath = Path(filepath)
+    try:
+        with open(filepath, "r") as file:
+            if not file.readline().startswith(MANAGED_HEADER):
+                return None
+            if filepath.name == PYPROJECT_FILENAME:
+                values = read_pyproject_fields(filepath)
+            else:
+                lines = []
+                for line in file:
+                    if line.startswith("def "):
+                        break
+                    lines.append(line)
+                values = read_setup_fields(lines)
+    except Exception as error:  # e.g. UnicodeDecodeError, SyntaxError
+        logger.warning("\n ⚠  Unable to read %s:\n  %s", filepath, error)
+        return None
+    return {x: values.get(x) for x in ["name", "version", "requirements"]}
+
+
+def discover_packages(root, index_filepath=None, max_workers=None):
+    """
+    Finds packages managed by easyPyPI under root, only reading files which
+    have changed since the last scan (if index_filepath is given).
+
+    If a folder has both setup.py and pyproject.toml, pyproject.toml is used
+    (like Package.load_defaults).
+
+    Returns: list of {"name", "version", "requirements", "path", "mtime_ns"}
+    sorted by path
+    """
+    root = Path(root).resolve()
+    cached = {}
+    if index_filepath and Path(index_filepath).is_file():
+        with open(index_filepath, "r") as file:
+            cached = json.load(file)
+    entries, stale = {}, []
+    for filepath in find_metadata_files(root, max_workers):
+        stat = filepath.stat()
+        signature = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        entry = cached.get(str(filepath), {})
+        if all(entry.get(key) == value for key, value in signature.items()):
+            entries[str(filepath)] = entry
+        else:
+            stale.append((filepath, signature))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(read_managed_metadata, [x[0] for x in stale])
+        for (filepath, signature), values in zip(stale, results):
+            entries[str(filepath)] = {
+                **signature,
+                "managed": values is not None,
+                **(values or {}),
+            }
+    if index_filepath:
+        # Keep entries from other roots, but forget files no longer found:
+        index = {x: y for x, y in cached.items() if root not in Path(x).parents}
+        index.update(entries)
+        if index != cached:
+            Path(index_filepath).parent.mkdir(parents=True, exist_ok=True)
+            create_file(index_filepath, json.dumps(index, indent=4), overwrite=True)
+    packages = {}
+    for filepath, entry in sorted(entries.items()):
+        if not entry["managed"]:
+            continue
+        dirpath = Path(filepath).parent
+        if dirpath in packages and Path(filepath).name != PYPROJECT_FILENAME:
+            continue
+        packages[dirpath] = {
+            "name": entry["name"],
+            "version": entry["version"],
+            "requirements": entry["requirements"],
+            "path": filepath,
+            "mtime_ns": entry["mtime_ns"],
+        }
+    return sorted(packages.values(), key=lambda x: x["path"])
+
+
+def format_discovery_report(packages):
+    """ Returns: packages from discover_packages as a text table """
+    lines = [f"{'Name':<30} {'Version':<12} Path"]
+    for package in packages:
+        name, version = package["name"] or "?", package["version"] or "?"
+        lines.append(f"{name:<30} {version:<12} {package['path']}")
+    lines.append(f"{len(packages)} packages found")
+    return "\n".join(lines)
+
+
+@click.command()
+@click.argument("root", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "--index",
+    "index_filepath",
+    type=click.Path(dir_okay=False),
+    default=str(DEFAULT_INDEX_FILEPATH),
+    show_default=True,
+    help="JSON file to keep the index of packages in.",
+)
+def main(root, index_filepath):
+    """ Lists packages managed by easyPyPI under ROOT """
+    packages = discover_packages(root, index_filepath)
+    logger.info("\n%s", format_discovery_report(packages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Dry runs of publishing: the local stages (loading metadata, validating it,
+rendering files, and building a .tar.gz) are run and timed in a temporary
+copy of the package folder, so nothing is changed or uploaded.
+
+Upload times are estimated from the sizes of the files built, assuming
+UPLOAD_BYTES_PER_SECOND plus UPLOAD_OVERHEAD_SECONDS per file.
+"""
+
+from .pyproject import build_sdist
+from .validation import validate_metadata
+from pathlib import Path
+import shutil
+import tempfile
+import time
+
+# A modest home broadband upload speed (8 Mbit/s):
+UPLOAD_BYTES_PER_SECOND = 1000000
+# Per file: connecting, authenticating, and the repository checking the file:
+UPLOAD_OVERHEAD_SECONDS = 2.0
+
+# Not needed to build a .tar.gz, so not worth copying:
+COPY_IGNORE = shutil.ignore_patterns(
+    ".*", "build", "dist", "venv", "__pycache__", "*.egg-info", "* - old.*"
+)
+
+
+def estimate_upload_seconds(sizes, bytes_per_second=UPLOAD_BYTES_PER_SECOND):
+    """ Returns: estimated seconds to upload files of sizes (in bytes) """
+    return sum(x / bytes_per_second + UPLOAD_OVERHEAD_SECONDS for x in sizes)
+
+
+def dry_run_directory(
+    setup_dirpath, load, render=None, bytes_per_second=UPLOAD_BYTES_PER_SECOND
+):
+    """
+    Runs and times the local stages of publishing the package in setup_dirpath.
+
+    load : function returning metadata values (Package or dictionary)
+    render : function(dirpath) writing generated files (e.g. setup.py) into a
+             temporary copy of setup_dirpath before it's built
+
+    Returns: {"name", "version", "problems", "stages": {stage: seconds},
+              "artifacts": {filename: bytes}, "local_seconds", "upload_seconds"}
+    """
+    stages = {}
+
+    def run_stage(stage, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        stages[stage] = time.perf_counter() - start
+        return result
+
+    values = run_stage("load", load)
+    problems = run_stage("validate", validate_metadata, values)
+    with tempfile.TemporaryDirectory() as temp_dirpath:
+        build_dirpath = Path(temp_dirpath) / Path(setup_dirpath).name
+        run_stage(
+            "copy", shutil.copytree, setup_dirpath, build_dirpath, ignore=COPY_IGNORE
+        )
+        if render:
+            run_stage("render", render, build_dirpath)
+        sdist_filepath = run_stage("build", build_sdist, build_dirpath)
+        artifacts = {}
+        if sdist_filepath:
+            artifacts[sdist_filepath.name] = sdist_filepath.stat().st_size
+    return {
+        "name": values.get("name"),
+        "version": values.get("version"),
+        "problems": problems,
+        "stages": stages,
+        "artifacts": artifacts,
+        "local_seconds": sum(stages.values()),
+        "upload_seconds": estimate_upload_seconds(artifacts.values(), bytes_per_second),
+    }
+
+
+def format_dry_run_report(reports):
+    """ Returns: reports from dry_run_directory as a text table with totals """
+    lines = [
+        f"{'Name':<25} {'Version':<10} {'Load':>7} {'Validate':>9} {'Render':>7} "
+        f"{'Build':>7} {'Bytes':>10} {'Upload':>8} Problems"
+    ]
+    for report in reports:
+        stages = report["stages"]
+        columns = [
+            f"{stages.get(x, 0):>{width}.3f}"
+            for x, width in [("load", 7), ("validate", 9), ("render", 7)]
+        ]
+        columns.append(f"{stages.get('copy', 0) + stages.get('build', 0):>7.3f}")
+        built = sum(report["artifacts"].values()) if report["artifacts"] else "FAILED"
+        lines.append(
+            f"{report['name'] or '?':<25} {report['version'] or '?':<10} "
+            f"{' '.join(columns)} {built:>10} {report['upload_seconds']:>8.1f} "
+            f"{sum(len(x) for x in report['problems'].values())}"
+        )
+    total_bytes = sum(sum(x["artifacts"].values()) for x in reports)
+    lines.append(
+        f"{len(reports)} package(s): {sum(x['local_seconds'] for x in reports):.3f}s "
+        f"local, {total_bytes} bytes, "
+        f"~{sum(x['upload_seconds'] for x in reports):.1f}s to upload one at a time"
+    )
+    return "\n".join(lines)
@@ -1,17 +1,72 @@
 from .classifiers import CLASSIFIER_LIST
-from .licenses import LICENSE_NAMES
+from .dryrun import UPLOAD_BYTES_PER_SECOND
+from .dryrun import dry_run_directory
+from .dryrun import format_dry_run_report
+from .imports import get_source_files
+from .imports import scan_requirements
+from .instrumentation import timed
+from .ledger import LEDGER_FILENAME
+from .ledger import is_published
+from .ledger import record_upload
 from .licenses import LICENSES
+from .licenses import LICENSE_NAMES
+from .local_index import add_to_index
+from .logger import logger
+from .package_data import format_package_data_report
+from .package_data import get_package_data_report
+from .publisher import format_target_report
+from .publisher import get_target_name
+from .publisher import upload_to_target
+from .publisher import upload_to_targets
+from .pyproject import PYPROJECT_FILENAME
+from .pyproject import build_sdist
+from .pyproject import create_pyproject_text
+from .pyproject import is_managed_pyproject
+from .pyproject import merge_pyproject_text
+from .pyproject import read_pyproject_fields
+from .readme import README_CACHE_FILENAME
+from .readme import check_readme
+from .resolver import resolve_requirements
+from .resolver import update_metadata_store
+from .shared_functions import copy_files
 from .shared_functions import create_file
+from .shared_functions import read_setup_fields
 from .shared_functions import update_line
+from .skeletons import RENDERED_FILENAME
+from .skeletons import SKELETON_TEMPLATES
+from .skeletons import get_skeleton
+from .skeletons import get_skeleton_key
+from .skeletons import is_unedited
+from .skeletons import materialise_skeleton
+from .utils import ARTIFACT_DEPENDENCIES
 from .utils import GROUP_CLASSIFIERS
+from .utils import INPUT_PROMPTS
+from .utils import LISTBOX_THRESHOLD
 from .utils import REPLACEMENTS
 from .utils import SETUP_FIELDS
 from .utils import SG_KWARGS
+from .validation import format_validation_report
+from .validation import split_classifiers
+from .validation import validate_metadata
+from .venvs import CURRENT_PYTHON
+from .venvs import create_venv
+from .venvs import get_target_pythons
+from .venvs import get_venv_pool
+from .venvs import install_from_local_index
+from .venvs import verify_artifact_in_pool
+from .versions import VERSION_STEPS
+from .versions import bump_version
+from .versions import read_metadata_fields
+from .watch import DEBOUNCE_SECONDS
+from .watch import classify_changes
+from .watch import get_watcher
+from .watch import is_own_write
+from .watch import record_writes
+from .watch import wait_for_changes
 from cleverdict import CleverDict
 from keyring.errors import PasswordDeleteError
 from mechanicalsoup.utils import LinkNotFoundError
 from pathlib import Path
-from pep440_version_utils import Version
 from PySimpleGUI import ICON_BUY_ME_A_COFFEE
 import click
 import datetime
@@ -20,9 +75,9 @@ import json
 import keyring
 import mechanicalsoup
 import os
+import time
 from pprint import pprint
 import PySimpleGUI as sg
-import shutil
 import webbrowser
 
 
@@ -38,25 +93,31 @@ class Package(CleverDict):
 
     redirect : Send stdout and stderr to PySimpleGUI Debug Window
 
+    use_pyproject : Keep metadata in pyproject.toml instead of setup.py, and
+                    build with PEP 517 hooks rather than running setup.py
+
+    upload_targets : Repositories for upload_to_targets e.g. ["testpypi", "pypi"]
+
     """
 
     sg.change_look_and_feel("DarkAmber")
     easypypi_dirpath = Path(__file__).parent
     config_filepath = Path(click.get_app_dir("easyPyPI")) / ("config.json")
+    main_window = None  # Reused by get_user_input for subsequent packages
+    ui = sg  # Provides popup_* functions;  Can be replaced e.g. for testing
 
+    @timed
     def __init__(self, name=None, **kwargs):
         options, kwargs = self.get_options_from_kwargs(**kwargs)
         # ⚠ If kwargs are supplied, autosave will overwrite JSON config
         super().__init__(**kwargs)
-        if name:
-            self.name = name
-        self.load_defaults()
-        print(
-            f"\n ⓘ  easyPyPI template files are located in:\n  {self.__class__.easypypi_dirpath}",
-            **options if kwargs.get("redirect") else {},
+        self.load_defaults(name)
+        logger.info(
+            "\n ⓘ  easyPyPI template files are located in:\n  %s",
+            self.__class__.easypypi_dirpath,
         )
-        print(
-            f"\n ⓘ  Your easyPyPI config file is:\n  {self.__class__.config_filepath}"
+        logger.info(
+            "\n ⓘ  Your easyPyPI config file is:\n  %s", self.__class__.config_filepath
         )
         if options["_break"] is True:
             return
@@ -113,17 +174,20 @@ class Package(CleverDict):
                 options[key] = default_value
         return options, kwargs
 
-    def load_defaults(self):
+    @timed
+    def load_defaults(self, name=None):
         """
         Entry point for loading default Package values as attributes.
         Choose between last updated JSON config file, and setup.py if it exists.
+
+        name : use instead of any name previously saved in config.json
         """
-        name = self.get('name')
+        name = name or self.get("name")
         self.create_skeleton_config_file()
         self.load_defaults_from_config_file()
         if not name:
             # i.e. no name previously saved in config.json and none supplied
-            self.name = sg.popup_get_text(
+            self.name = self.ui.popup_get_text(
                 "Please enter a name for this package (all lowercase, underscores if needed):",
                 default_text=self.get("name") or "as_easy_as_pie",
                 **SG_KWARGS,
@@ -132,10 +196,16 @@ class Package(CleverDict):
             # i.e. name supplied -> use instead of previously saved name
             self.name = name
         self.create_folder_structure()
+        if self.pyproject_filepath.is_file() and self.load_defaults_from_pyproject():
+            # Project metadata in pyproject.toml is used instead of setup.py
+            return
         if self.setup_filepath.is_file() and self.setup_filepath.stat().st_size:
             # If setup.py exists & isn't empty, overwrite default values
             self.load_defaults_from_setup_py()
+            if self.get("use_pyproject"):
+                self.use_pyproject = False  # Previous package used pyproject.toml
 
+    @timed
     def load_defaults_from_config_file(self):
         """
         Loads default metadata from last updated config file.
@@ -149,6 +219,7 @@ class Package(CleverDict):
         with open(setup, "r") as file:
             self.script_lines = file.readlines()
 
+    @timed
     def load_defaults_from_setup_py(self):
         """
         Loads default metadata from previously created setup.py
@@ -156,13 +227,33 @@ class Package(CleverDict):
         """
         with open(self.setup_filepath, "r") as file:
             lines = file.readlines()
-        for line in lines:
-            for field, attribute in SETUP_FIELDS.items():
-                if line.startswith(field.upper() + " = "):
-                    # Use eval in case the value isn't simply a string:
-                    self[attribute] = eval(line.split(" = ")[-1])
-        with open(self.setup_filepath, "r") as file:
-            self.script_lines = file.readlines()
+        for attribute, value in read_setup_fields(lines).items():
+            self[attribute] = value
+        self.script_lines = lines
+
+    @timed
+    def load_defaults_from_pyproject(self):
+        """
+        Loads default metadata from previously created pyproject.toml, and
+        sets .use_pyproject so it's updated instead of setup.py.
+
+        Returns: True if metadata was loaded, or False if pyproject.toml wasn't
+        created by easyPyPI or has no [project] table e.g. if it's only used
+        to configure other tools
+        """
+        if not is_managed_pyproject(self.pyproject_filepath):
+            logger.info(
+                "\nⓘ %s wasn't created by easyPyPI so won't be changed.",
+                self.pyproject_filepath.name,
+            )
+            return False
+        values = read_pyproject_fields(self.pyproject_filepath)
+        if not values.get("name"):
+            return False
+        for attribute, value in values.items():
+            self[attribute] = value
+        self.use_pyproject = True
+        return True
 
     def create_skeleton_config_file(self):
         """
@@ -177,13 +268,15 @@ class Package(CleverDict):
             return
         try:
             os.makedirs(self.__class__.config_filepath.parent)
-            print(f"\n ⓘ  Folder created:\n {self.__class__.config_filepath.parent}")
+            logger.info(
+                "\n ⓘ  Folder created:\n %s", self.__class__.config_filepath.parent
+            )
         except FileExistsError:
             pass
         with open(self.__class__.config_filepath, "w") as file:
             json.dump({"version": "0.1"}, file)  # Create skeleton .json file
-        print(
-            f"\n ⚠  Skeleton config file created:\n  {self.__class__.config_filepath}"
+        logger.warning(
+            "\n ⚠  Skeleton config file created:\n  %s", self.__class__.config_filepath
         )
 
     def create_folder_structure(self):
@@ -193,7 +286,7 @@ class Package(CleverDict):
         """
         parent_path_str = ""
         while not parent_path_str:
-            parent_path_str = sg.popup_get_folder(
+            parent_path_str = self.ui.popup_get_folder(
                 "Please select the parent folder for your package i.e. WITHOUT the package name",
                 default_path=self.get_default_filepath(),
                 **SG_KWARGS,
@@ -204,9 +297,9 @@ class Package(CleverDict):
         self.setup_filepath_str = str(setup_dirpath / "setup.py")
         try:
             os.makedirs(setup_dirpath / self.name)
-            print(f"\n✓ Created package folder:\n  {setup_dirpath}")
+            logger.info("\n✓ Created package folder:\n  %s", setup_dirpath)
         except FileExistsError:
-            print(f"\n ⓘ  Package folder already exists:\n  {setup_dirpath}")
+            logger.info("\n ⓘ  Package folder already exists:\n  %s", setup_dirpath)
 
     def get_username(self, account, prompt=True):
         """
@@ -228,7 +321,7 @@ class Package(CleverDict):
                 username = keyring.get_credential(account, None).username
             except AttributeError:
                 if prompt:
-                    username = sg.popup_get_text(
+                    username = self.ui.popup_get_text(
                         f'Please enter your {account.replace("_", " ")} username (saved securely with `keyring`):',
                         default_text=self.get("Github_username"),
                         **SG_KWARGS,
@@ -255,7 +348,7 @@ class Package(CleverDict):
         False if password is not set successfully.
         """
         if not pw:
-            pw = sg.popup_get_text(
+            pw = self.ui.popup_get_text(
                 f'Please enter your {account.replace("_", " ")} password (not saved to file):',
                 password_char="*",
                 **SG_KWARGS,
@@ -298,7 +391,7 @@ class Package(CleverDict):
             username = self.get(f"{account}_username")
         if not username:
             username = keyring.get_credential(account, None).username
-        choice = sg.popup_yes_no(
+        choice = self.ui.popup_yes_no(
             f"Do you really want to delete {account} credentials for {username}?",
             **SG_KWARGS,
         )
@@ -310,7 +403,7 @@ class Package(CleverDict):
             try:
                 keyring.delete_password(account, username)
             except PasswordDeleteError:
-                print(
+                logger.warning(
                     "\n ⓘ  keyring Credentials couldn't be deleted. Perhaps they already were?"
                 )
 
@@ -325,6 +418,16 @@ class Package(CleverDict):
         """
         return Path(self.setup_filepath_str)
 
+    @property
+    def pyproject_filepath(self):
+        """ pyproject.toml alongside setup.py (see .setup_filepath) """
+        return self.setup_filepath.with_name(PYPROJECT_FILENAME)
+
+    @property
+    def rendered_filepath(self):
+        """ Record of files created from skeletons (see skeletons.is_unedited) """
+        return self.__class__.config_filepath.parent / RENDERED_FILENAME
+
     def get_default_filepath(self):
         # Default path should be the parent of self.name and not include it
         path = self.get("setup_filepath_str")
@@ -354,26 +457,24 @@ class Package(CleverDict):
         return default + f"{self.Github_username}, "
 
     def get_default_requirements(self):
-        return "cleverdict, "
+        """
+        Returns: requirements found by scanning the package's imports, or
+        "cleverdict" if there's no source to scan yet e.g. for a new package
+        """
+        app_dirpath = self.__class__.config_filepath.parent
+        package_dirpath = self.setup_filepath.parent / self.name
+        if not get_source_files(package_dirpath, tests=False):
+            return "cleverdict"
+        requirements = scan_requirements(
+            package_dirpath, app_dirpath / "import_cache.json"
+        )
+        return ", ".join(requirements)
 
-    def get_main_layout_inputs(self):
+    def load_input_defaults(self):
         """
-        Generates input boxes as part of the main layout.
-        Returns: layout (PySimpleGUI list)
+        Sets default values for the main window input boxes where no value
+        has been loaded from config.json or setup.py
         """
-        prompts = {
-            "name": "Package Name (all lowercase, underscores if needed):",
-            "version": "Latest Version number:",
-            "Github_username": "Your Github (or other repository) Username:",
-            "PyPI_username": "Your PyPI Username:",
-            "Test_PyPI_username": "Your Test PyPI Username:",
-            "url": "Link to the Package Repository:",
-            "description": "Description (with escape characters for \\ \" ' etc.):",
-            "author": "Full Name of the Author:",
-            "email": "E-mail Address for the Author:",
-            "keywords": "Keywords (separated by a comma):",
-            "requirements": "Any additional packages/modules required:",
-        }
         self.version = self.get("version") or self.get_default_version()
         self.get_username("Github")  # .Github_username created in place
         self.get_username("PyPI", False)  # Don't prompt for username yet
@@ -384,9 +485,15 @@ class Package(CleverDict):
         self.email = self.get("email") or self.get_default_email()
         self.keywords = self.get("keywords") or self.get_default_keywords()
         self.requirements = self.get("requirements") or self.get_default_requirements()
+
+    def get_main_layout_inputs(self):
+        """
+        Generates input boxes as part of the main layout.
+        Returns: layout (PySimpleGUI list)
+        """
+        self.load_input_defaults()
         layout = [[sg.Text(" " * 200, font="calibri 6")]]
-        for key, prompt in prompts.items():
-            default = self.get(key)
+        for key, prompt in INPUT_PROMPTS.items():
             layout += [
                 [
                     sg.Text(prompt, size=(40, 0)),
@@ -395,19 +502,19 @@ class Package(CleverDict):
             ]
         return layout
 
-    def get_main_layout_classifiers(self, layout):
+    def get_classifier_choices(self):
         """
-        Adds input boxes for Classifier lists to the main window layout.
-        Returns: layout (PySimpleGUI list), choices, selected_choices
+        Finds available and currently selected (or default) Classifiers for
+        each group in GROUP_CLASSIFIERS.
+        Returns: choices, selected_choices
         """
         choices = {}
         selected_choices = {}
-        layout += [[sg.Text(" " * 200, font="calibri 6")]]
-        for group, group_text in GROUP_CLASSIFIERS.items():
+        for group in GROUP_CLASSIFIERS:
             choices[group] = [x for x in CLASSIFIER_LIST if x.startswith(group)]
             self.classifiers = self.get("classifiers") or ""
             selected_choices[group] = [
-                x for x in self.classifiers.split(", ") if x.startswith(group)
+                x for x in split_classifiers(self.classifiers) if x.startswith(group)
             ]
             if (
                 group == "Programming Language :: Python"
@@ -436,6 +543,16 @@ class Package(CleverDict):
                     selected_choices[group] = [
                         x for x in choices[group] if x.endswith(default)
                     ]
+        return choices, selected_choices
+
+    def get_main_layout_classifiers(self, layout):
+        """
+        Adds input boxes for Classifier lists to the main window layout.
+        Returns: layout (PySimpleGUI list), choices, selected_choices
+        """
+        choices, selected_choices = self.get_classifier_choices()
+        layout += [[sg.Text(" " * 200, font="calibri 6")]]
+        for group, group_text in GROUP_CLASSIFIERS.items():
             layout += [
                 [
                     sg.Text(group_text, size=(40, 0)),
@@ -461,17 +578,7 @@ class Package(CleverDict):
             [
                 sg.ButtonMenu(
                     "1) Upversion",
-                    [
-                        "",
-                        [
-                            "Next Alpha",
-                            "Next Beta",
-                            "Next Release Candidate",
-                            "Next Micro",
-                            "Next Minor",
-                            "Next Major",
-                        ],
-                    ],
+                    ["", VERSION_STEPS],
                     key="1) Upversion",
                     tooltip="Update Version number incrementally.",
                 ),
@@ -509,15 +616,7 @@ class Package(CleverDict):
                 ),
                 sg.ButtonMenu(
                     "Browse Files",
-                    [
-                        "",
-                        [
-                            "easyPyPI README",
-                            "easyPyPI templates",
-                            "config.json",
-                            self.name,
-                        ],
-                    ],
+                    self.get_browse_files_menu(),
                     key="Browse Files",
                     tooltip="Open/Edit individual files used by easyPyPI.",
                 ),
@@ -525,41 +624,75 @@ class Package(CleverDict):
         ]
         return layout
 
+    def get_browse_files_menu(self):
+        """ Returns: menu definition for the Browse Files ButtonMenu """
+        return [
+            "",
+            ["easyPyPI README", "easyPyPI templates", "config.json", self.name],
+        ]
+
+    def refresh_main_window(self, window):
+        """
+        Updates element values in a previously created main window for the
+        current package, instead of rebuilding the whole layout.
+        Returns: choices, selected_choices
+        """
+        self.load_input_defaults()
+        for key in INPUT_PROMPTS:
+            window[key].update(value=self.get(key))
+        choices, selected_choices = self.get_classifier_choices()
+        for group in GROUP_CLASSIFIERS:
+            window[("classifiers", group)].update(
+                value="\n".join(selected_choices[group])
+            )
+        window["Browse Files"].update(menu_definition=self.get_browse_files_menu())
+        return choices, selected_choices
+
     def get_user_input(self):
         """
         Check config file for previous values.  If no value is set, prompts for
         a value and updates the relevant Package attribute.
+
+        The main window is created once and hidden rather than closed, so it
+        can be reused (and quickly refreshed) for other packages.
         """
-        layout = self.get_main_layout_inputs()
-        layout, choices, selected_choices = self.get_main_layout_classifiers(layout)
-        layout = self.get_main_layout_buttons(layout)
-        window = sg.Window(
-            "easyPyPI",
-            layout,
-            keep_on_top=SG_KWARGS["keep_on_top"],
-            icon=SG_KWARGS["icon"],
-            element_justification="center",
-        )
+        window = Package.main_window
+        if window is None:
+            layout = self.get_main_layout_inputs()
+            layout, choices, selected_choices = self.get_main_layout_classifiers(layout)
+            layout = self.get_main_layout_buttons(layout)
+            window = sg.Window(
+                "easyPyPI",
+                layout,
+                keep_on_top=SG_KWARGS["keep_on_top"],
+                icon=SG_KWARGS["icon"],
+                element_justification="center",
+                enable_close_attempted_event=True,
+            )
+            Package.main_window = window
+        else:
+            choices, selected_choices = self.refresh_main_window(window)
+            window.un_hide()
+        snapshot = None  # Last values saved, so only changes are processed
         while True:
             set_menu_colours(window)
             event, values = window.read()
+            if event == sg.WINDOW_CLOSE_ATTEMPTED_EVENT:
+                window.hide()
+                return False
             if event is None:
                 window.close()
+                Package.main_window = None
                 return False
             if event == "1) Upversion":
-                version = Version(str(values["version"]))
-                step = values["1) Upversion"]
-                step = step.replace("Next ", "").lower().replace(" ", "_")
-                next_version = getattr(Version, f"next_{step}")
-                self.version = str(next_version(version))
+                self.version = bump_version(values["version"], values["1) Upversion"])
                 window["version"].update(value=self.version)
                 values["version"] = self.version
             if event == "2) Generate":
-                self.save_user_input(values, selected_choices)
+                snapshot = self.save_user_input(values, selected_choices)
                 self.generate_files_and_folders()
             if event == "3) Publish":
                 if "Github" in values["3) Publish"]:
-                    print("Github!")
                     self.create_github_repository()
                 else:
                     self.upload_with_twine(values["3) Publish"])
@@ -578,7 +711,7 @@ class Package(CleverDict):
                         path = self.easypypi_dirpath
                     if choice == self.name:
                         path = self.setup_filepath.parent
-                    sg.popup_get_file(
+                    self.ui.popup_get_file(
                         "",
                         no_window=True,
                         initial_folder=path,
@@ -605,29 +738,63 @@ class Package(CleverDict):
                 )
                 window[event].update(value="\n".join(selected_choices[group]))
             if values:
-                self.save_user_input(values, selected_choices)
+                snapshot = self.save_user_input(values, selected_choices, snapshot)
 
-    def save_user_input(self, values, selected_choices):
+    @timed
+    def save_user_input(self, values, selected_choices, snapshot=None):
         """
-        Update package attributes based on main window input
+        Update package attributes based on main window input, then regenerate
+        only the derived artifacts (LICENSE text, setup.py lines etc.) which
+        depend on fields that have changed since snapshot.
 
+        snapshot : values returned by the previous call, or None to update
+                   everything.
+
+        Returns: snapshot of the values saved
         """
-        for key, value in values.items():
-            self[key] = value
-        self.classifiers = []
-        for value in selected_choices.values():
-            self.classifiers.extend(value)
-        self.classifiers = ", ".join(self.classifiers)
-        self.license_name_pypi = selected_choices["License :: OSI Approved ::"]
-        self.license_name_pypi = self.license_name_pypi[0].split(":: ")[-1]
+        values = dict(values)
+        values["classifiers"] = ", ".join(
+            x for value in selected_choices.values() for x in value
+        )
+        changed = [
+            key
+            for key, value in values.items()
+            if snapshot is None or snapshot.get(key) != value
+        ]
+        for key in changed:
+            self[key] = values[key]
+        self.regenerate_artifacts(
+            get_stale_artifacts(changed, everything=snapshot is None)
+        )
+        return values
+
+    def regenerate_artifacts(self, artifacts):
+        """ Calls each of the ARTIFACT_DEPENDENCIES methods in artifacts, in turn """
+        for artifact in artifacts:
+            getattr(self, artifact)()
+
+    def update_license_names(self, license_classifiers=None):
+        """
+        Sets .license_name_pypi and .license_name_github from License
+        classifiers e.g. ["License :: OSI Approved :: MIT License"]
+
+        license_classifiers : defaults to the License classifiers in .classifiers
+        """
+        if license_classifiers is None:
+            license_classifiers = [
+                x
+                for x in split_classifiers(self.get("classifiers") or "")
+                if x.startswith("License :: OSI Approved ::")
+            ]
+        if not license_classifiers:
+            return
+        self.license_name_pypi = license_classifiers[0].split(":: ")[-1]
         for spdx_id, pypi_name in LICENSE_NAMES.items():
             if self.license_name_pypi.endswith(pypi_name):
                 self.license_name_github = [
                     x.name for x in LICENSES if x.spdx_id == spdx_id
                 ][0]
                 break
-        self.create_license()
-        self.update_script_lines()
 
     def create_license(self):
         """
@@ -637,17 +804,32 @@ class Package(CleverDict):
 
         .license_text and makes common substitutions e.g. data and author.
         """
-        license_dict = [x for x in LICENSES if x.name == self.license_name_github][0]
-        year = str(datetime.datetime.now().year)
-        replacements = dict()
-        self.license_text = license_dict.body
+        self.license_text = self.get_license_body()
+        for old, new in self.get_license_replacements().items():
+            self.license_text = self.license_text.replace(old, new)
+
+    def get_license(self):
+        """ Returns: CleverDict from licenses.json for .license_name_github """
+        return [x for x in LICENSES if x.name == self.license_name_github][0]
+
+    def get_license_body(self):
+        """ Returns: LICENSE text before any substitutions """
+        license_dict = self.get_license()
+        body = license_dict.body
         if license_dict.key == "lgpl-3.0":
-            self.license_text += (
+            body += (
                 "\nThis license is an additional set of permissions to the "
                 '<a href="/licenses/gpl-3.0">GNU GPLv3</a> license which is reproduced below:\n\n'
             )
             gpl3 = [x for x in LICENSES if x.key == "gpl-3.0"][0]
-            self.license_text += gpl3.body
+            body += gpl3.body
+        return body
+
+    def get_license_replacements(self):
+        """ Returns: {placeholder: value} for common substitutions in LICENSE """
+        license_dict = self.get_license()
+        year = str(datetime.datetime.now().year)
+        replacements = dict()
         if license_dict.key == "mit":
             replacements = {"[year]": year, "[fullname]": self.author}
         if license_dict.key in ["gpl-3.0", "lgpl-3.0", "agpl-3.0"]:
@@ -660,17 +842,19 @@ class Package(CleverDict):
             }
         if license_dict.key == "apache-2.0":
             replacements = {"[yyyy]": year, "[name of copyright owner]": self.author}
-        if replacements:
-            for old, new in replacements.items():
-                self.license_text = self.license_text.replace(old, new)
+        return replacements
 
     def update_script_lines(self):
+        self.script_lines = self.get_updated_script_lines()
+
+    def get_updated_script_lines(self):
+        """ Returns: copy of .script_lines updated with current metadata values """
+        script_lines = list(self.script_lines)
         for keyword, attribute_name in SETUP_FIELDS.items():
             old_line_starts = keyword.upper() + " = "
             new_value = getattr(self, attribute_name)
-            self.script_lines = update_line(
-                self.script_lines, old_line_starts, new_value
-            )
+            script_lines = update_line(script_lines, old_line_starts, new_value)
+        return script_lines
 
     def register_accounts(self, account=None):
         """
@@ -697,7 +881,7 @@ class Package(CleverDict):
             accounts = {k: v for k, v in accounts.items() if k == account}
         for account, url in accounts.items():
             if not self.get(account + "_username"):
-                response = sg.popup_yes_no(
+                response = self.ui.popup_yes_no(
                     f"Do you need to register online for an account on {account}?",
                     **SG_KWARGS,
                 )
@@ -705,7 +889,7 @@ class Package(CleverDict):
                     return
                 if response == "Yes":
                     webbrowser.open(url)
-            username = sg.popup_get_text(
+            username = self.ui.popup_get_text(
                 f"Please register for a {account} account online, "
                 f"then enter your username below:",
                 default_text=self.get(account + "_username"),
@@ -716,28 +900,287 @@ class Package(CleverDict):
             self[f"{account}_username"] = username
             self.set_password(account)
 
+    @timed
     def generate_files_and_folders(self):
         """
         Recreates setup.py & creates a new tar.gz package ready for publishing.
         """
         self.copy_other_files()
-        choice = sg.popup_yes_no(
+        choice = self.ui.popup_yes_no(
             "Do you want to generate new package files "
             "(setup.py, README, LICENSE, tar.gz, etc) from the current metadata?\n",
             **SG_KWARGS,
         )
         if choice != "Yes":
             return
+        if not self.check_metadata():
+            return
         self.create_essential_files()
+        if not self.analyse_package_data():
+            return
         self.run_setup_py()
-        print("\n ✓  Files and folders generated ready for publishing.")
+        logger.info("\n ✓  Files and folders generated ready for publishing.")
+        versions = get_target_pythons(self.classifiers) or [CURRENT_PYTHON]
+        choice = self.ui.popup_yes_no(
+            f"Do you want to check the new .tar.gz installs and passes "
+            f"test_{self.name}.py with Python {', '.join(versions)}?\n",
+            **SG_KWARGS,
+        )
+        if choice == "Yes":
+            self.verify_build(versions)
+
+    def watch(
+        self,
+        polling=False,
+        build=True,
+        debounce=DEBOUNCE_SECONDS,
+        timeout=None,
+        max_batches=None,
+    ):
+        """
+        Watches the package folder, config file and easyPyPI templates, and
+        regenerates only what's affected by each batch of changes until
+        interrupted with Ctrl+C (see process_changes).
+
+        polling : check for changes regularly instead of using inotify
+        build : rebuild the .tar.gz after changes
+        timeout : stop after this many seconds without changes (None = never)
+        max_batches : stop after regenerating this many times (None = never)
+
+        Returns: list of outputs regenerated for each batch of changes
+        """
+        setup_dirpath = self.setup_filepath.parent
+        watches = [
+            (setup_dirpath, True),
+            (self.__class__.config_filepath.parent, False),
+            (self.easypypi_dirpath, False),
+        ]
+        templates = [*SKELETON_TEMPLATES, "setup_template.py"]
+        watcher = get_watcher(watches, polling)
+        logger.info("\n ⓘ  Watching for changes (Ctrl+C to stop):\n  %s", setup_dirpath)
+        written = {}  # Hashes of files written, to ignore our own changes
+        history = []
+        try:
+            while max_batches is None or len(history) < max_batches:
+                changes = wait_for_changes(watcher, debounce, timeout)
+                if not changes:
+                    break  # i.e. timeout reached
+                changes = {x for x in changes if not is_own_write(x, written)}
+                groups = classify_changes(
+                    changes,
+                    setup_dirpath,
+                    self.get_metadata_filepaths(),
+                    [self.easypypi_dirpath / x for x in templates],
+                )
+                outputs = self.process_changes(groups, build, written)
+                if outputs:
+                    history.append(outputs)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+        return history
+
+    def get_metadata_filepaths(self):
+        """ Returns: files which metadata is loaded from """
+        metadata_filepath = self.setup_filepath
+        if self.get("use_pyproject"):
+            metadata_filepath = self.pyproject_filepath
+        return [self.__class__.config_filepath, metadata_filepath]
+
+    def reload_metadata(self, filepath):
+        """
+        Loads SETUP_FIELDS values from config.json, setup.py or pyproject.toml
+        after they've been changed e.g. in an editor or another easyPyPI window.
+
+        Returns: list of attribute names whose values have changed
+        """
+        values = read_metadata_fields(filepath)
+        if filepath == self.setup_filepath:
+            # Keep any other edits when setup.py is next created from these:
+            with open(filepath, "r") as file:
+                self.script_lines = file.readlines()
+        changed = [
+            x for x in SETUP_FIELDS.values() if x in values and values[x] != self.get(x)
+        ]
+        for attribute in changed:
+            self[attribute] = values[attribute]
+        return changed
+
+    @timed
+    def process_changes(self, groups, build=True, written=None):
+        """
+        Regenerates outputs affected by changed files (see watch.classify_changes):
+
+        metadata changes -> setup.py/pyproject.toml and/or LICENSE, and .tar.gz
+        template changes -> only the files created from those templates
+        other changes -> just the .tar.gz
+
+        build : rebuild the .tar.gz if anything has changed
+        written : dictionary to record hashes of files written in
+
+        Returns: list of outputs regenerated e.g. ["setup.py", "LICENSE", "sdist"]
+        """
+        written = {} if written is None else written
+        changed = []
+        for filepath in groups["metadata"]:
+            changed += self.reload_metadata(filepath)
+        artifacts = get_stale_artifacts(changed)
+        self.regenerate_artifacts(artifacts)
+        render_metadata = "update_script_lines" in artifacts
+        relative_paths = ["LICENSE"] if "create_license" in artifacts else []
+        for template in groups["templates"]:
+            if template.name in SKELETON_TEMPLATES:
+                relative_path = SKELETON_TEMPLATES[template.name]
+                filepath = self.setup_filepath.parent / relative_path.replace(
+                    "{self.name}", self.name
+                )
+                # Starter files may have become the user's own code since:
+                if filepath.is_file() and not is_unedited(
+                    filepath, self.rendered_filepath
+                ):
+                    logger.warning(
+                        "\n ⚠  Not updated from %s, as it has been edited:\n  %s",
+                        template.name,
+                        filepath,
+                    )
+                    continue
+                relative_paths.append(relative_path)
+            elif not self.get("use_pyproject"):  # i.e. setup_template.py
+                with open(template, "r") as file:
+                    self.script_lines = file.readlines()
+                self.update_script_lines()
+                render_metadata = True
+        filepaths = []
+        if render_metadata:
+            filepaths.append(self.create_metadata_file())
+        if relative_paths:
+            filepaths += self.create_skeleton_files(relative_paths, relative_paths)
+        backup = self.setup_filepath.with_name(f"{self.setup_filepath.stem} - old.py")
+        record_writes(written, filepaths + ([backup] if backup.is_file() else []))
+        sfp = self.setup_filepath.parent
+        outputs = [x.relative_to(sfp).as_posix() for x in filepaths]
+        if build and (filepaths or groups["sources"]):
+            problems = validate_metadata(self)
+            if problems:
+                logger.warning(
+                    "\n ⚠  Not rebuilding until metadata is corrected:\n%s",
+                    format_validation_report(problems),
+                )
+            else:
+                self.run_setup_py()
+                outputs.append("sdist")
+        return outputs
+
+    @timed
+    def check_metadata(self):
+        """
+        Validates metadata against PEP 440/508, the classifier list, and other
+        PyPI rules, and shows any problems found.
+
+        Returns: True if metadata is valid, False otherwise
+        """
+        problems = validate_metadata(self)
+        if not problems:
+            return True
+        report = format_validation_report(problems)
+        logger.warning("\n ⚠  Problems found with package metadata:\n%s", report)
+        self.ui.popup(
+            f"Please correct the following before building or uploading:\n\n{report}\n",
+            **SG_KWARGS,
+        )
+        return False
+
+    @timed
+    def check_readme(self):
+        """
+        Checks README.md will display properly on PyPI, like "twine check",
+        and shows any problems found.
+
+        Returns: True if README.md is fine, False otherwise
+        """
+        problems = check_readme(
+            self.setup_filepath.with_name("README.md"),
+            self.__class__.config_filepath.parent / README_CACHE_FILENAME,
+        )
+        if not problems:
+            return True
+        report = "\n".join(problems)
+        logger.warning("\n ⚠  Problems found with README.md:\n%s", report)
+        self.ui.popup(
+            f"Please correct the following before uploading:\n\n{report}\n",
+            **SG_KWARGS,
+        )
+        return False
+
+    @timed
+    def dry_run(self, bytes_per_second=UPLOAD_BYTES_PER_SECOND):
+        """
+        Times loading metadata, validating it, creating files, and building a
+        .tar.gz in a temporary copy of the package folder, without changing any
+        files or uploading anything.
+
+        bytes_per_second : upload speed to estimate upload time with
+
+        Returns: report dictionary (see dryrun.dry_run_directory)
+        """
+
+        def load():
+            values = {}
+            metadata_filepath = self.get_metadata_filepaths()[-1]
+            if metadata_filepath.is_file():
+                values = read_metadata_fields(metadata_filepath)
+            # Unsaved changes are what would be published:
+            values.update(self.to_dict())
+            return values
+
+        def render(dirpath):
+            # Current values, without changing .script_lines:
+            self.create_metadata_file(dirpath, self.get_updated_script_lines())
+            self.create_skeleton_files(overwrite=["LICENSE"], setup_dirpath=dirpath)
+
+        report = dry_run_directory(
+            self.setup_filepath.parent, load, render, bytes_per_second
+        )
+        logger.info(
+            "\n ⓘ  Dry run (nothing uploaded):\n\n%s", format_dry_run_report([report])
+        )
+        return report
+
+    @timed
+    def analyse_package_data(self):
+        """
+        Reports which files will be included in the .tar.gz archive with their
+        (estimated) compressed sizes, and checks whether to continue if any
+        large or duplicate files are found.
+
+        Returns: True to continue building, False otherwise
+        """
+        report = get_package_data_report(self.setup_filepath.parent, self.name)
+        logger.info(
+            "\n ⓘ  Files to be included in the .tar.gz archive:\n\n%s",
+            format_package_data_report(report),
+        )
+        flagged = [x for x in report if x["flags"]]
+        if not flagged:
+            return True
+        files = "\n".join(f"{x['path']} ({', '.join(x['flags'])})" for x in flagged)
+        choice = self.ui.popup_yes_no(
+            f"WARNING\n\nThe following files may be bloating your package:\n\n{files}\n\n"
+            "Do you want to continue building anyway?\n",
+            **SG_KWARGS,
+        )
+        return choice == "Yes"
 
     def copy_other_files(self):
         """
         Prompts for additional files to copy over into the newly created folder:
-        \package_name\package_name
+        \\package_name\\package_name
+
+        Files are copied in parallel, skipping any which are unchanged, and
+        existing files are overwritten (or not) according to a single prompt.
         """
-        files = sg.popup_get_file(
+        files = self.ui.popup_get_file(
             f"Please select any other files or 'package data' to copy to the new folder:\n\n{self.setup_filepath.with_name(self.name)}\n",
             **SG_KWARGS,
             default_path="",
@@ -745,67 +1188,155 @@ class Package(CleverDict):
         )
         if not files:
             return False
-        for file in [Path(x) for x in files.split(";")]:
-            new_file = self.setup_filepath.parent / self.name / file.name
-            if new_file.is_file():
-                response = sg.popup_yes_no(
-                    f"WARNING\n\n{file.name} already exists in\n{new_file.parent}\n\n Overwrite?",
-                    **SG_KWARGS,
-                )
-                if response == "No":
-                    continue
-            if file.is_file():
-                shutil.copy(file, new_file)
-                print(f"\n✓ Copied {file.name} to:\n {new_file.parent}")
+        new_dirpath = self.setup_filepath.parent / self.name
+        results = copy_files(
+            files.split(";"), new_dirpath, overwrite=self.prompt_overwrite
+        )
+        if results is None:
+            return False
+        if results["copied"]:
+            logger.info(
+                "\n✓ Copied %s file(s) to:\n %s", len(results["copied"]), new_dirpath
+            )
+        if results["unchanged"]:
+            logger.info(
+                "\n ⓘ  %s unchanged file(s) skipped.", len(results["unchanged"])
+            )
+        if results["preserved"]:
+            logger.info(
+                "\n ⓘ  %s existing file(s) preserved.", len(results["preserved"])
+            )
 
+    def prompt_overwrite(self, files):
+        """
+        Single prompt for how to handle files which already exist.
+        Returns: True to overwrite, False to keep existing files, None to cancel
+        """
+        names = "\n".join(x.name for x in files[:10])
+        if len(files) > 10:
+            names += f"\n...and {len(files) - 10} more"
+        response = self.ui.popup(
+            f"WARNING\n\n{len(files)} file(s) already exist with different contents:\n\n{names}\n",
+            **SG_KWARGS,
+            custom_text=("Overwrite All", "Keep Existing"),
+        )
+        if response is None:
+            return None
+        return response == "Overwrite All"
+
+    @timed
     def create_essential_files(self):
         """
         Creates essential files for the new package:
-        /setup.py
+        /setup.py (or /pyproject.toml if .use_pyproject)
         /README.md
         /LICENSE
         /package_name/__init__.py
         /package_name/package_name.py
         /package_name/test_PACKAGE_NAME.py
         """
-        sfp = self.setup_filepath.parent
         # setup.py and LICENSE can be be overwritten as they're most likely to
         # be changed by user after publishing, and no code changes will be lost:
-        print(self.license_text)
-        create_file(sfp / "LICENSE", self.license_text, overwrite=True)
-        create_file(self.setup_filepath, self.script_lines, overwrite=True)
-        # Other files are just bare-bones initially, imported from templates:
-        templates = {
-            "readme_template.md": sfp / "README.md",
-            "init_template.py": sfp / self.name / "__init__.py",
-            "script_template.py": sfp / self.name / (self.name + ".py"),
-            "test_template.py": sfp / self.name / ("test_" + self.name + ".py"),
-        }
-        # Read in, make replacements, create in new folder structure
-        for template_filepath, destination_path in templates.items():
-            template_filepath = self.easypypi_dirpath / template_filepath
-            with open(template_filepath, "r") as file:
-                text = file.read()
-            for replacement in REPLACEMENTS:
-                text = text.replace(replacement, eval(f"f'{replacement}'"))
-            create_file(destination_path, text)
+        self.create_metadata_file()
+        # Other files are just bare-bones initially, from a cached skeleton:
+        self.create_skeleton_files(overwrite=["LICENSE"])
+
+    def create_metadata_file(self, setup_dirpath=None, script_lines=None):
+        """
+        Creates setup.py from .script_lines, or pyproject.toml if .use_pyproject
+
+        setup_dirpath : folder to create it in, if not .setup_filepath's folder
+        script_lines : lines for setup.py, if not .script_lines
+
+        Returns: Path of the new file
+        """
+        setup_dirpath = Path(setup_dirpath or self.setup_filepath.parent)
+        if self.get("use_pyproject"):
+            filepath = setup_dirpath / PYPROJECT_FILENAME
+            text = create_pyproject_text(self)
+            if filepath.is_file():
+                with open(filepath, "r") as file:
+                    text = merge_pyproject_text(file.read(), text)
+            create_file(filepath, text, overwrite=True)
+            return filepath
+        filepath = setup_dirpath / self.setup_filepath.name
+        create_file(filepath, script_lines or self.script_lines, overwrite=True)
+        return filepath
+
+    def create_skeleton_files(
+        self, relative_paths=None, overwrite=(), setup_dirpath=None
+    ):
+        """
+        Creates LICENSE and files from templates, using a cached skeleton.
 
+        relative_paths : only create these files e.g. ["README.md"] (see
+                         SKELETON_TEMPLATES), instead of all of them
+        overwrite : relative paths of files to replace if they already exist
+        setup_dirpath : folder to create them in, if not .setup_filepath's folder
+
+        Returns: list of Paths of files written
+        """
+        license_replacements = self.get_license_replacements()
+        values = dict(license_replacements)
+        for replacement in REPLACEMENTS:
+            values[replacement] = eval(f"f'{replacement}'")
+        key = get_skeleton_key(
+            self.easypypi_dirpath, self.get_license().key, REPLACEMENTS
+        )
+        skeleton_dirpath = self.__class__.config_filepath.parent / "skeletons" / key
+        skeleton = get_skeleton(
+            skeleton_dirpath, lambda: self.render_skeleton(license_replacements)
+        )
+        if relative_paths is not None:
+            skeleton = {x: skeleton[x] for x in relative_paths}
+        # Only files in the package itself are recorded, not e.g. dry runs':
+        record_filepath = None if setup_dirpath else self.rendered_filepath
+        setup_dirpath = setup_dirpath or self.setup_filepath.parent
+        return materialise_skeleton(
+            skeleton_dirpath,
+            skeleton,
+            setup_dirpath,
+            values,
+            overwrite,
+            record_filepath,
+        )
+
+    def render_skeleton(self, license_replacements):
+        """
+        Returns: files for a new skeleton snapshot, with placeholders to be
+        replaced for each package (see skeletons.create_skeleton)
+        """
+        files = {"LICENSE": (self.get_license_body(), list(license_replacements))}
+        for template, relative_path in SKELETON_TEMPLATES.items():
+            with open(self.easypypi_dirpath / template, "r") as file:
+                files[relative_path] = (file.read(), REPLACEMENTS)
+        return files
+
+    @timed
     def run_setup_py(self):
-        """ Creates a .tar.gz distribution file with setup.py """
+        """
+        Creates a .tar.gz distribution file with setup.py, or from
+        pyproject.toml with the PEP 517 hooks if .use_pyproject
+        """
+        if self.get("use_pyproject"):
+            return build_sdist(self.setup_filepath.parent)
         try:
             import setuptools
             import twine
         except ImportError:
-            print("\n> Installing setuptools and twine if not already present...")
+            logger.info("\n> Installing setuptools and twine if not already present...")
             os.system('cmd /c "python -m pip install setuptools wheel twine"')
         os.chdir(self.setup_filepath.parent)
-        print(f"\n> Running {self.setup_filepath / 'setup.py'}...")
+        logger.info("\n> Running %s...", self.setup_filepath)
         os.system('cmd /c "setup.py sdist"')
 
+    @timed
     def upload_with_twine(self, account=None):
         """ Uploads to PyPI or Test PyPI with twine """
+        if not self.check_metadata() or not self.check_readme():
+            return False
         if not account:
-            account = sg.popup(
+            account = self.ui.popup(
                 f"Do you want to upload {self.name} to\nTest PyPI, or go FULLY PUBLIC on the real PyPI?\n",
                 **SG_KWARGS,
                 custom_text=("Test PyPI", "PyPI"),
@@ -817,6 +1348,16 @@ class Package(CleverDict):
         if account == "Test PyPI":
             params = "testpypi"
             account = "Test_PyPI"
+        repository = params
+        ledger_filepath = self.__class__.config_filepath.parent / LEDGER_FILENAME
+        if is_published(ledger_filepath, self.name, self.version, repository):
+            logger.warning(
+                "\n ⚠  %s %s has already been uploaded to %s.\n   Try a new version number?",
+                self.name,
+                self.version,
+                account,
+            )
+            return False
         if not self.get_username(account):
             return False
         username = getattr(self, f"{account}_username")
@@ -824,45 +1365,280 @@ class Package(CleverDict):
             self.set_password(account)
         params += f" dist/*-{self.version}.tar.gz "
         os.chdir(self.setup_filepath.parent)
-        if os.system(
+        started = time.time()
+        failed = os.system(
             f'cmd /c "python -m twine upload '
             f"--repository {params} "
             f"-u {username} "
             f'-p {keyring.get_password(account, username)}"'
-        ):
+        )
+        sdists = list(Path("dist").glob(f"*-{self.version}.tar.gz"))
+        record_upload(
+            ledger_filepath,
+            self.name,
+            self.version,
+            repository,
+            sdists[0] if sdists else None,
+            started,
+            time.time() - started,
+            not failed,
+        )
+        if failed:
             # A return value of 1 (True) indicates an error
-            print("\n ⚠  Problem uploading with Twine; probably either:")
-            print("   - An authentication issue.  Check your username and password?")
-            print("   - Using an existing version number.  Try a new version number?")
+            logger.warning(
+                "\n ⚠  Problem uploading with Twine; probably either:\n"
+                "   - An authentication issue.  Check your username and password?\n"
+                "   - Using an existing version number.  Try a new version number?"
+            )
         else:
             url = "https://" if account == "PyPI" else "https://test."
             webbrowser.open(f"{url}pypi.org/project/{self.name}/{self.version}")
-            response = sg.popup_yes_no(
+            response = self.ui.popup_yes_no(
                 "Fantastic! Your package should now be available in your webbrowser, "
                 "although you might need to wait a few minutes before it registers as the 'latest' version.\n\n"
-                "Do you want to install it now using pip?\n",
+                "Do you want to check it installs now?\n",
+                **SG_KWARGS,
+            )
+            if response != "Yes":
+                return
+            response = self.ui.popup(
+                "Do you want to check it installs locally (offline) or using pip?\n",
                 **SG_KWARGS,
+                custom_text=("Verify Locally", "Install with pip"),
             )
-            if response == "Yes":
+            if response == "Verify Locally":
+                self.pip_install("Local")
+            if response == "Install with pip":
                 self.pip_install(account)
 
+    @timed
+    def upload_to_targets(self, targets=None):
+        """
+        Builds a .tar.gz once, then uploads it to several repositories at the
+        same time, skipping any already recorded as having this version.
+
+        targets : repository names in .pypirc, URLs, or file:// local index
+                  folders (default: .upload_targets, or Test PyPI and - if
+                  confirmed - PyPI)
+
+        Returns: {target: {"status", "error", "started", "seconds"}} (see
+        publisher.upload_to_targets), or False if cancelled or checks or the
+        build failed
+        """
+        if not self.check_metadata() or not self.check_readme():
+            return False
+        targets = list(targets or self.get("upload_targets") or ["testpypi"])
+        if targets == ["testpypi"] and not self.get("upload_targets"):
+            choice = self.ui.popup_yes_no(
+                f"Do you want to upload version {self.version} to PyPI as well as "
+                "Test PyPI?\n\n ⚠   Uploads to PyPI can't be replaced or undone.",
+                **SG_KWARGS,
+            )
+            if choice is None:
+                return False
+            if choice == "Yes":
+                targets.append("pypi")
+        ledger_filepath = self.__class__.config_filepath.parent / LEDGER_FILENAME
+        results = {}
+        for target in targets:
+            repository = get_target_name(target)
+            if is_published(ledger_filepath, self.name, self.version, repository):
+                results[target] = {
+                    "status": "already published",
+                    "error": None,
+                    "started": None,
+                    "seconds": 0,
+                }
+        if len(results) == len(targets):
+            logger.info("\n ⓘ  %s %s already uploaded.", self.name, self.version)
+            return results
+        sdist_filepath = build_sdist(self.setup_filepath.parent)
+        if not sdist_filepath:
+            return False
+        # Look up credentials now, as keyring may not be safe to use in threads:
+        credentials = {x: self.get_twine_credentials(x) for x in targets}
+        results.update(
+            upload_to_targets(
+                [sdist_filepath],
+                [x for x in targets if x not in results],
+                lambda filepaths, target: upload_to_target(
+                    filepaths, target, *credentials[target]
+                ),
+            )
+        )
+        for target, result in results.items():
+            if result["status"] != "already published":
+                record_upload(
+                    ledger_filepath,
+                    self.name,
+                    self.version,
+                    get_target_name(target),
+                    sdist_filepath,
+                    result["started"],
+                    result["seconds"],
+                    result["status"] == "published",
+                )
+        logger.info(
+            "\n ⓘ  Uploads of %s:\n\n%s",
+            sdist_filepath.name,
+            format_target_report(results),
+        )
+        return results
+
+    def get_twine_credentials(self, target):
+        """
+        Returns: (username, password) saved for "pypi" or "testpypi" targets,
+        or (None, None) to let twine find them
+        """
+        account = {"pypi": "PyPI", "testpypi": "Test_PyPI"}.get(target)
+        username = self.get(f"{account}_username") if account else None
+        if not username:
+            return None, None
+        return username, keyring.get_password(account, username)
+
     def pip_install(self, account):
-        """ Auto-install from pip using latest version and account. """
+        """
+        Auto-install from pip using latest version and account.
+        If account is "Local", installs from the local index instead.
+        """
+        if account == "Local":
+            return self.verify_install()
         url = "https://" if account == "PyPI" else "https://test."
-        print()
         command = f"python -m pip install -i {url}pypi.org/simple/ {self.name}=={self.version}"
         if not os.system(f'cmd /c "{command}"'):
             # A return value of 1 indicates an error, 0 indicates success
-            print(
-                f"\n ⓘ  You can view your package's details using 'pip show {self.name}':\n"
+            logger.info(
+                "\n ⓘ  You can view your package's details using 'pip show %s':\n",
+                self.name,
             )
             os.system(f'cmd /c "pip show {self.name}"')
-            print()
         else:
-            print("\n ⚠  Installation failed.  Perhaps try again shortly?")
-            print(f"\n    {command}\n\n    or...")
-            print(f"    >>> package.pip_install('{account}')\n")
+            logger.warning(
+                "\n ⚠  Installation failed.  Perhaps try again shortly?"
+                "\n\n    %s\n\n    or...\n    >>> package.pip_install('%s')\n",
+                command,
+                account,
+            )
+
+    @timed
+    def check_requirements(self):
+        """
+        Checks REQUIREMENTS can be resolved from the local index and wheelhouse
+        in the easyPyPI folder, without network access or running pip.
+
+        Returns: dictionary of results from resolver.resolve_requirements
+        """
+        app_dirpath = self.__class__.config_filepath.parent
+        store = update_metadata_store(
+            [app_dirpath / "local_index", app_dirpath / "wheelhouse"],
+            app_dirpath / "requirements_metadata.json",
+        )
+        results = resolve_requirements(self.get("requirements") or "", store)
+        for problem in results["invalid"] + results["conflicts"]:
+            logger.warning("\n ⚠  Requirements problem:\n  %s", problem)
+        if results["missing"]:
+            logger.info(
+                "\n ⓘ  Not in the local wheelhouse yet (will be downloaded):\n  %s",
+                ", ".join(results["missing"]),
+            )
+        return results
+
+    @timed
+    def verify_install(self):
+        """
+        Installs the .tar.gz for the current version into an isolated, cached
+        virtual environment from a local package index in the easyPyPI folder.
+        Dependencies come from a cached wheelhouse, so after the first run this
+        works offline.
+
+        Returns: True if installed successfully
+        """
+        app_dirpath = self.__class__.config_filepath.parent
+        dist_dirpath = self.setup_filepath.parent / "dist"
+        sdists = list(dist_dirpath.glob(f"*-{self.version}.tar.gz"))
+        if not sdists:
+            logger.warning(
+                "\n ⚠  No .tar.gz found for version %s.  Try Generate?", self.version
+            )
+            return False
+        add_to_index(app_dirpath / "local_index", sdists)
+        self.check_requirements()
+        venv_python = create_venv(app_dirpath / "venvs" / "verify")
+        requirements = [x.strip() for x in self.requirements.split(",") if x.strip()]
+        success, seconds, output = install_from_local_index(
+            venv_python,
+            self.name,
+            self.version,
+            app_dirpath / "local_index",
+            app_dirpath / "wheelhouse",
+            requirements,
+        )
+        if success:
+            logger.info(
+                "\n ✓  %s %s installed in %.1fs into:\n  %s",
+                self.name,
+                self.version,
+                seconds,
+                venv_python.parent.parent,
+            )
+        else:
+            logger.warning(
+                "%s\n ⚠  Local installation failed after %.1fs.", output, seconds
+            )
+        return success
+
+    @timed
+    def verify_build(self, versions=None):
+        """
+        Installs the .tar.gz for the current version into a pool of reusable
+        virtual environments (one per targeted Python version) in parallel,
+        and runs test_{name}.py in each of them.
+
+        versions : e.g. ["3.8", "3.9"], defaults to Classifier Python versions
 
+        Returns: dictionary of {version: results}
+        """
+        app_dirpath = self.__class__.config_filepath.parent
+        versions = versions or get_target_pythons(self.classifiers) or [CURRENT_PYTHON]
+        dist_dirpath = self.setup_filepath.parent / "dist"
+        sdists = list(dist_dirpath.glob(f"*-{self.version}.tar.gz"))
+        if not sdists:
+            logger.warning(
+                "\n ⚠  No .tar.gz found for version %s.  Try Generate?", self.version
+            )
+            return {}
+        self.check_requirements()
+        pool, errors = get_venv_pool(
+            app_dirpath / "venvs", versions, app_dirpath / "wheelhouse"
+        )
+        for version, error in errors.items():
+            logger.warning("\n ⚠  Python %s skipped:\n  %s", version, error)
+        requirements = [x.strip() for x in self.requirements.split(",") if x.strip()]
+        results = verify_artifact_in_pool(
+            pool, sdists[0], self.name, app_dirpath / "wheelhouse", requirements
+        )
+        for version, result in results.items():
+            if result["tests_passed"]:
+                logger.info(
+                    "\n ✓  Installed and tests passed with Python %s (%.1fs)",
+                    version,
+                    result["seconds"],
+                )
+                continue
+            if result["installed"]:
+                status = "⚠  Installed but tests failed"
+            else:
+                status = "⚠  Installation failed"
+            logger.warning(
+                "%s\n %s with Python %s (%.1fs)",
+                result["output"],
+                status,
+                version,
+                result["seconds"],
+            )
+        return results
+
+    @timed
     def publish_to_github(self):
         """ Uploads initial package to Github using Git"""
         if not self.get_username("Github"):
@@ -875,7 +1651,7 @@ class Package(CleverDict):
         git remote add origin https://github.com/{self.Github_username}/{self.name}.git
         git push -u origin main
         """
-        choice = sg.popup_yes_no(
+        choice = self.ui.popup_yes_no(
             f"Do you want to upload (Push) your package to Github?\n\n ⚠   CAUTION - "
             f"Only recommended when creating your repository for the first time!  "
             f"This automation requires Git and will run the following commands:\n\n{commands}",
@@ -887,7 +1663,7 @@ class Package(CleverDict):
         for command in commands.splitlines()[1:]:  # Ignore first blank line
             if not os.system(f"cmd /c {command}"):
                 # A return value of 1 indicates an error, 0 indicates success
-                print(f"\n ⓘ  Your package is now online at:\n  {self.url}':\n")
+                logger.info("\n ⓘ  Your package is now online at:\n  %s':\n", self.url)
 
     def create_github_repository(self):
         """ Creates an empty repository on Github """
@@ -909,8 +1685,9 @@ class Package(CleverDict):
         try:
             browser.select_form('form[action="/repositories"]')
         except LinkNotFoundError:
-            print(
-                f"\n ⚠  Unable to log in to Github with username {self.Github_username}.  Please resubmit Github password, double check your username, and try again..."
+            logger.warning(
+                "\n ⚠  Unable to log in to Github with username %s.  Please resubmit Github password, double check your username, and try again...",
+                self.Github_username,
             )
             self.set_password("Github")
             browser.close()
@@ -943,58 +1720,188 @@ def set_menu_colours(window):
         pass  # This workaround attempts to change a non-existent menu
 
 
+def get_stale_artifacts(changed, everything=False):
+    """
+    Walks ARTIFACT_DEPENDENCIES to find which derived artifacts need
+    regenerating after the given fields have changed.
+
+    Returns: list of Package method names in the order they should be called
+    """
+    if everything:
+        return list(ARTIFACT_DEPENDENCIES)
+    stale = set(changed)
+    artifacts = []
+    for artifact, dependencies in ARTIFACT_DEPENDENCIES.items():
+        if stale.intersection(dependencies):
+            stale.add(artifact)
+            artifacts.append(artifact)
+    return artifacts
+
+
+# Classifier popups are created once per group, then hidden and re-shown:
+CHOICE_WINDOWS = {}
+
+
 def prompt_with_choices(group, choices, selected_choices):
     """
     Creates a scrollable popup using PySimpleGui checkboxes or radio buttons.
     Returns a set of selected choices, or and empty set
     """
-    if group in ["Development Status", "License :: OSI Approved ::"]:
-        layout = [
-            [
-                sg.Radio(
-                    text=choice,
-                    group_id=group,
-                    key=choice,
-                    default=choice in selected_choices,
-                )
+    if len(choices) > LISTBOX_THRESHOLD:
+        return prompt_with_listbox(group, choices, selected_choices)
+    choices_window = CHOICE_WINDOWS.get(group)
+    if choices_window is None:
+        if group in ["Development Status", "License :: OSI Approved ::"]:
+            layout = [
+                [
+                    sg.Radio(
+                        text=choice,
+                        group_id=group,
+                        key=choice,
+                        default=choice in selected_choices,
+                    )
+                ]
+                for choice in choices
             ]
-            for choice in choices
-        ]
-    else:
-        layout = [
-            [sg.Checkbox(text=choice, key=choice, default=choice in selected_choices)]
-            for choice in choices
-        ]
-    buttons = [sg.Button("Accept"), sg.Button("Cancel")]
-    if group == "License :: OSI Approved ::":
-        buttons += [sg.Button("License Help")]
-    choices_window = sg.Window(
-        f"Classifiers for the {group.title()} group",
-        [
-            "",
+        else:
+            layout = [
+                [
+                    sg.Checkbox(
+                        text=choice, key=choice, default=choice in selected_choices
+                    )
+                ]
+                for choice in choices
+            ]
+        buttons = [sg.Button("Accept"), sg.Button("Cancel")]
+        if group == "License :: OSI Approved ::":
+            buttons += [sg.Button("License Help")]
+        choices_window = sg.Window(
+            f"Classifiers for the {group.title()} group",
             [
-                sg.Column(
-                    layout + [buttons],
-                    scrollable=True,
-                    vertical_scroll_only=True,
-                    size=(600, 300),
-                )
+                "",
+                [
+                    sg.Column(
+                        layout + [buttons],
+                        scrollable=True,
+                        vertical_scroll_only=True,
+                        size=(600, 300),
+                    )
+                ],
             ],
-        ],
-        size=(600, 300),
-        resizable=True,
-        keep_on_top=SG_KWARGS["keep_on_top"],
-        icon=SG_KWARGS["icon"],
-    )
+            size=(600, 300),
+            resizable=True,
+            keep_on_top=SG_KWARGS["keep_on_top"],
+            icon=SG_KWARGS["icon"],
+            enable_close_attempted_event=True,
+        )
+        CHOICE_WINDOWS[group] = choices_window
+    else:
+        # Discard any changes which were cancelled last time:
+        for choice in choices:
+            choices_window[choice].update(value=choice in selected_choices)
+        choices_window.un_hide()
     while True:
-        event, values = choices_window.read(close=False)
+        event, values = choices_window.read()
         if event == "Accept":
             selected_choices.clear()
             selected_choices.extend(k for k in choices if values[k])
-            choices_window.close()
+            choices_window.hide()
             return True
         if event == "License Help":
             webbrowser.open("https://choosealicense.com/licenses/")
-        if event is None or event == "Cancel":
-            choices_window.close()
+        if event in ["Cancel", sg.WINDOW_CLOSE_ATTEMPTED_EVENT]:
+            choices_window.hide()
+            return False
+        if event is None:
+            del CHOICE_WINDOWS[group]
+            return False
+
+
+def filter_choices(index, text):
+    """
+    Case-insensitive search of an index created from a list of choices:
+    index = [(choice.lower(), choice) for choice in choices]
+
+    Every word in text must appear somewhere in a choice for it to match.
+    Returns: filtered index (for narrowing down further as text is typed)
+    """
+    words = text.lower().split()
+    return [x for x in index if all(word in x[0] for word in words)]
+
+
+def prompt_with_listbox(group, choices, selected_choices):
+    """
+    Popup alternative to prompt_with_choices for large Classifier groups.
+
+    Uses a single Listbox widget (which only draws visible rows) plus a
+    search box to filter choices incrementally as you type.
+    Returns True if choices are accepted, False if cancelled.
+    """
+    index = [(choice.lower(), choice) for choice in choices]
+    selected = set(selected_choices)
+    single = group in ["Development Status", "License :: OSI Approved ::"]
+    choices_window = CHOICE_WINDOWS.get(group)
+    if choices_window is None:
+        layout = [
+            [sg.Text("Search:"), sg.Input(key="Search", enable_events=True)],
+            [
+                sg.Listbox(
+                    choices,
+                    default_values=[x for x in choices if x in selected],
+                    select_mode=sg.LISTBOX_SELECT_MODE_SINGLE
+                    if single
+                    else sg.LISTBOX_SELECT_MODE_MULTIPLE,
+                    key="Choices",
+                    enable_events=True,
+                    size=(80, 15),
+                    expand_x=True,
+                    expand_y=True,
+                )
+            ],
+            [sg.Button("Accept"), sg.Button("Cancel")],
+        ]
+        choices_window = sg.Window(
+            f"Classifiers for the {group.title()} group",
+            layout,
+            resizable=True,
+            keep_on_top=SG_KWARGS["keep_on_top"],
+            icon=SG_KWARGS["icon"],
+            enable_close_attempted_event=True,
+        )
+        CHOICE_WINDOWS[group] = choices_window
+    else:
+        # Clear the previous search and discard any cancelled changes:
+        choices_window["Search"].update(value="")
+        choices_window["Choices"].update(values=choices)
+        choices_window["Choices"].set_value([x for x in choices if x in selected])
+        choices_window.un_hide()
+    search = ""
+    shown = index
+    while True:
+        event, values = choices_window.read()
+        if event == "Choices":
+            # Only update selections for choices currently shown:
+            if single:
+                selected.clear()
+            else:
+                selected.difference_update(x[1] for x in shown)
+            selected.update(values["Choices"])
+        if event == "Search":
+            text = values["Search"]
+            # Narrow down previous results rather than starting again:
+            shown = filter_choices(shown if text.startswith(search) else index, text)
+            search = text
+            listbox = choices_window["Choices"]
+            listbox.update(values=[x[1] for x in shown])
+            listbox.set_value([x[1] for x in shown if x[1] in selected])
+        if event == "Accept":
+            selected_choices.clear()
+            selected_choices.extend(x for x in choices if x in selected)
+            choices_window.hide()
+            return True
+        if event in ["Cancel", sg.WINDOW_CLOSE_ATTEMPTED_EVENT]:
+            choices_window.hide()
+            return False
+        if event is None:
+            del CHOICE_WINDOWS[group]
             return False
@@ -0,0 +1,141 @@
+"""
+Finds a package's third party requirements by scanning its source code for
+import statements with ast, rather than importing (i.e. running) anything.
+
+Files are scanned in parallel, and the imports found are cached by file
+hash so unchanged files aren't parsed again.
+"""
+
+from .shared_functions import create_file
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from functools import lru_cache
+from pathlib import Path
+import ast
+import hashlib
+import json
+import sys
+import sysconfig
+
+try:
+    import importlib.metadata as importlib_metadata
+except ImportError:  # Python < 3.8
+    importlib_metadata = None
+
+# Folders which never contain the package's own source code:
+SKIP_DIRNAMES = ["build", "dist", "venv", "__pycache__"]
+
+# Test files' imports (e.g. pytest) aren't requirements for installing:
+TEST_PATTERNS = ["test_*.py", "*_test.py", "conftest.py"]
+
+# {sha256 of file contents: [top level modules imported]}
+IMPORT_CACHE = {}
+
+
+def get_source_files(dirpath, tests=True):
+    """
+    Returns: .py files in dirpath and subfolders, except in hidden or build
+    folders, and except test files if tests is False
+    """
+    filepaths = []
+    for filepath in Path(dirpath).rglob("*.py"):
+        parts = filepath.relative_to(dirpath).parts[:-1]
+        if any(x.startswith(".") or x in SKIP_DIRNAMES for x in parts):
+            continue
+        if not tests and any(fnmatch(filepath.name, x) for x in TEST_PATTERNS):
+            continue
+        filepaths.append(filepath)
+    return sorted(filepaths)
+
+
+def get_top_level_imports(source):
+    """ Returns: sorted top level module names from absolute imports in source """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(x.name.split(".")[0] for x in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.add(node.module.split(".")[0])
+    return sorted(modules)
+
+
+def scan_file(filepath):
+    """ Returns: top level modules imported by a file, using IMPORT_CACHE """
+    source = Path(filepath).read_bytes()
+    key = hashlib.sha256(source).hexdigest()
+    if key not in IMPORT_CACHE:
+        IMPORT_CACHE[key] = get_top_level_imports(source)
+    return IMPORT_CACHE[key]
+
+
+def get_local_modules(dirpath):
+    """ Returns: set of module and package names defined within dirpath """
+    local = {Path(dirpath).name}
+    for filepath in get_source_files(dirpath):
+        local.add(filepath.stem)
+        local.update(filepath.relative_to(dirpath).parts[:-1])
+    return local
+
+
+@lru_cache(maxsize=None)
+def get_stdlib_module_names():
+    """ Returns: frozenset of standard library module names """
+    if hasattr(sys, "stdlib_module_names"):  # Python 3.10+
+        return frozenset(sys.stdlib_module_names)
+    stdlib_dirpath = Path(sysconfig.get_paths()["stdlib"])
+    names = set(sys.builtin_module_names)
+    for path in stdlib_dirpath.iterdir():
+        if path.suffix == ".py" or (path / "__init__.py").is_file():
+            names.add(path.stem)
+    dynload_dirpath = stdlib_dirpath / "lib-dynload"
+    if dynload_dirpath.is_dir():
+        names.update(x.name.split(".")[0] for x in dynload_dirpath.iterdir())
+    return frozenset(names)
+
+
+@lru_cache(maxsize=None)
+def get_module_distributions():
+    """ Returns: {top level module: [distribution names]} for installed packages """
+    if importlib_metadata is None:
+        return {}
+    if hasattr(importlib_metadata, "packages_distributions"):  # Python 3.10+
+        return importlib_metadata.packages_distributions()
+    modules = {}
+    for distribution in importlib_metadata.distributions():
+        top_level = distribution.read_text("top_level.txt") or ""
+        for module in top_level.split():
+            modules.setdefault(module, []).append(distribution.metadata["Name"])
+    return modules
+
+
+def scan_requirements(dirpath, cache_filepath=None, max_workers=None):
+    """
+    Scans source files (except tests) in dirpath for imports of modules which
+    aren't in the standard library or dirpath itself.  Modules which aren't
+    installed are assumed to have the same name as their distribution.
+
+    cache_filepath : JSON file to load and save IMPORT_CACHE, if required
+
+    Returns: sorted distribution names e.g. ["cleverdict", "PySimpleGUI"]
+    """
+    saved = {}
+    if cache_filepath and Path(cache_filepath).is_file():
+        with open(cache_filepath, "r") as file:
+            saved = json.load(file)
+        IMPORT_CACHE.update(saved)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(scan_file, get_source_files(dirpath, tests=False))
+        modules = set().union(*results)
+    if cache_filepath and IMPORT_CACHE.keys() != saved.keys():
+        Path(cache_filepath).parent.mkdir(parents=True, exist_ok=True)
+        create_file(cache_filepath, json.dumps(IMPORT_CACHE), overwrite=True)
+    modules -= get_stdlib_module_names() | get_local_modules(dirpath)
+    distributions = get_module_distributions()
+    requirements = set()
+    for module in modules:
+        requirements.update(distributions.get(module, [module])[:1])
+    return sorted(requirements, key=str.lower)
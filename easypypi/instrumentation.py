@@ -0,0 +1,131 @@
+"""
+Lightweight timing of the main easyPyPI stages, e.g. load_defaults,
+create_essential_files, run_setup_py.
+
+Disabled by default.  To enable, either call enable() or set an environment
+variable before importing easypypi:
+
+EASYPYPI_TIMINGS=timings.jsonl  ->  append a JSON line per timed stage
+
+Timed stages are sent to every "sink" in SINKS, which can be any function
+that accepts a dictionary:
+
+{"stage", "parent", "depth", "start", "seconds", "error"}
+"""
+
+from .logger import logger
+from functools import wraps
+import atexit
+import json
+import os
+import threading
+import time
+
+SINKS = []
+ENABLED = False
+RUNNING = threading.local()  # Stack of currently running stages per thread
+
+
+class MemorySink:
+    """ Collects timing records in a list e.g. for use in tests """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+
+class JSONLinesSink:
+    """ Appends each timing record to a file as a line of JSON """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+
+    def __call__(self, record):
+        with self.lock, open(self.filepath, "a") as file:
+            file.write(json.dumps(record) + "\n")
+
+
+class SummarySink:
+    """ Aggregates timings per stage for summary tables """
+
+    def __init__(self):
+        self.timings = {}
+
+    def __call__(self, record):
+        self.timings.setdefault(record["stage"], []).append(record["seconds"])
+
+    def get_table(self):
+        """ Returns: timings summary as a text table, slowest stage first """
+        lines = [f"{'Stage':<40} {'Count':>6} {'Total':>9} {'Mean':>9} {'Max':>9}"]
+        for stage, seconds in sorted(
+            self.timings.items(), key=lambda x: sum(x[1]), reverse=True
+        ):
+            lines.append(
+                f"{stage:<40} {len(seconds):>6} {sum(seconds):>9.3f} "
+                f"{sum(seconds) / len(seconds):>9.3f} {max(seconds):>9.3f}"
+            )
+        return "\n".join(lines)
+
+    def print_table(self):
+        if self.timings:
+            logger.info("\n ⓘ  easyPyPI timings (seconds):\n\n%s", self.get_table())
+
+
+def enable(*sinks, summary=True):
+    """
+    Starts timing stages and sending the results to sinks.
+    If summary is True, also prints a summary table when Python exits.
+    """
+    global ENABLED
+    SINKS.extend(sinks)
+    if summary:
+        summary_sink = SummarySink()
+        SINKS.append(summary_sink)
+        atexit.register(summary_sink.print_table)
+    ENABLED = True
+
+
+def disable():
+    """ Stops timing and removes all sinks """
+    global ENABLED
+    ENABLED = False
+    SINKS.clear()
+
+
+def timed(function):
+    """ Decorator which times a function as a stage, if timing is enabled """
+    stage = function.__qualname__
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return function(*args, **kwargs)
+        stack = RUNNING.__dict__.setdefault("stack", [])
+        record = {
+            "stage": stage,
+            "parent": stack[-1] if stack else None,
+            "depth": len(stack),
+            "start": time.time(),
+            "error": None,
+        }
+        stack.append(stage)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except BaseException as error:
+            record["error"] = type(error).__name__
+            raise
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            stack.pop()
+            for sink in list(SINKS):
+                sink(record)
+
+    return wrapper
+
+
+if os.environ.get("EASYPYPI_TIMINGS"):
+    enable(JSONLinesSink(os.environ["EASYPYPI_TIMINGS"]))
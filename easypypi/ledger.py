@@ -0,0 +1,141 @@
+"""
+Append-only history of uploads, kept in an SQLite database in the easyPyPI
+folder, so questions like "has this version already been published?" can be
+answered instantly without querying PyPI.
+
+Each upload attempt (successful or not) is one row, which can't be changed
+or deleted afterwards:
+
+name, version, repository, filename, sha256, size, started, seconds, success
+"""
+
+from .shared_functions import get_file_hash
+from contextlib import closing
+from packaging.utils import canonicalize_name
+from pathlib import Path
+import click
+import sqlite3
+
+LEDGER_FILENAME = "publish_history.sqlite3"
+DEFAULT_LEDGER_FILEPATH = Path(click.get_app_dir("easyPyPI")) / LEDGER_FILENAME
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    filename TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    started REAL NOT NULL,
+    seconds REAL,
+    success INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_by_release ON uploads (name, version);
+CREATE TRIGGER IF NOT EXISTS uploads_no_update BEFORE UPDATE ON uploads
+BEGIN
+    SELECT RAISE(ABORT, 'The publish history is append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS uploads_no_delete BEFORE DELETE ON uploads
+BEGIN
+    SELECT RAISE(ABORT, 'The publish history is append-only');
+END;
+"""
+
+
+def connect(ledger_filepath):
+    """ Returns: connection to the ledger, creating it if it doesn't exist """
+    Path(ledger_filepath).parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(str(ledger_filepath), timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def record_upload(
+    ledger_filepath, name, version, repository, filepath, started, seconds, success
+):
+    """
+    Appends an upload attempt to the ledger.
+
+    filepath : the distribution file uploaded (if it exists, its name, size
+               and sha256 are recorded)
+    started : time.time() when the upload started
+    """
+    filename = sha256 = size = None
+    if filepath and Path(filepath).is_file():
+        filename = Path(filepath).name
+        sha256 = get_file_hash(filepath)
+        size = Path(filepath).stat().st_size
+    with closing(connect(ledger_filepath)) as connection, connection:
+        connection.execute(
+            "INSERT INTO uploads (name, version, repository, filename, sha256, "
+            "size, started, seconds, success) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                canonicalize_name(name),
+                str(version),
+                repository,
+                filename,
+                sha256,
+                size,
+                started,
+                seconds,
+                int(bool(success)),
+            ),
+        )
+
+
+def is_published(ledger_filepath, name, version, repository=None):
+    """ Returns: True if a successful upload of name/version was recorded """
+    if not Path(ledger_filepath).is_file():
+        return False
+    query = "SELECT 1 FROM uploads WHERE name = ? AND version = ? AND success = 1"
+    parameters = [canonicalize_name(name), str(version)]
+    if repository:
+        query += " AND repository = ?"
+        parameters.append(repository)
+    with closing(connect(ledger_filepath)) as connection:
+        return connection.execute(query + " LIMIT 1", parameters).fetchone() is not None
+
+
+def get_history(ledger_filepath, name=None):
+    """ Returns: list of upload dictionaries (for name, if given), oldest first """
+    if not Path(ledger_filepath).is_file():
+        return []
+    query, parameters = "SELECT * FROM uploads", []
+    if name:
+        query += " WHERE name = ?"
+        parameters.append(canonicalize_name(name))
+    with closing(connect(ledger_filepath)) as connection:
+        rows = connection.execute(query + " ORDER BY started, id", parameters)
+        return [dict(x) for x in rows]
+
+
+def get_throughput(ledger_filepath, period="%Y-%m-%d"):
+    """
+    Summarises uploads per repository over time.
+
+    period : strftime format to group by e.g. "%Y-%m" for monthly
+
+    Returns: list of {"period", "repository", "uploads", "failures", "bytes",
+             "seconds", "bytes_per_second"} in date order
+    """
+    if not Path(ledger_filepath).is_file():
+        return []
+    query = """
+        SELECT strftime(?, started, 'unixepoch') AS period, repository,
+            COUNT(*) AS uploads, SUM(success = 0) AS failures,
+            SUM(CASE WHEN success THEN size ELSE 0 END) AS bytes,
+            SUM(CASE WHEN success THEN seconds ELSE 0 END) AS seconds
+        FROM uploads GROUP BY period, repository ORDER BY period, repository
+    """
+    with closing(connect(ledger_filepath)) as connection:
+        rows = [dict(x) for x in connection.execute(query, [period])]
+    for row in rows:
+        row["bytes"] = row["bytes"] or 0
+        row["seconds"] = row["seconds"] or 0
+        row["bytes_per_second"] = (
+            row["bytes"] / row["seconds"] if row["seconds"] else None
+        )
+    return rows
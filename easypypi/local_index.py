@@ -0,0 +1,85 @@
+"""
+Helpers for a local, file-based "simple" package index (PEP 503) i.e. one
+folder per normalised project name containing .tar.gz and .whl files:
+
+index_dirpath/
+    project-name/
+        project_name-0.1.tar.gz
+        project_name-0.1-py3-none-any.whl
+"""
+
+from packaging.utils import InvalidSdistFilename
+from packaging.utils import InvalidWheelFilename
+from packaging.utils import canonicalize_name
+from packaging.utils import parse_sdist_filename
+from packaging.utils import parse_wheel_filename
+from pathlib import Path
+import shutil
+
+
+def get_project_dirpath(index_dirpath, name):
+    """ Returns: folder for a project in the local index """
+    return Path(index_dirpath) / canonicalize_name(name)
+
+
+def parse_distribution_filename(filename):
+    """
+    Returns: (normalised name, Version) for a .tar.gz/.zip or .whl filename,
+    or None if it isn't a valid distribution filename.
+    """
+    try:
+        if filename.endswith(".whl"):
+            return parse_wheel_filename(filename)[:2]
+        return parse_sdist_filename(filename)
+    except (InvalidSdistFilename, InvalidWheelFilename):
+        return None
+
+
+def get_index_versions(index_dirpath, name):
+    """ Returns: set of version strings for a project in the local index """
+    project_dirpath = get_project_dirpath(index_dirpath, name)
+    if not project_dirpath.is_dir():
+        return set()
+    versions = set()
+    for path in project_dirpath.iterdir():
+        parsed = parse_distribution_filename(path.name)
+        if parsed and parsed[0] == canonicalize_name(name):
+            versions.add(str(parsed[1]))
+    return versions
+
+
+def write_index_pages(index_dirpath):
+    """ Creates the index.html pages for the root and each project """
+    index_dirpath = Path(index_dirpath)
+    projects = sorted(x for x in index_dirpath.iterdir() if x.is_dir())
+    links = "".join(f'<a href="{x.name}/">{x.name}</a>\n' for x in projects)
+    (index_dirpath / "index.html").write_text(f"<html><body>\n{links}</body></html>\n")
+    for project_dirpath in projects:
+        files = sorted(
+            x.name
+            for x in project_dirpath.iterdir()
+            if parse_distribution_filename(x.name)
+        )
+        links = "".join(f'<a href="{x}">{x}</a>\n' for x in files)
+        (project_dirpath / "index.html").write_text(
+            f"<html><body>\n{links}</body></html>\n"
+        )
+
+
+def add_to_index(index_dirpath, filepaths):
+    """
+    Copies distribution files (.tar.gz, .whl) into the local index, replacing
+    any previous file of the same name, then updates the index pages.
+    Returns: list of new filepaths in the index
+    """
+    added = []
+    for filepath in [Path(x) for x in filepaths]:
+        parsed = parse_distribution_filename(filepath.name)
+        if not parsed:
+            continue
+        project_dirpath = get_project_dirpath(index_dirpath, parsed[0])
+        project_dirpath.mkdir(parents=True, exist_ok=True)
+        added.append(Path(shutil.copy(filepath, project_dirpath)))
+    if added:
+        write_index_pages(index_dirpath)
+    return added
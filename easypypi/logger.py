@@ -0,0 +1,81 @@
+"""
+Progress messages for easyPyPI, via the standard logging module.
+
+By default messages are printed to stdout exactly as before.  For batch runs:
+
+configure_logging(quiet=True)  ->  only warnings and errors are shown; other
+                                   messages aren't even formatted
+configure_logging(json_filepath="easypypi.jsonl")  ->  also (or instead, with
+                                   quiet=True) append JSON lines to a file
+
+The same options can be set with environment variables before importing
+easypypi: EASYPYPI_QUIET=1 and EASYPYPI_LOG_JSON=easypypi.jsonl
+"""
+
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger("easypypi")
+
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    Writes to whatever sys.stdout is when each message is logged, so output
+    still appears if stdout is redirected (e.g. to a PySimpleGUI window).
+    """
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """ Formats each log record as a single line of JSON """
+
+    def format(self, record):
+        return json.dumps(
+            {
+                "time": record.created,
+                "level": record.levelname,
+                "function": record.funcName,
+                "message": record.getMessage().strip(),
+            }
+        )
+
+
+def configure_logging(quiet=False, json_filepath=None, level=logging.INFO):
+    """
+    Replaces any existing easyPyPI log handlers.
+
+    quiet : Only show warnings and errors on screen
+    json_filepath : Also write every message at level (or above) as JSON lines
+    level : Lowest level to handle at all e.g. logging.DEBUG
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    console = StdoutHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+    console.setLevel(logging.WARNING if quiet else level)
+    logger.addHandler(console)
+    if json_filepath:
+        file_handler = logging.FileHandler(json_filepath, encoding="utf-8")
+        file_handler.setFormatter(JSONLinesFormatter())
+        file_handler.setLevel(level)
+        logger.addHandler(file_handler)
+    # The logger's own level is the lowest any handler needs, so messages
+    # nobody will see are discarded before being formatted:
+    logger.setLevel(min(x.level for x in logger.handlers))
+    logger.propagate = False
+
+
+configure_logging(
+    quiet=bool(os.environ.get("EASYPYPI_QUIET")),
+    json_filepath=os.environ.get("EASYPYPI_LOG_JSON"),
+)
@@ -0,0 +1,103 @@
+"""
+Estimates what setup.py will put in the .tar.gz archive, so large or
+duplicate files can be spotted before running sdist and uploading.
+"""
+
+from fnmatch import fnmatch
+from pathlib import Path
+import hashlib
+import zlib
+
+# Files in the package root which setuptools includes by default:
+ROOT_FILES = ["setup.py", "setup.cfg", "pyproject.toml", "MANIFEST.in"]
+ROOT_PATTERNS = ["README*", "LICEN[CS]E*"]
+
+# Mirrors package_data in setup_template.py ("" applies to every package):
+PACKAGE_DATA = {"": ["*.md", "*.json", "*.png", "*.ico"], "{name}": ["*.*"]}
+
+# Files larger than this are flagged in the report:
+LARGE_FILE_BYTES = 1024 * 1024
+
+
+def find_packages(setup_dirpath):
+    """
+    Finds package folders (i.e. containing __init__.py) like
+    setuptools.find_packages, skipping hidden folders and build output.
+    Returns: dictionary of {dotted.package.name: folder path}
+    """
+    packages = {}
+    for init in sorted(Path(setup_dirpath).rglob("__init__.py")):
+        relative = init.parent.relative_to(setup_dirpath)
+        if not relative.parts or any(
+            x.startswith(".") or x.endswith(".egg-info") or x in ["build", "dist"]
+            for x in relative.parts
+        ):
+            continue
+        packages[".".join(relative.parts)] = init.parent
+    return packages
+
+
+def get_sdist_files(setup_dirpath, name):
+    """
+    Lists files which will be included in the source distribution, based on
+    the default setuptools rules and package_data in setup_template.py
+    """
+    setup_dirpath = Path(setup_dirpath)
+    files = []
+    for path in sorted(setup_dirpath.iterdir()):
+        if path.is_file() and (
+            path.name in ROOT_FILES or any(fnmatch(path.name, x) for x in ROOT_PATTERNS)
+        ):
+            files.append(path)
+    for package, dirpath in find_packages(setup_dirpath).items():
+        patterns = ["*.py"] + PACKAGE_DATA[""]
+        if package == name:
+            patterns += PACKAGE_DATA["{name}"]
+        for path in sorted(dirpath.iterdir()):
+            if path.is_file() and any(fnmatch(path.name, x) for x in patterns):
+                files.append(path)
+    return files
+
+
+def get_package_data_report(setup_dirpath, name):
+    """
+    Measures each file in the source distribution, estimating its compressed
+    size and flagging large or duplicate files.  Empty files (e.g. several
+    __init__.py files) aren't flagged as duplicates of each other.
+
+    Returns: list of dictionaries sorted by compressed size (largest first):
+    {"path", "size", "compressed_size", "sha256", "flags"}
+    """
+    report = []
+    first_seen = {}
+    for path in get_sdist_files(setup_dirpath, name):
+        data = path.read_bytes()
+        entry = {
+            "path": path.relative_to(setup_dirpath),
+            "size": len(data),
+            "compressed_size": len(zlib.compress(data, 9)),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "flags": [],
+        }
+        if entry["size"] > LARGE_FILE_BYTES:
+            entry["flags"].append("large")
+        if entry["sha256"] in first_seen:
+            entry["flags"].append(f"duplicate of {first_seen[entry['sha256']]}")
+        elif entry["size"]:  # Empty files are identical, but not duplicates
+            first_seen[entry["sha256"]] = entry["path"]
+        report.append(entry)
+    return sorted(report, key=lambda x: x["compressed_size"], reverse=True)
+
+
+def format_package_data_report(report):
+    """ Returns: report as a text table with totals """
+    lines = [f"{'Size':>12} {'Compressed':>12}  File"]
+    for entry in report:
+        flags = f"  ⚠ {', '.join(entry['flags'])}" if entry["flags"] else ""
+        lines.append(
+            f"{entry['size']:>12,} {entry['compressed_size']:>12,}  {entry['path']}{flags}"
+        )
+    total = sum(x["size"] for x in report)
+    compressed = sum(x["compressed_size"] for x in report)
+    lines.append(f"{total:>12,} {compressed:>12,}  Total ({len(report)} files)")
+    return "\n".join(lines)
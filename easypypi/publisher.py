@@ -0,0 +1,438 @@
+"""
+Publishes several interdependent packages (e.g. found by discovery) in
+dependency order:
+
+1. Every package is built at the same time.
+2. Packages are uploaded in "waves": each wave is every package whose own
+   requirements (among the packages being published) are already uploaded,
+   and all uploads in a wave run at the same time.
+
+If a package fails to build or upload, packages depending on it (directly or
+indirectly) are skipped, but unrelated packages are still published.
+
+python -m easypypi.publisher path/to/root --repository testpypi
+
+Uploads are recorded in the publish history (see ledger), and packages whose
+version is already recorded as uploaded are skipped.  Add --dry-run to build
+everything and estimate the upload time instead.
+
+upload_to_targets uploads the same files to several repositories (or local
+indexes, as file:// URLs) at the same time e.g. Test PyPI and PyPI.
+"""
+
+from .discovery import DEFAULT_INDEX_FILEPATH
+from .discovery import discover_packages
+from .dryrun import UPLOAD_BYTES_PER_SECOND
+from .dryrun import UPLOAD_OVERHEAD_SECONDS
+from .dryrun import dry_run_directory
+from .dryrun import format_dry_run_report
+from .ledger import DEFAULT_LEDGER_FILEPATH
+from .ledger import is_published
+from .ledger import record_upload
+from .local_index import add_to_index
+from .logger import logger
+from .pyproject import build_sdist
+from .readme import DEFAULT_CACHE_FILEPATH
+from .readme import check_readme
+from .resolver import parse_requirements
+from .validation import format_validation_report
+from .validation import validate_metadata
+from .versions import read_metadata_fields
+from concurrent.futures import ThreadPoolExecutor
+from packaging.utils import canonicalize_name
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import click
+import os
+import subprocess
+import sys
+import time
+
+
+def get_dependency_graph(packages):
+    """
+    packages : list of dictionaries with "name" and "requirements" keys
+
+    Returns: {canonical name: set of canonical names of the other packages
+    it requires}, ignoring any requirements not in packages
+    """
+    names = {canonicalize_name(x["name"]) for x in packages}
+    graph = {}
+    for package in packages:
+        name = canonicalize_name(package["name"])
+        requirements, _ = parse_requirements(package.get("requirements") or [])
+        graph[name] = {
+            canonicalize_name(x.name)
+            for x in requirements
+            if canonicalize_name(x.name) in names - {name}
+        }
+    return graph
+
+
+def get_waves(graph):
+    """
+    Groups a dependency graph into waves, each only depending on earlier ones.
+    Raises ValueError if there's a circular dependency.
+
+    Returns: list of sorted lists of names
+    """
+    remaining = {name: set(dependencies) for name, dependencies in graph.items()}
+    waves = []
+    while remaining:
+        wave = sorted(name for name, requires in remaining.items() if not requires)
+        if not wave:
+            cycle = ", ".join(sorted(remaining))
+            raise ValueError(f"Circular dependency between: {cycle}")
+        waves.append(wave)
+        for name in wave:
+            del remaining[name]
+        for dependencies in remaining.values():
+            dependencies.difference_update(wave)
+    return waves
+
+
+def default_build(package):
+    """
+    Validates metadata (see validation) and checks README.md (see
+    readme.check_readme), then builds a .tar.gz for a discovered package.
+
+    Returns: Path of the new .tar.gz, or None if the build failed
+    Raises: ValueError describing any problems found before building
+    """
+    setup_dirpath = Path(package["path"]).parent
+    problems = validate_metadata(read_metadata_fields(package["path"]))
+    if problems:
+        report = format_validation_report(problems).replace("\n", "; ")
+        raise ValueError(f"Invalid metadata: {report}")
+    problems = check_readme(setup_dirpath / "README.md", DEFAULT_CACHE_FILEPATH)
+    if problems:
+        raise ValueError("README.md problems: " + "; ".join(problems))
+    return build_sdist(setup_dirpath)
+
+
+def twine_upload(filepaths, repository="testpypi", username=None, password=None):
+    """
+    Uploads distribution files with twine, without prompting; Credentials
+    come from username and password if given, otherwise from keyring,
+    .pypirc or TWINE_USERNAME/TWINE_PASSWORD.
+
+    repository : name of a repository in .pypirc, or a URL
+
+    Returns: True if successful
+    """
+    option = "--repository-url" if "://" in repository else "--repository"
+    env = dict(os.environ)
+    if username and password:
+        env.update(TWINE_USERNAME=username, TWINE_PASSWORD=password)
+    result = subprocess.run(
+        [sys.executable, "-m", "twine", "upload", "--non-interactive"]
+        + [option, repository]
+        + [str(x) for x in filepaths],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode:
+        logger.error("\n ⚠  Problem uploading with Twine:\n%s", result.stderr)
+    return result.returncode == 0
+
+
+def get_local_index_dirpath(target):
+    """
+    Returns: folder for a local index target (a Path, or a file:// URL),
+    or None for repositories which twine uploads to
+    """
+    if isinstance(target, Path):
+        return target
+    if str(target).startswith("file://"):
+        return Path(url2pathname(urlparse(str(target)).path))
+    return None
+
+
+def get_target_name(target):
+    """ Returns: target as a string, with local indexes as file:// URLs """
+    index_dirpath = get_local_index_dirpath(target)
+    return index_dirpath.resolve().as_uri() if index_dirpath else str(target)
+
+
+def upload_to_target(filepaths, target, username=None, password=None):
+    """
+    Uploads distribution files to a repository with twine, or copies them
+    into a local index (see get_local_index_dirpath).
+
+    Returns: True if successful
+    """
+    index_dirpath = get_local_index_dirpath(target)
+    if index_dirpath:
+        return len(add_to_index(index_dirpath, filepaths)) == len(filepaths)
+    return twine_upload(filepaths, target, username, password)
+
+
+def upload_to_targets(filepaths, targets, upload=None):
+    """
+    Uploads the same distribution files to several targets at the same time.
+
+    targets : repository names in .pypirc (e.g. "testpypi", "pypi"), URLs, or
+              local indexes (see get_local_index_dirpath)
+    upload : function(filepaths, target) returning True if successful
+             (default: upload_to_target)
+
+    Returns: {target: {"status", "error", "started", "seconds"}} where
+    status is "published" or "upload failed"
+    """
+    upload = upload or upload_to_target
+
+    def run(target):
+        started = time.time()
+        success, error = run_task(upload, filepaths, target)
+        return {
+            "status": "published" if success else "upload failed",
+            "error": error,
+            "started": started,
+            "seconds": time.time() - started,
+        }
+
+    with ThreadPoolExecutor(max_workers=len(targets) or 1) as executor:
+        return dict(zip(targets, executor.map(run, targets)))
+
+
+def run_task(function, *args):
+    """ Returns: (result, error) so failures don't stop other threads' tasks """
+    try:
+        return function(*args), None
+    except Exception as error:
+        return None, error
+
+
+def publish_packages(
+    packages,
+    build=None,
+    upload=None,
+    max_workers=None,
+    repository=None,
+    ledger_filepath=None,
+):
+    """
+    Builds all packages in parallel, then uploads them in dependency order.
+
+    packages : list of dictionaries with "name" and "requirements" keys (and
+               "path" for the default build) e.g. from discover_packages
+    build : function(package) returning an artifact, or None if it failed
+            (default: build a .tar.gz with build_sdist)
+    upload : function(package, artifact) returning True if successful
+             (default: twine_upload to repository)
+    max_workers : maximum number of builds, or uploads in a wave, at once
+    repository : name of the repository uploaded to, for the default upload
+                 (default: "testpypi") and the ledger - required with a custom
+                 upload function if ledger_filepath is given
+    ledger_filepath : publish history (see ledger) to record uploads in, and
+                      to check for packages already published.  Packages
+                      without a version are skipped.
+
+    Returns: {canonical name: {"status", "artifact", "error"}} where status is
+    "published", "already published", "build failed", "upload failed", or
+    "skipped" (in which case error explains why)
+    """
+    if ledger_filepath and upload and not repository:
+        raise ValueError("repository is required to record uploads in the ledger")
+    repository = repository or "testpypi"
+    build = build or default_build
+    upload = upload or (lambda package, artifact: twine_upload([artifact], repository))
+    packages = {canonicalize_name(x["name"]): x for x in packages}
+    graph = get_dependency_graph(list(packages.values()))
+    waves = get_waves(graph)
+    results = {}
+    if ledger_filepath:
+        for name, package in packages.items():
+            version = package.get("version")
+            if not version:
+                results[name] = {
+                    "status": "skipped",
+                    "artifact": None,
+                    "error": "No version to check against the publish history",
+                }
+            elif is_published(ledger_filepath, name, version, repository):
+                results[name] = {
+                    "status": "already published",
+                    "artifact": None,
+                    "error": None,
+                }
+    to_build = [x for name, x in packages.items() if name not in results]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        builds = executor.map(lambda x: run_task(build, x), to_build)
+        builds = dict(zip([canonicalize_name(x["name"]) for x in to_build], builds))
+
+    def upload_and_record(name):
+        artifact = builds[name][0]
+        started = time.time()
+        success, error = run_task(upload, packages[name], artifact)
+        if ledger_filepath:
+            version = packages[name].get("version")
+            seconds = time.time() - started
+            record_upload(
+                ledger_filepath,
+                name,
+                version,
+                repository,
+                artifact,
+                started,
+                seconds,
+                success,
+            )
+        return success, error
+
+    for name, (artifact, error) in builds.items():
+        if not artifact:
+            logger.warning("\n ⚠  Unable to build %s: %s", name, error or "")
+            results[name] = {
+                "status": "build failed",
+                "artifact": None,
+                "error": error,
+            }
+    for number, wave in enumerate(waves, 1):
+        ready = []
+        for name in wave:
+            if name in results:
+                continue
+            failed = sorted(
+                x
+                for x in graph[name]
+                if results[x]["status"] not in ["published", "already published"]
+            )
+            if failed:
+                results[name] = {
+                    "status": "skipped",
+                    "artifact": builds[name][0],
+                    "error": f"Requires unpublished: {', '.join(failed)}",
+                }
+                continue
+            ready.append(name)
+        if not ready:
+            continue
+        logger.info("\n> Uploading wave %s: %s", number, ", ".join(ready))
+        with ThreadPoolExecutor(max_workers=max_workers or len(ready)) as executor:
+            uploads = executor.map(upload_and_record, ready)
+            for name, (success, error) in zip(ready, uploads):
+                results[name] = {
+                    "status": "published" if success else "upload failed",
+                    "artifact": builds[name][0],
+                    "error": error,
+                }
+    return results
+
+
+def dry_run_packages(
+    packages, max_workers=None, bytes_per_second=UPLOAD_BYTES_PER_SECOND
+):
+    """
+    Runs the local stages of publishing (see dryrun) for all packages in
+    parallel, without uploading anything.
+
+    packages : list of dictionaries with "name", "requirements" and "path" keys
+               e.g. from discover_packages
+
+    Returns: {"reports": {canonical name: report from dry_run_directory},
+              "local_seconds": time taken, "upload_seconds": estimate for
+              uploading in waves, with packages in a wave sharing bandwidth}
+    """
+    packages = {canonicalize_name(x["name"]): x for x in packages}
+    waves = get_waves(get_dependency_graph(list(packages.values())))
+
+    def run(package):
+        return dry_run_directory(
+            Path(package["path"]).parent,
+            lambda: read_metadata_fields(package["path"]),
+            bytes_per_second=bytes_per_second,
+        )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        reports = dict(zip(packages, executor.map(run, packages.values())))
+    local_seconds = time.perf_counter() - start
+    upload_seconds = 0
+    for wave in waves:
+        size = sum(sum(reports[x]["artifacts"].values()) for x in wave)
+        upload_seconds += size / bytes_per_second + UPLOAD_OVERHEAD_SECONDS
+    return {
+        "reports": reports,
+        "local_seconds": local_seconds,
+        "upload_seconds": upload_seconds,
+    }
+
+
+def format_target_report(results):
+    """ Returns: results from upload_to_targets as a text table """
+    lines = [f"{'Target':<40} {'Status':<18} {'Seconds':>8} Details"]
+    for target, result in results.items():
+        lines.append(
+            f"{str(target):<40} {result['status']:<18} "
+            f"{result['seconds']:>8.2f} {result['error'] or ''}"
+        )
+    return "\n".join(lines)
+
+
+def format_publish_report(results):
+    """ Returns: results from publish_packages as a text table """
+    lines = [f"{'Name':<30} {'Status':<14} Details"]
+    for name, result in results.items():
+        details = result["error"] or result["artifact"] or ""
+        lines.append(f"{name:<30} {result['status']:<14} {details}")
+    return "\n".join(lines)
+
+
+@click.command()
+@click.argument("root", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "--repository",
+    default="testpypi",
+    show_default=True,
+    help="Repository name in .pypirc, or URL, to upload to.",
+)
+@click.option(
+    "--index",
+    "index_filepath",
+    type=click.Path(dir_okay=False),
+    default=str(DEFAULT_INDEX_FILEPATH),
+    show_default=True,
+    help="JSON file to keep the index of packages in.",
+)
+@click.option(
+    "--ledger",
+    "ledger_filepath",
+    type=click.Path(dir_okay=False),
+    default=str(DEFAULT_LEDGER_FILEPATH),
+    show_default=True,
+    help="Publish history to record uploads in and skip packages already uploaded.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Only build, and estimate how long uploading would take.",
+)
+def main(root, repository, index_filepath, ledger_filepath, dry_run):
+    """ Builds and uploads every package managed by easyPyPI under ROOT """
+    packages = discover_packages(root, index_filepath)
+    try:
+        if dry_run:
+            results = dry_run_packages(packages)
+        else:
+            results = publish_packages(
+                packages, repository=repository, ledger_filepath=ledger_filepath
+            )
+    except ValueError as error:  # e.g. a circular dependency
+        logger.error("\n ⚠  Unable to publish:\n  %s", error)
+        sys.exit(1)
+    if dry_run:
+        logger.info(
+            "\n%s\n\nTook %.1fs in parallel; uploading in waves would take ~%.1fs",
+            format_dry_run_report(results["reports"].values()),
+            results["local_seconds"],
+            results["upload_seconds"],
+        )
+    else:
+        logger.info("\n%s", format_publish_report(results))
+
+
+if __name__ == "__main__":
+    main()
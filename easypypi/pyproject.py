@@ -0,0 +1,248 @@
+"""
+pyproject.toml (PEP 621) metadata, as an alternative to the NAME = "..."
+lines in setup.py.  Metadata is written from and read back to the same
+Package attributes as SETUP_FIELDS, and packages are built through the
+PEP 517 hooks of setuptools.build_meta without running setup.py.
+"""
+
+from .logger import logger
+from pathlib import Path
+import json
+import re
+import subprocess
+import sys
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+PYPROJECT_FILENAME = "pyproject.toml"
+
+PYPROJECT_HEADER = [
+    "# Auto-generated by easyPyPI: https://github.com/PFython/easypypi",
+    "# easyPyPI rewrites its own tables; other tables and [project] keys are kept.",
+]
+
+# Tables written by create_pyproject_text which replace any existing ones:
+MANAGED_TABLES = [
+    "project",
+    "project.urls",
+    "tool.setuptools.packages.find",
+    "tool.setuptools.package-data",
+    "tool.easypypi",
+]
+
+TABLE_PATTERN = re.compile(r"^\[\[?\s*([\w.\-\" ]+?)\s*\]\]?\s*(#.*)?$")
+KEY_PATTERN = re.compile(r"^(\"[^\"]+\"|[A-Za-z0-9_-]+)\s*=")
+
+BUILD_SYSTEM = {
+    "requires": ["setuptools>=61.0", "wheel"],
+    "build-backend": "setuptools.build_meta",
+}
+
+# Mirrors package_data in setup_template.py ("*" applies to every package):
+PYPROJECT_PACKAGE_DATA = {"*": ["*.md", "*.json", "*.png", "*.ico"], "{name}": ["*.*"]}
+
+
+def comma_split(text):
+    """ Returns: list of non-empty strings from a comma separated string """
+    if isinstance(text, list):
+        return [x.strip() for x in text if x.strip()]
+    return [x.strip() for x in (text or "").split(",") if x.strip()]
+
+
+def format_toml_key(key):
+    """ Returns: key, quoted only if it isn't a valid TOML bare key """
+    if re.fullmatch(r"[A-Za-z0-9_-]+", key):
+        return key
+    return json.dumps(key, ensure_ascii=False)
+
+
+def format_toml_value(value):
+    """ Returns: TOML for a string, list of strings, or inline table """
+    if isinstance(value, dict):
+        items = [
+            f"{format_toml_key(key)} = {format_toml_value(x)}"
+            for key, x in value.items()
+        ]
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, list):
+        if all(isinstance(x, str) for x in value) and len(value) > 2:
+            lines = [f"    {format_toml_value(x)},\n" for x in value]
+            return "[\n" + "".join(lines) + "]"
+        return "[" + ", ".join(format_toml_value(x) for x in value) + "]"
+    # JSON string escapes are all valid in TOML basic strings:
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+def format_toml_table(name, table):
+    """ Returns: lines for a [table] with one key = value per line """
+    lines = ["", f"[{name}]"]
+    for key, value in table.items():
+        lines.append(f"{format_toml_key(key)} = {format_toml_value(value)}")
+    return lines
+
+
+def create_pyproject_text(values):
+    """
+    values : Package or dictionary with Package attribute names as keys
+
+    Returns: pyproject.toml contents
+    """
+    name = values.get("name") or ""
+    url = values.get("url") or ""
+    author = {"name": values.get("author"), "email": values.get("email")}
+    author = {key: value for key, value in author.items() if value}
+    project = {
+        "name": name,
+        "version": values.get("version") or "",
+        "description": values.get("description") or "",
+        "readme": "README.md",
+        "license": {"text": values.get("license_name_github") or ""},
+        "authors": [author] if author else [],
+        "keywords": comma_split(values.get("keywords")),
+        "classifiers": comma_split(values.get("classifiers")),
+        "dependencies": comma_split(values.get("requirements")),
+    }
+    urls = {"Homepage": url, "Download": f"{url}/archive/{project['version']}.tar.gz"}
+    package_data = {
+        key.format(name=name): value for key, value in PYPROJECT_PACKAGE_DATA.items()
+    }
+    lines = list(PYPROJECT_HEADER)
+    lines += format_toml_table("build-system", BUILD_SYSTEM)
+    lines += format_toml_table("project", project)
+    lines += format_toml_table("project.urls", urls if url else {})
+    lines += format_toml_table("tool.setuptools.packages.find", {})
+    lines += format_toml_table("tool.setuptools.package-data", package_data)
+    lines += format_toml_table(
+        "tool.easypypi", {"Github_username": values.get("Github_username") or ""}
+    )
+    return "\n".join(lines) + "\n"
+
+
+def is_managed_pyproject(filepath):
+    """ Returns: True if pyproject.toml starts with the easyPyPI header """
+    with open(filepath, "r") as file:
+        return file.readline().startswith(PYPROJECT_HEADER[0])
+
+
+def split_toml_tables(text):
+    """
+    Returns: list of [table name, lines] in order, starting with [None, lines]
+    for any lines before the first table
+    """
+    tables = [[None, []]]
+    for line in text.splitlines():
+        match = TABLE_PATTERN.match(line)
+        if match:
+            tables.append([match.group(1).replace('"', ""), [line]])
+        else:
+            tables[-1][1].append(line)
+    return tables
+
+
+def split_toml_keys(lines):
+    """ Returns: {key: lines} for each key = value (over one or more lines) """
+    keys, key = {}, None
+    for line in lines:
+        match = KEY_PATTERN.match(line)
+        if match:
+            key = match.group(1).strip('"')
+            keys[key] = []
+        if key and line.strip():
+            keys[key].append(line)
+    return keys
+
+
+def merge_pyproject_text(old_text, new_text):
+    """
+    Combines new_text from create_pyproject_text with anything in old_text
+    easyPyPI doesn't manage, so other tables (e.g. [tool.black], a customised
+    [build-system]) and [project] keys (e.g. requires-python) are kept as is.
+
+    Returns: merged pyproject.toml contents
+    """
+    old_tables = split_toml_tables(old_text)
+    new_tables = split_toml_tables(new_text)
+    new_names = [name for name, lines in new_tables]
+    kept = {name: lines for name, lines in old_tables[1:] if name not in MANAGED_TABLES}
+    merged = []
+    for name, lines in new_tables:
+        if name == "project":
+            new_keys = split_toml_keys(lines)
+            for old_name, old_lines in old_tables:
+                if old_name == "project":
+                    for key, key_lines in split_toml_keys(old_lines).items():
+                        if key not in new_keys:
+                            lines = lines + key_lines
+        merged += kept.get(name, lines) if name else lines
+    for name, lines in old_tables[1:]:
+        if name not in MANAGED_TABLES and name not in new_names:
+            merged += [""] + lines if merged[-1].strip() else lines
+    return "\n".join(merged).rstrip() + "\n"
+
+
+def set_pyproject_version(text, version):
+    """ Returns: text with only the version in its [project] table changed """
+    lines, table = text.splitlines(), None
+    for index, line in enumerate(lines):
+        match = TABLE_PATTERN.match(line)
+        if match:
+            table = match.group(1).replace('"', "")
+        elif table == "project" and split_toml_keys([line]).get("version"):
+            lines[index] = f"version = {format_toml_value(version)}"
+            break
+    return "\n".join(lines) + "\n"
+
+
+def read_pyproject_fields(filepath):
+    """
+    Reads metadata from pyproject.toml in one pass with a TOML parser.
+    Returns: dictionary of {Package attribute name: value} like read_setup_fields
+    """
+    with open(filepath, "rb") as file:
+        data = tomllib.load(file)
+    project = data.get("project", {})
+    license = project.get("license", {})
+    if isinstance(license, dict):
+        license = license.get("text")
+    authors = project.get("authors") or [{}]
+    tool = data.get("tool", {}).get("easypypi", {})
+    values = {
+        "name": project.get("name"),
+        "version": project.get("version"),
+        "description": project.get("description"),
+        "license_name_github": license,
+        "author": authors[0].get("name"),
+        "email": authors[0].get("email"),
+        "url": project.get("urls", {}).get("Homepage"),
+        "keywords": ", ".join(project.get("keywords", [])),
+        "classifiers": ", ".join(project.get("classifiers", [])),
+        "requirements": ", ".join(project.get("dependencies", [])),
+        "Github_username": tool.get("Github_username"),
+    }
+    return {key: value for key, value in values.items() if value is not None}
+
+
+def build_sdist(setup_dirpath):
+    """
+    Creates a .tar.gz distribution in setup_dirpath/dist by calling the PEP 517
+    build_sdist hook directly, in a new process but without build isolation.
+
+    Returns: Path of the new .tar.gz file, or None if the build failed
+    """
+    dist_dirpath = Path(setup_dirpath) / "dist"
+    script = "from setuptools import build_meta; print(build_meta.build_sdist(%r))"
+    result = subprocess.run(
+        [sys.executable, "-c", script % str(dist_dirpath)],
+        cwd=setup_dirpath,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        logger.error("\n ⚠  Build failed:\n%s", result.stderr)
+        return None
+    sdist_filepath = dist_dirpath / result.stdout.strip().splitlines()[-1]
+    logger.info("\n✓ Created distribution file:\n  %s", sdist_filepath)
+    return sdist_filepath
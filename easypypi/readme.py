@@ -0,0 +1,134 @@
+"""
+Offline check that README.md will display properly on PyPI (like running
+"twine check" before uploading) so a broken README is found before it's
+published.
+
+If readme_renderer (installed with twine) can render markdown, README.md is
+rendered exactly as PyPI does; otherwise some simpler checks are used.
+Problems stop uploads, but warnings (e.g. images which won't display) don't.
+
+Results are cached by a hash of README.md's contents, so unchanged READMEs
+aren't checked again.  The cache file is only read once per session, and
+only the most recently used README_CACHE_SIZE results are kept.
+"""
+
+from .logger import logger
+from .shared_functions import create_file
+from pathlib import Path
+import click
+import hashlib
+import json
+import re
+import threading
+
+try:
+    import readme_renderer.markdown
+except ImportError:
+    readme_renderer = None
+
+README_CACHE_FILENAME = "readme_checks.json"
+DEFAULT_CACHE_FILEPATH = Path(click.get_app_dir("easyPyPI")) / README_CACHE_FILENAME
+
+# {sha256 of renderer and README.md contents: {"problems", "warnings"}} with
+# the most recently used last:
+README_CACHE = {}
+README_CACHE_SIZE = 500
+README_CACHE_LOCK = threading.Lock()
+# Cache files already loaded into README_CACHE:
+LOADED_CACHE_FILEPATHS = set()
+
+PLACEHOLDER_PATTERN = re.compile(r"\{self\.\w+\}")
+FENCE_PATTERN = re.compile(r"^ {0,3}(```|~~~)", re.MULTILINE)
+IMAGE_PATTERN = re.compile(r"!\[[^\]]*\]\(\s*([^)\s]+)")
+
+
+def get_renderer_name():
+    """ Returns: name of the markdown renderer which check_readme_text will use """
+    if readme_renderer and readme_renderer.markdown.variants:
+        return "readme_renderer " + ", ".join(sorted(readme_renderer.markdown.variants))
+    return "easyPyPI"
+
+
+def check_readme_text(text):
+    """ Returns: list of problems which would stop README.md displaying on PyPI """
+    if not text.strip():
+        return ["README.md is empty"]
+    problems = []
+    placeholders = sorted(set(PLACEHOLDER_PATTERN.findall(text)))
+    if placeholders:
+        problems.append(
+            f"Template placeholders not replaced: {', '.join(placeholders)}"
+        )
+    if get_renderer_name() != "easyPyPI":
+        if readme_renderer.markdown.render(text) is None:
+            problems.append("README.md can't be rendered as markdown for PyPI")
+    elif len(FENCE_PATTERN.findall(text)) % 2:
+        problems.append("A code block (```) isn't closed")
+    return problems
+
+
+def get_readme_warnings(text):
+    """ Returns: list of things which won't display on PyPI, but don't stop it """
+    warnings = []
+    for url in IMAGE_PATTERN.findall(text):
+        if not url.startswith(("http://", "https://", "data:")):
+            warnings.append(f"Relative image links don't display on PyPI: {url}")
+    return warnings
+
+
+def load_readme_cache(cache_filepath):
+    """ Adds results saved in cache_filepath to README_CACHE, once per session """
+    if str(cache_filepath) in LOADED_CACHE_FILEPATHS:
+        return
+    LOADED_CACHE_FILEPATHS.add(str(cache_filepath))
+    if Path(cache_filepath).is_file():
+        with open(cache_filepath, "r") as file:
+            saved = json.load(file)
+        for key, value in saved.items():
+            if isinstance(value, dict):  # i.e. not from an older easyPyPI
+                README_CACHE.setdefault(key, value)
+
+
+def check_readme(filepath, cache_filepath=None):
+    """
+    Checks README.md, reusing results for unchanged contents from
+    README_CACHE (and cache_filepath, if given).  Warnings are logged.
+
+    Returns: list of problems, or [] if README.md is fine
+    """
+    filepath = Path(filepath)
+    if not filepath.is_file():
+        return [f"{filepath.name} not found"]
+    contents = filepath.read_bytes()
+    sha256 = hashlib.sha256(get_renderer_name().encode() + b"\0" + contents)
+    key = sha256.hexdigest()
+    with README_CACHE_LOCK:
+        if cache_filepath:
+            load_readme_cache(cache_filepath)
+        result = README_CACHE.pop(key, None)
+    if result is None:
+        try:
+            text = contents.decode("utf-8")
+        except UnicodeDecodeError:
+            result = {"problems": [f"{filepath.name} isn't UTF-8 encoded"]}
+            result["warnings"] = []
+        else:
+            result = {
+                "problems": check_readme_text(text),
+                "warnings": get_readme_warnings(text),
+            }
+        with README_CACHE_LOCK:
+            README_CACHE[key] = result
+            while len(README_CACHE) > README_CACHE_SIZE:
+                README_CACHE.pop(next(iter(README_CACHE)))
+            if cache_filepath:
+                Path(cache_filepath).parent.mkdir(parents=True, exist_ok=True)
+                create_file(cache_filepath, json.dumps(README_CACHE), overwrite=True)
+    else:
+        with README_CACHE_LOCK:
+            README_CACHE[key] = result  # Now the most recently used
+    if result["warnings"]:
+        logger.warning(
+            "\n ⚠  Warnings for %s:\n%s", filepath, "\n".join(result["warnings"])
+        )
+    return result["problems"]
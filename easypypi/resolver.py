@@ -0,0 +1,185 @@
+"""
+Offline check that requirements can be resolved from the distributions
+already in a local index and/or wheelhouse, without running pip.
+
+Names, versions and dependencies (Requires-Dist) of every distribution file
+are kept in a JSON metadata store, so only new or changed files are opened:
+
+{filepath: {"size", "mtime_ns", "name", "version", "requires"}}
+"""
+
+from .local_index import parse_distribution_filename
+from .shared_functions import create_file
+from collections import defaultdict
+from collections import deque
+from email.parser import HeaderParser
+from packaging.requirements import InvalidRequirement
+from packaging.requirements import Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+from pathlib import Path
+import json
+import tarfile
+import zipfile
+
+
+def read_metadata_text(filepath):
+    """
+    Returns: METADATA from a wheel, or PKG-INFO from an sdist (which only
+    lists Requires-Dist for metadata version 2.2 onwards), or "" if not found.
+    """
+    filepath = Path(filepath)
+    if filepath.suffix in [".whl", ".zip"]:
+        with zipfile.ZipFile(filepath) as archive:
+            for name in archive.namelist():
+                if name.endswith((".dist-info/METADATA", "/PKG-INFO")):
+                    if name.count("/") == 1:
+                        return archive.read(name).decode("utf-8", "replace")
+    else:
+        with tarfile.open(filepath) as archive:
+            for member in archive:
+                if member.name.endswith("/PKG-INFO") and member.name.count("/") == 1:
+                    text = archive.extractfile(member).read()
+                    return text.decode("utf-8", "replace")
+    return ""
+
+
+def read_requires(filepath):
+    """ Returns: list of Requires-Dist strings for a distribution file """
+    try:
+        text = read_metadata_text(filepath)
+    except (OSError, tarfile.TarError, zipfile.BadZipFile):
+        return []
+    return HeaderParser().parsestr(text).get_all("Requires-Dist") or []
+
+
+def update_metadata_store(dirpaths, store_filepath=None):
+    """
+    Scans local index and/or wheelhouse folders for distribution files,
+    reading metadata only for files not already in the store.
+
+    store_filepath : JSON file to load and save the store, if required
+
+    Returns: {canonical name: {version: [Requires-Dist strings]}}
+    """
+    cached = {}
+    if store_filepath and Path(store_filepath).is_file():
+        with open(store_filepath, "r") as file:
+            cached = json.load(file)
+    entries = {}
+    for dirpath in dirpaths:
+        if not Path(dirpath).is_dir():
+            continue
+        for filepath in Path(dirpath).rglob("*"):
+            parsed = parse_distribution_filename(filepath.name)
+            if not parsed or not filepath.is_file():
+                continue
+            stat = filepath.stat()
+            signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            entry = cached.get(str(filepath), {})
+            if any(entry.get(key) != value for key, value in signature.items()):
+                entry = {
+                    **signature,
+                    "name": str(parsed[0]),
+                    "version": str(parsed[1]),
+                    "requires": read_requires(filepath),
+                }
+            entries[str(filepath)] = entry
+    if store_filepath and entries != cached:
+        Path(store_filepath).parent.mkdir(parents=True, exist_ok=True)
+        create_file(store_filepath, json.dumps(entries), overwrite=True)
+    store = defaultdict(dict)
+    for entry in entries.values():
+        store[entry["name"]][entry["version"]] = entry["requires"]
+    return dict(store)
+
+
+def parse_requirements(requirements):
+    """
+    requirements : comma separated string (like REQUIREMENTS) or list
+
+    Returns: (list of Requirements, list of problems with invalid entries)
+    """
+    if isinstance(requirements, str):
+        requirements = requirements.split(",")
+    parsed, problems = [], []
+    for requirement in [x.strip() for x in requirements if x.strip()]:
+        try:
+            parsed.append(Requirement(requirement))
+        except InvalidRequirement as error:
+            problems.append(f"'{requirement}' isn't a valid requirement: {error}")
+    return parsed, problems
+
+
+def applies(requirement, extras=(), environment=None):
+    """ Returns: True if requirement's marker (if any) matches environment """
+    if not requirement.marker:
+        return True
+    environment = dict(environment or {})
+    return any(
+        requirement.marker.evaluate({**environment, "extra": extra})
+        for extra in ["", *extras]
+    )
+
+
+def resolve_requirements(requirements, store, environment=None):
+    """
+    Picks the newest version of each requirement (and its dependencies) in
+    store which satisfies every specifier found so far.  This is a quick
+    pre-check rather than a full backtracking resolver like pip's.
+
+    environment : marker values to override e.g. {"python_version": "3.8"}
+
+    Returns: {"resolved": {name: version},
+              "missing": {name: [required by]},
+              "conflicts": [descriptions],
+              "invalid": [descriptions]}
+    """
+    parsed, invalid = parse_requirements(requirements)
+    queue = deque((x, "REQUIREMENTS", ()) for x in parsed)
+    constraints = defaultdict(list)
+    resolved, missing, conflicts = {}, defaultdict(list), {}
+    # (name, version, extras) whose dependencies have been queued:
+    expanded = set()
+    while queue:
+        requirement, required_by, extras = queue.popleft()
+        if not applies(requirement, extras, environment):
+            continue
+        name = canonicalize_name(requirement.name)
+        constraints[name].append((requirement.specifier, required_by))
+        if name not in store:
+            missing[name].append(required_by)
+            continue
+        specifier = SpecifierSet(",".join(str(x[0]) for x in constraints[name]))
+        candidates = list(specifier.filter(store[name], prereleases=None))
+        if not candidates:
+            requested = ", ".join(
+                f"{by} ({spec or 'any'})" for spec, by in constraints[name]
+            )
+            available = ", ".join(sorted(store[name], key=Version))
+            resolved.pop(name, None)
+            conflicts[name] = (
+                f"{name}: no version available matches {specifier}; "
+                f"required by {requested}; available: {available}"
+            )
+            continue
+        best = max(candidates, key=Version)
+        visited = (name, best, frozenset(requirement.extras))
+        if resolved.get(name) == best and visited in expanded:
+            continue
+        resolved[name] = best
+        conflicts.pop(name, None)
+        expanded.add(visited)
+        for dependency in store[name][best]:
+            try:
+                dependency = Requirement(dependency)
+            except InvalidRequirement:
+                continue
+            queue.append((dependency, f"{name} {best}", requirement.extras))
+    return {
+        "resolved": resolved,
+        "missing": dict(missing),
+        "conflicts": list(conflicts.values()),
+        "invalid": invalid,
+    }
@@ -3,30 +3,86 @@ Functions shared by easypypi.py and licenses.py
 Check: Separate file required to avoid circular import?
 """
 
+from .logger import logger
+from .utils import SETUP_FIELDS
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import ast
+import hashlib
 import os
+import shutil
+import uuid
+
+# Metadata files which are renamed e.g. to "setup - old.py" before being replaced:
+BACKUP_FILENAMES = ["setup.py", "pyproject.toml"]
 
 
 def create_file(filepath, content, **kwargs):
     """
-    Create a new file using writelines, and backup if filepath==setup.py.
+    Create a new file, and backup if filepath is in BACKUP_FILENAMES.
     Returns "file exists" if filepath already exists and overwrite = False
+
+    content : str, bytes, or an iterable (e.g. list or generator) of either
+
+    Content is streamed to a temporary file in the same folder which is only
+    renamed to filepath once complete, so filepath is never partly written.
     """
-    if isinstance(content, str):
-        content = content.splitlines(True)  # keep line breaks
-    if filepath.is_file():
-        if kwargs.get("overwrite"):
-            if filepath.name == "setup.py":
-                backup = filepath.with_name(f"{filepath.stem} - old.py")
-                filepath.replace(backup)
-                print(f"\n✓ Renamed {filepath.name} to:\n  {backup.name}")
-            else:
-                os.remove(filepath)
-        else:
-            print(f"\nⓘ Existing file preserved:\n  {filepath}")
-            return "file exists"
-    with filepath.open("a") as file:
-        file.writelines(content)
-        print(f"\n✓ Created new file:\n  {filepath}")
+    filepath = Path(filepath)
+    if filepath.is_file() and not kwargs.get("overwrite"):
+        logger.info("\nⓘ Existing file preserved:\n  %s", filepath)
+        return "file exists"
+    temp_filepath = write_temp_file(filepath, content)
+    if filepath.is_file() and filepath.name in BACKUP_FILENAMES:
+        backup = filepath.with_name(f"{filepath.stem} - old{filepath.suffix}")
+        filepath.replace(backup)
+        logger.info("\n✓ Renamed %s to:\n  %s", filepath.name, backup.name)
+    os.replace(temp_filepath, filepath)
+    logger.info("\n✓ Created new file:\n  %s", filepath)
+
+
+def write_temp_file(filepath, content):
+    """
+    Writes content to a new hidden file alongside filepath, which is removed
+    again if writing fails e.g. if a content generator raises an exception.
+
+    Returns: Path of the temporary file
+    """
+    if isinstance(content, (str, bytes)):
+        content = [content]
+    chunks = iter(content)
+    first_chunk = next(chunks, "")
+    mode = "xb" if isinstance(first_chunk, bytes) else "x"
+    temp_filepath = filepath.with_name(f".{filepath.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with temp_filepath.open(mode) as file:
+            file.write(first_chunk)
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+    except BaseException:
+        if temp_filepath.exists():
+            temp_filepath.unlink()
+        raise
+    return temp_filepath
+
+
+def read_setup_fields(script_lines):
+    """
+    Reads metadata from lines of setup.py e.g. VERSION = "0.1"
+    Returns: dictionary of {Package attribute name: value} for SETUP_FIELDS
+    """
+    values = {}
+    for line in script_lines:
+        for field, attribute in SETUP_FIELDS.items():
+            if line.startswith(field.upper() + " = "):
+                # literal_eval in case the value isn't simply a string, but
+                # without running any code:
+                try:
+                    values[attribute] = ast.literal_eval(line.split(" = ", 1)[1])
+                except (ValueError, SyntaxError):
+                    logger.warning("\n ⚠  Unable to read:\n  %s", line.rstrip())
+    return values
 
 
 def update_line(script_lines, old_line_starts, new_value):
@@ -42,10 +98,105 @@ def update_line(script_lines, old_line_starts, new_value):
                 old_line = script_lines[index]
                 script_lines[index] = old_line_starts + new_value.rstrip() + "\n"
                 if old_line != script_lines[index]:
-                    print(
-                        f"\n✓ Updated script line {index + 1}:\n{script_lines[index].rstrip()[:400]}"
+                    logger.info(
+                        "\n✓ Updated script line %s:\n%.400s",
+                        index + 1,
+                        script_lines[index].rstrip(),
                     )
                 break  # only update first occurrence
             except (IndexError, TypeError):
-                print(new_value, type(new_value))
+                logger.error("Unable to update line with %r", new_value)
     return script_lines
+
+
+def get_file_hash(filepath, chunk_size=1024 * 1024):
+    """ Returns the sha256 hexdigest of a file's contents """
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def copy_file(source, destination):
+    """
+    Copies file contents and permissions, using zero-copy system calls
+    (copy_file_range or sendfile) where available.
+    """
+    with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        copied = 0
+        for zero_copy in ["copy_file_range", "sendfile"]:
+            function = getattr(os, zero_copy, None)
+            if not function:
+                continue
+            try:
+                while copied < size:
+                    count = size - copied
+                    if zero_copy == "sendfile":
+                        sent = function(fdst.fileno(), fsrc.fileno(), copied, count)
+                    else:
+                        sent = function(fsrc.fileno(), fdst.fileno(), count, copied)
+                    if not sent:
+                        break
+                    copied += sent
+                break
+            except OSError:
+                # e.g. not supported across these filesystems;  try the next
+                # method from where we got to:
+                continue
+        if copied < size:
+            fsrc.seek(copied)
+            fdst.seek(copied)
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copymode(source, destination)
+
+
+def compare_file(source, destination):
+    """
+    Returns "new" if destination doesn't exist, "unchanged" if it has the same
+    contents as source, otherwise "changed".
+    """
+    if not destination.is_file():
+        return "new"
+    if source.stat().st_size != destination.stat().st_size:
+        return "changed"
+    if get_file_hash(source) == get_file_hash(destination):
+        return "unchanged"
+    return "changed"
+
+
+def copy_files(filepaths, dirpath, overwrite=False, max_workers=None):
+    """
+    Copies multiple files into dirpath in parallel.  Files with identical
+    contents already in dirpath are skipped.
+
+    overwrite : True/False, or a function which is passed a list of files
+                whose contents differ from those already in dirpath, and
+                returns True/False to overwrite them all, or None to cancel.
+
+    Returns: dictionary of file lists for "copied", "unchanged", "preserved"
+    or None if cancelled.
+    """
+    sources = [Path(x) for x in filepaths if Path(x).is_file()]
+    destinations = [Path(dirpath) / x.name for x in sources]
+    with ThreadPoolExecutor(max_workers) as executor:
+        statuses = list(executor.map(compare_file, sources, destinations))
+        changed = [x for x, status in zip(sources, statuses) if status == "changed"]
+        if changed and callable(overwrite):
+            overwrite = overwrite(changed)
+            if overwrite is None:
+                return None
+        results = {"copied": [], "unchanged": [], "preserved": []}
+        to_copy = []
+        for source, destination, status in zip(sources, destinations, statuses):
+            if status == "unchanged":
+                results["unchanged"].append(source)
+            elif status == "changed" and not overwrite:
+                results["preserved"].append(source)
+            else:
+                to_copy.append((source, destination))
+        for _ in executor.map(lambda x: copy_file(*x), to_copy):
+            pass
+    results["copied"] = [x[0] for x in to_copy]
+    return results
@@ -0,0 +1,188 @@
+"""
+Pre-rendered skeletons for new packages.
+
+Starter files for every package are the same apart from a few placeholders
+like {self.name}, so each combination of templates and license is rendered
+once to a snapshot folder in the easyPyPI app folder:
+
+skeletons/
+    <key>/
+        skeleton.json               # Placeholders found in each file
+        LICENSE
+        README.md
+        {self.name}/__init__.py
+        ...
+
+New packages are then created from the snapshot (kept in memory once read)
+by patching in their own placeholder values.
+"""
+
+from .logger import logger
+from .shared_functions import copy_file
+from .shared_functions import create_file
+from .shared_functions import get_file_hash
+from pathlib import Path
+import hashlib
+import json
+
+MANIFEST_FILENAME = "skeleton.json"
+
+# Hashes of files created from skeletons, so that files edited since can be
+# left alone when a template changes:
+RENDERED_FILENAME = "rendered_files.json"
+
+# Templates in the easypypi folder, and where they go in a new package:
+SKELETON_TEMPLATES = {
+    "readme_template.md": "README.md",
+    "init_template.py": "{self.name}/__init__.py",
+    "script_template.py": "{self.name}/{self.name}.py",
+    "test_template.py": "{self.name}/test_{self.name}.py",
+}
+
+# Snapshots already read from disk;  {skeleton_dirpath: {relative path: (text, placeholders)}}
+SKELETONS = {}
+
+
+def get_skeleton_key(templates_dirpath, license_key, placeholders=()):
+    """
+    Returns: short hash identifying the current templates (by size and
+    modification time), license and placeholders, so edited templates get a
+    new skeleton.
+    """
+    sha256 = hashlib.sha256(str(license_key).encode())
+    sha256.update("\0".join(placeholders).encode())
+    for template in sorted(SKELETON_TEMPLATES):
+        stat = (Path(templates_dirpath) / template).stat()
+        sha256.update(f"{template}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return sha256.hexdigest()[:16]
+
+
+def create_skeleton(skeleton_dirpath, files):
+    """
+    Renders a skeleton snapshot.
+
+    files : {relative path: (text, placeholders which may appear in text)}
+    """
+    manifest = {}
+    for relative_path, (text, placeholders) in files.items():
+        filepath = Path(skeleton_dirpath) / relative_path
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        create_file(filepath, text, overwrite=True)
+        manifest[relative_path] = [x for x in placeholders if x in text]
+    # Written last, so only complete snapshots are ever used:
+    create_file(
+        Path(skeleton_dirpath) / MANIFEST_FILENAME, json.dumps(manifest), overwrite=True
+    )
+    logger.info("\n✓ Created skeleton for new packages:\n  %s", skeleton_dirpath)
+
+
+def load_skeleton(skeleton_dirpath):
+    """
+    Returns: {relative path: (text, placeholders)} for a snapshot, or None if
+    it hasn't been created yet.
+    """
+    skeleton_dirpath = Path(skeleton_dirpath)
+    if skeleton_dirpath in SKELETONS:
+        return SKELETONS[skeleton_dirpath]
+    manifest_filepath = skeleton_dirpath / MANIFEST_FILENAME
+    if not manifest_filepath.is_file():
+        return None
+    with open(manifest_filepath, "r") as file:
+        manifest = json.load(file)
+    skeleton = {}
+    for relative_path, placeholders in manifest.items():
+        text = None
+        if placeholders:  # Files without placeholders are copied, not read
+            with open(skeleton_dirpath / relative_path, "r") as file:
+                text = file.read()
+        skeleton[relative_path] = (text, placeholders)
+    SKELETONS[skeleton_dirpath] = skeleton
+    return skeleton
+
+
+def get_skeleton(skeleton_dirpath, render_files):
+    """
+    Loads a snapshot, creating it first if necessary.
+
+    render_files : function returning files for create_skeleton
+    """
+    skeleton = load_skeleton(skeleton_dirpath)
+    if skeleton is None:
+        create_skeleton(skeleton_dirpath, render_files())
+        skeleton = load_skeleton(skeleton_dirpath)
+    return skeleton
+
+
+def patch(text, placeholders, values):
+    """ Returns: text with each of placeholders replaced by its value """
+    for placeholder in placeholders:
+        text = text.replace(placeholder, values[placeholder])
+    return text
+
+
+def load_rendered(record_filepath):
+    """ Returns: {filepath: sha256} of files created from skeletons """
+    if not Path(record_filepath).is_file():
+        return {}
+    with open(record_filepath, "r") as file:
+        return json.load(file)
+
+
+def record_rendered(record_filepath, filepaths):
+    """ Remembers the contents of files just created, for is_unedited """
+    if not filepaths:
+        return
+    rendered = load_rendered(record_filepath)
+    rendered.update({str(Path(x).resolve()): get_file_hash(x) for x in filepaths})
+    Path(record_filepath).parent.mkdir(parents=True, exist_ok=True)
+    create_file(record_filepath, json.dumps(rendered, indent=4), overwrite=True)
+
+
+def is_unedited(filepath, record_filepath):
+    """
+    Returns: True if filepath hasn't been changed since it was created from a
+    skeleton (so it's safe to replace), False if it has or isn't recorded
+    """
+    sha256 = load_rendered(record_filepath).get(str(Path(filepath).resolve()))
+    return sha256 is not None and get_file_hash(filepath) == sha256
+
+
+def materialise_skeleton(
+    skeleton_dirpath,
+    skeleton,
+    setup_dirpath,
+    values,
+    overwrite=(),
+    record_filepath=None,
+):
+    """
+    Creates files for a new package from a skeleton snapshot.
+
+    values : {placeholder: value} for every placeholder in the skeleton, and
+             for {self.name} which is also used in relative paths
+    overwrite : relative paths of files to replace if they already exist
+    record_filepath : JSON file to remember files written in (see is_unedited)
+
+    Returns: list of Paths of files written
+    """
+    written = []
+    for relative_path, (text, placeholders) in skeleton.items():
+        filepath = Path(setup_dirpath) / patch(relative_path, ["{self.name}"], values)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        if text is not None:
+            result = create_file(
+                filepath,
+                patch(text, placeholders, values),
+                overwrite=relative_path in overwrite,
+            )
+            if result != "file exists":
+                written.append(filepath)
+        elif relative_path in overwrite or not filepath.is_file():
+            copy_file(Path(skeleton_dirpath) / relative_path, filepath)
+            logger.info("\n✓ Created new file:\n  %s", filepath)
+            written.append(filepath)
+        else:
+            logger.info("\nⓘ Existing file preserved:\n  %s", filepath)
+    if record_filepath:
+        record_rendered(record_filepath, written)
+    return written
@@ -0,0 +1,121 @@
+# Benchmarks for easypypi, using pytest-benchmark:
+#   pytest easypypi/test_benchmarks.py --benchmark-autosave
+#   pytest easypypi/test_benchmarks.py --benchmark-compare
+# Packages are synthetic and created without any GUI prompts.
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from cleverdict import CleverDict
+from easypypi.easypypi import *
+from easypypi.logger import configure_logging
+from easypypi.validation import validate_field
+from easypypi.validation import validate_metadata
+
+SIZES = [1, 10, 100]  # Multiplier for amount of metadata in synthetic packages
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    """ Benchmark the work itself, not writing progress messages to screen """
+    configure_logging(quiet=True)
+    yield
+    configure_logging()
+
+
+def create_package(dirpath, size, license_name="MIT License"):
+    """
+    Creates a Package in dirpath without prompting for input.  size scales the
+    number of classifiers, keywords, requirements, and lines in setup.py
+    """
+    package = Package.__new__(Package)
+    CleverDict.__init__(package)
+    package.name = f"package_{size}"
+    package.version = "0.1"
+    package.Github_username = "testuser"
+    package.url = f"https://github.com/testuser/package_{size}"
+    package.description = "A synthetic package for benchmarking. " * size
+    package.author = "Test User"
+    package.email = "testuser@example.com"
+    package.keywords = ", ".join(f"keyword_{x}" for x in range(size * 5))
+    package.requirements = ", ".join(f"requirement_{x}" for x in range(size * 5))
+    topics = [x for x in CLASSIFIER_LIST if x.startswith("Topic")][: size * 3]
+    package.classifiers = ", ".join(
+        topics + [f"License :: OSI Approved :: {LICENSE_NAMES['MIT']}"]
+    )
+    package.license_name_github = license_name
+    template = Package.easypypi_dirpath / "setup_template.py"
+    lines = template.read_text().splitlines(True)
+    package.script_lines = lines + [f"# Padding line {x}\n" for x in range(size * 50)]
+    package.setup_filepath_str = str(dirpath / package.name / "setup.py")
+    return package
+
+
+@pytest.fixture
+def config_filepath(tmp_path, monkeypatch):
+    """ Autosave to a config file in tmp_path, only for the current test """
+    monkeypatch.setattr(Package, "config_filepath", tmp_path / "config.json")
+
+
+@pytest.fixture(params=SIZES)
+def package(request, tmp_path, config_filepath):
+    return create_package(tmp_path, request.param)
+
+
+def test_update_line(benchmark, package):
+    lines = package.script_lines
+    benchmark(update_line, list(lines), "REQUIREMENTS = ", package.requirements)
+
+
+def test_update_script_lines(benchmark, package):
+    benchmark(package.update_script_lines)
+
+
+def test_load_defaults_from_setup_py(benchmark, package):
+    package.update_script_lines()
+    package.setup_filepath.parent.mkdir()
+    package.setup_filepath.write_text("".join(package.script_lines))
+    benchmark(package.load_defaults_from_setup_py)
+
+
+@pytest.mark.parametrize("license_name", [x.name for x in LICENSES])
+def test_create_license(benchmark, tmp_path, config_filepath, license_name):
+    package = create_package(tmp_path, 1, license_name)
+    benchmark(package.create_license)
+
+
+def test_get_main_layout_classifiers(benchmark, package):
+    benchmark(lambda: package.get_main_layout_classifiers([]))
+
+
+def test_save_user_input(benchmark, package):
+    values = {key: package.get(key) for key in INPUT_PROMPTS}
+    choices, selected_choices = package.get_classifier_choices()
+    benchmark(package.save_user_input, values, selected_choices)
+
+
+def test_save_user_input_unchanged(benchmark, package):
+    """ Typical GUI event i.e. nothing has changed since the last snapshot """
+    values = {key: package.get(key) for key in INPUT_PROMPTS}
+    choices, selected_choices = package.get_classifier_choices()
+    snapshot = package.save_user_input(values, selected_choices)
+    benchmark(package.save_user_input, values, selected_choices, snapshot)
+
+
+def test_save(benchmark, package):
+    benchmark(package.save)
+
+
+def test_validate_metadata(benchmark, package):
+    """ First validation of new values i.e. without any cached results """
+
+    def validate():
+        validate_field.cache_clear()
+        validate_metadata(package)
+
+    benchmark(validate)
+
+
+def test_validate_metadata_cached(benchmark, package):
+    validate_metadata(package)
+    benchmark(validate_metadata, package)
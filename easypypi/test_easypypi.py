@@ -1,39 +1,43 @@
 # Tests for easypypi
 import pytest
+import sqlite3
+import subprocess
+import threading
+from click.testing import CliRunner
+from contextlib import closing
+from easypypi.discovery import *
+from easypypi.dryrun import *
 from easypypi.easypypi import *
+from easypypi.imports import *
+from easypypi import instrumentation
+from easypypi import discovery
+from easypypi import imports
+from easypypi import readme
+from easypypi import resolver
+from easypypi import venvs
+from easypypi.ledger import *
+from easypypi.local_index import *
+from easypypi.logger import *
+from easypypi.package_data import *
+from easypypi.publisher import *
+from easypypi.publisher import main as publisher_main
+from easypypi.pyproject import *
+from easypypi.readme import *
+from easypypi.resolver import *
+from easypypi.shared_functions import *
+from easypypi.venvs import *
+from easypypi.versions import *
+from easypypi.watch import *
 
-sg.change_look_and_feel("DarkAmber")
-
-
-def backup_config():
-    """
-    Backs up current config file then deletes it to simulute first time use
-    """
-    global backup_filepath, kwargs_backup
-    kwargs_backup = sg_kwargs.copy()
-    if sg_kwargs.get("title"):
-        del sg_kwargs["title"]
-    backup_filepath = Package.config_filepath.with_name("config_backup.json")
-    try:
-        Package.config_filepath.replace(backup_filepath)
-        print(f"\n ⓘ  config.json moved to {backup_filepath}")
-    except FileNotFoundError:
-        print(
-            f"\n ⓘ  {Package.config_filepath} doesn't exist yet - no backup required."
-        )
-
+from easypypi.testing import *
+from easypypi.validation import *
 
-def restore_config():
-    """ Restores previously copied config file """
-    global sg_kwargs
-    sg_kwargs = kwargs_backup.copy()
-    backup_filepath.replace(Package.config_filepath)
-    print("\n ⓘ  Original config.json restored.")
+SETUP_TEMPLATE_LINES = len(
+    (Package.easypypi_dirpath / "setup_template.py").read_text().splitlines()
+)
 
-
-def notify(prompt):
-    """ Popup an auto-close notification with instructions about a test """
-    sg.popup_auto_close(prompt, title="Testing", **sg_kwargs, auto_close_duration=8)
+# All tests run headless using the fixtures in conftest.py, so popups need
+# scripted responses e.g. headless.responses.extend(["Yes"])
 
 
 def check_credentials(package, account):
@@ -45,135 +49,148 @@ def check_credentials(package, account):
     )
 
 
-def breakdown_credentials(package, account):
+def breakdown_credentials(package, account, ui):
     """ Deletes username/password attributes and removes from keyring """
     # Get a copy of username before deleting:
     username = getattr(package, f"{account}_username")
+    ui.responses.append("Yes")  # Confirm deletion
     package.delete_credentials(account)
     assert not hasattr(package, f"{account}_username")
     assert not hasattr(package, f"{account}_password")
     assert not keyring.get_password(account, username)
 
 
+class FakeBrowser:
+    """ Stand-in for mechanicalsoup.StatefulBrowser with failed Github login """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def open(self, url):
+        pass
+
+    def select_form(self, selector):
+        if "repositories" in selector:
+            raise LinkNotFoundError
+
+    def __setitem__(self, key, value):
+        pass
+
+    def submit_selected(self):
+        pass
+
+    def close(self):
+        pass
+
+
 class Test_First_Time_Use:
-    def test_defaults(self):
+    def test_defaults(self, headless, tmp_path):
         """ Check initial default values are conformant """
-        backup_config()
-        notify(
-            "When prompted, please click OK twice to select\nthe default NAME and PARENT FOLDER..."
-        )
+        # Select the default NAME and PARENT FOLDER:
+        headless.responses.extend(["as_easy_as_pie", str(tmp_path)])
         package = Package(_break=True)
         assert package.name == "as_easy_as_pie"
         assert package.version == "0.1"
-        assert len(package.script_lines) == 47  # Depends on setup_template.py
+        assert len(package.script_lines) == SETUP_TEMPLATE_LINES
         assert package.setup_filepath_str.endswith("setup.py")
-        assert sorted(package.get_aliases()) == [
+        assert sorted(package.keys()) == [
             "name",
             "script_lines",
             "setup_filepath_str",
             "version",
         ]
-        restore_config()
+        assert (tmp_path / "as_easy_as_pie" / "as_easy_as_pie").is_dir()
+        assert not headless.responses
 
-    def test_defaults_with_name(self):
+    def test_defaults_with_name(self, headless, tmp_path):
         """ Check initial default values when name is supplied as argument """
-        backup_config()
-        notify("When prompted, click OK once\nto select the default PARENT FOLDER...")
+        headless.responses.append(str(tmp_path))  # Select the PARENT FOLDER
         package = Package("test", _break=True)
         assert package.name == "test"
         assert package.version == "0.1"
-        assert len(package.script_lines) == 47  # Depends on setup_template.py
+        assert len(package.script_lines) == SETUP_TEMPLATE_LINES
         assert package.setup_filepath_str.endswith("setup.py")
-        assert sorted(package.get_aliases()) == [
+        assert sorted(package.keys()) == [
             "name",
             "script_lines",
             "setup_filepath_str",
             "version",
         ]
-        restore_config()
+        assert [x[0] for x in headless.calls] == ["popup_get_folder"]
 
-    def test_defaults_values(self):
+    def test_defaults_values(self, headless, tmp_path):
         """ Check derived default values. """
-        backup_config()
-        notify("When prompted, click OK once\nto select the default PARENT FOLDER...")
+        headless.responses.append(str(tmp_path))
         package = Package("test", _break=True)
-        assert package.get_default_version() == "0.1"
+        assert package.get_default_version() == "0.0.1a1"
         package.Github_username = "testuser"
+        package.author = package.get_default_author()
         assert package.get_default_url() == "https://github.com/testuser/test"
         assert package.name in package.get_default_keywords()
         assert package.author in package.get_default_keywords()
         assert package.Github_username in package.get_default_keywords()
         assert "cleverdict" in package.get_default_requirements()
-        restore_config()
 
-    def test_Test_PyPI_credentials(self):
+    @pytest.mark.parametrize("account", ["Test PyPI", "PyPI"])
+    def test_PyPI_credentials(self, headless, tmp_path, account, monkeypatch):
         """
         upload_with_twine should prompt for username & password if it can't
         find them in `keyring`
         """
-        backup_config()
-        notify("When prompted, click OK once\nto select the default PARENT FOLDER...")
+        commands = []
+        # Simulate twine failing (return value 1) rather than uploading:
+        monkeypatch.setattr(os, "system", lambda x: commands.append(x) or 1)
+        headless.responses.append(str(tmp_path))
         package = Package("test", _break=True)
-        notify(
-            f"1st Run: Click the 'Test PyPI' button then enter:\n'testuser' and 'testpw' for username and password"
-        )
+        package.setup_filepath.parent.mkdir(parents=True, exist_ok=True)
+        package.setup_filepath.with_name("README.md").write_text("# test")
+        # 1st Run: choose account then enter username and password:
+        headless.responses.extend([account, "testuser", "testpw"])
         package.upload_with_twine()
-        notify(f"Expected error:\n\nCannot find file (or expand pattern): ...")
-        check_credentials(package, "Test_PyPI")
-        notify(
-            f"2nd Run:  Click the 'Test PyPI' button.\n\nYou shouldn't need to re-enter username or password"
-        )
+        assert "twine upload" in commands[-1]
+        assert "-u testuser -p testpw" in commands[-1]
+        account = account.replace(" ", "_")
+        check_credentials(package, account)
+        # 2nd Run: shouldn't need to re-enter username or password
+        headless.responses.append(account.replace("_", " "))
         package.upload_with_twine()
-        breakdown_credentials(package, "Test_PyPI")
-        restore_config()
+        assert not headless.responses
+        breakdown_credentials(package, account, headless)
 
-    def test_PyPI_credentials(self):
-        """
-        upload_with_twine should prompt for username & password if it can't
-        find them in `keyring`
-        """
-        backup_config()
-        notify("When prompted, click OK once\nto select the default PARENT FOLDER...")
-        package = Package("test", _break=True)
-        notify(
-            f"1st Run: Click the 'PyPI' button then enter:\n'testuser' and 'testpw' for username and password"
-        )
-        package.upload_with_twine()
-        notify(f"Expected error:\n\nCannot find file (or expand pattern): ...")
-        check_credentials(package, "PyPI")
-        notify(
-            f"2nd Run:  Click the 'PyPI' button.\n\nYou shouldn't need to re-enter username or password"
-        )
-        package.upload_with_twine()
-        breakdown_credentials(package, "PyPI")
-        restore_config()
+    def test_check_install_after_upload(self, headless, monkeypatch, package):
+        """ Checking the upload installs should be optional """
+        monkeypatch.setattr(os, "system", lambda x: 0)  # i.e. uploaded
+        monkeypatch.setattr(webbrowser, "open", lambda x: None)
+        verified = []
+        monkeypatch.setattr(Package, "verify_install", lambda x: verified.append(x))
+        headless.responses.extend(["testuser", "testpw", "No"])
+        package.upload_with_twine("Test PyPI")
+        assert not verified
+        headless.responses.extend(["Yes", "Verify Locally"])
+        package.version = "0.2"
+        package.upload_with_twine("Test PyPI")
+        assert verified == [package]
+        assert not headless.responses
 
-    def test_Github_credentials(self):
+    def test_Github_credentials(self, headless, tmp_path, monkeypatch):
         """
-        upload_with_twine should prompt for username & password if it can't
-        find them in `keyring`
+        create_github_repository should prompt for username & password if it
+        can't find them in `keyring`
         """
-        backup_config()
-        notify("When prompted, click OK once\nto select the default PARENT FOLDER...")
+        monkeypatch.setattr(mechanicalsoup, "StatefulBrowser", FakeBrowser)
+        headless.responses.append(str(tmp_path))
         package = Package("test", _break=True)
         package.url = "https://github.com/PFython/easypypi"
-        notify(
-            f"1st Run: Click the 'Yes' button then enter:\n'testuser' and 'testpw' for username and password"
-        )
-        try:
-            package.create_github_repository()
-        except LinkNotFoundError:
-            notify(f"Expected error - not real login credentials")
-        check_credentials(package, account)
-        notify(
-            f"2nd Run:  Click the 'Yes' button.\n\nYou shouldn't need to re-enter username or password"
-        )
-        try:
-            package.create_github_repository()
-        except LinkNotFoundError:
-            notify(f"Expected error - not real login credentials")
-        breakdown_credentials(package, "Github")
-        restore_config()
+        # 1st Run: enter username and password, then re-enter password
+        # after the (expected) failed login:
+        headless.responses.extend(["testuser", "testpw", "testpw"])
+        assert package.create_github_repository() is False
+        check_credentials(package, "Github")
+        # 2nd Run: only re-enter password after the failed login
+        headless.responses.append("testpw")
+        assert package.create_github_repository() is False
+        assert not headless.responses
+        breakdown_credentials(package, "Github", headless)
 
     def test_load_defaults(self):
         """ Tests the Entry Point: load_defaults() """
@@ -192,3 +209,1338 @@ class Test_First_Time_Use:
     def test_upload(self):
         """ Tests the Entry Point: upload() """
         pass
+
+
+class Test_Artifact_Dependencies:
+    def test_unrelated_fields(self):
+        """ Button menu values shouldn't trigger any regeneration """
+        assert get_stale_artifacts(["Browse Files", "Coffee"]) == []
+
+    def test_setup_field_only(self):
+        """ Fields only used in setup.py just need script_lines updating """
+        assert get_stale_artifacts(["version"]) == ["update_script_lines"]
+
+    def test_license_fields(self):
+        """ Fields used in LICENSE text regenerate it as well as setup.py """
+        assert get_stale_artifacts(["author"]) == [
+            "create_license",
+            "update_script_lines",
+        ]
+
+    def test_classifiers_propagate(self):
+        """ A new License classifier should cascade through every artifact """
+        assert get_stale_artifacts(["classifiers"]) == list(ARTIFACT_DEPENDENCIES)
+
+    def test_everything(self):
+        assert get_stale_artifacts([], everything=True) == list(ARTIFACT_DEPENDENCIES)
+
+    def test_license_names(self, package):
+        """ License classifiers should be found intact, even with commas """
+        cecill = [x for x in CLASSIFIER_LIST if x.endswith("(CeCILL-2.1)")]
+        package.update_license_names(cecill)
+        assert package.license_name_pypi.endswith("License, version 2.1 (CeCILL-2.1)")
+        package.license_name_pypi = None
+        package.classifiers = f"Development Status :: 3 - Alpha, {cecill[0]}"
+        package.update_license_names()  # From .classifiers
+        assert package.license_name_pypi.endswith("License, version 2.1 (CeCILL-2.1)")
+        selected_choices = {
+            "Development Status": ["Development Status :: 3 - Alpha"],
+            "License :: OSI Approved ::": ["License :: OSI Approved :: MIT License"],
+        }
+        snapshot = package.save_user_input({}, selected_choices, {})
+        assert package.license_name_pypi == "MIT License"
+        assert snapshot["classifiers"].startswith("Development Status")
+
+
+class Test_Classifier_Search:
+    index = [(x.lower(), x) for x in CLASSIFIER_LIST if x.startswith("Topic")]
+
+    def test_case_insensitive(self):
+        results = filter_choices(self.index, "internet")
+        assert results
+        assert all("Internet" in x[1] for x in results)
+
+    def test_all_words_match(self):
+        """ Words can appear anywhere in the classifier, in any order """
+        results = [x[1] for x in filter_choices(self.index, "git control")]
+        assert "Topic :: Software Development :: Version Control :: Git" in results
+        assert "Topic :: Software Development :: Version Control" not in results
+
+    def test_incremental(self):
+        """ Narrowing down previous results gives the same as a new search """
+        previous = filter_choices(self.index, "soft")
+        assert filter_choices(previous, "software dev") == filter_choices(
+            self.index, "software dev"
+        )
+
+    def test_empty_search(self):
+        assert filter_choices(self.index, "") == self.index
+
+
+class Test_Window_Reuse:
+    """ Windows should be created once, then hidden, refreshed and re-shown """
+
+    def use_scripted_windows(self, headless, monkeypatch):
+        monkeypatch.setattr(sg, "Window", headless.Window)
+        monkeypatch.setattr("easypypi.easypypi.CHOICE_WINDOWS", {})
+
+    def test_choices(self, headless, monkeypatch):
+        self.use_scripted_windows(headless, monkeypatch)
+        choices, selected = ["A", "B", "C"], ["A"]
+        headless.responses.append(("Accept", {"A": False, "B": True, "C": False}))
+        assert prompt_with_choices("Topic", choices, selected)
+        assert selected == ["B"]
+        headless.responses.append(("Cancel", {}))
+        assert not prompt_with_choices("Topic", choices, selected)
+        assert len(headless.windows) == 1
+        window = headless.windows[0]
+        assert window.hidden
+        assert [window[x].values["value"] for x in choices] == [False, True, False]
+
+    def test_listbox(self, headless, monkeypatch):
+        self.use_scripted_windows(headless, monkeypatch)
+        choices = [f"Topic :: {index}" for index in range(LISTBOX_THRESHOLD + 1)]
+        selected = []
+        headless.responses.append(("Choices", {"Choices": [choices[1]]}))
+        headless.responses.append(("Accept", {}))
+        assert prompt_with_listbox("Topic", choices, selected)
+        assert selected == [choices[1]]
+        headless.responses.append(("Cancel", {}))
+        assert not prompt_with_choices("Topic", choices, selected)
+        assert len(headless.windows) == 1
+        window = headless.windows[0]
+        assert window["Search"].values["value"] == ""
+        assert window["Choices"].values["value"] == [choices[1]]
+
+    def test_main_window(self, headless, monkeypatch, package):
+        self.use_scripted_windows(headless, monkeypatch)
+        window = headless.Window("easyPyPI")
+        Package.main_window = window
+        package.description = "Refreshed"
+        headless.responses.append((sg.WINDOW_CLOSE_ATTEMPTED_EVENT, {}))
+        assert package.get_user_input() is False
+        assert headless.windows == [window]
+        assert window.hidden
+        assert window["description"].values["value"] == "Refreshed"
+        license_group = window[("classifiers", "License :: OSI Approved ::")]
+        assert license_group.values["value"] == package.classifiers
+        menu = window["Browse Files"].values["menu_definition"]
+        assert package.name in menu[1]
+
+
+class Test_Read_Setup_Fields:
+    def test_literals_only(self):
+        lines = [
+            'NAME = "test"\n',
+            "VERSION = __import__('os').getcwd()\n",
+            'DESCRIPTION = "a = b"\n',
+        ]
+        assert read_setup_fields(lines) == {"name": "test", "description": "a = b"}
+
+
+class Test_Create_File:
+    def test_content_types(self, tmp_path):
+        create_file(tmp_path / "str.txt", "line 1\nline 2\n")
+        create_file(tmp_path / "bytes.bin", b"\x00\xff")
+        create_file(tmp_path / "list.txt", ["line 1\n", "line 2\n"])
+        create_file(tmp_path / "generator.txt", (f"line {x}\n" for x in (1, 2)))
+        assert (tmp_path / "str.txt").read_text() == "line 1\nline 2\n"
+        assert (tmp_path / "bytes.bin").read_bytes() == b"\x00\xff"
+        assert (tmp_path / "list.txt").read_text() == "line 1\nline 2\n"
+        assert (tmp_path / "generator.txt").read_text() == "line 1\nline 2\n"
+
+    def test_existing_file(self, tmp_path):
+        filepath = tmp_path / "existing.txt"
+        filepath.write_text("old")
+        assert create_file(filepath, "new") == "file exists"
+        assert filepath.read_text() == "old"
+        create_file(filepath, "new", overwrite=True)
+        assert filepath.read_text() == "new"
+
+    def test_setup_py_backup(self, tmp_path):
+        filepath = tmp_path / "setup.py"
+        filepath.write_text("old")
+        create_file(filepath, "new", overwrite=True)
+        assert filepath.read_text() == "new"
+        assert (tmp_path / "setup - old.py").read_text() == "old"
+
+    def test_no_partial_output(self, tmp_path):
+        """ Failed writes should leave the original file and no temporary files """
+
+        def failing_content():
+            yield "partial\n"
+            raise ValueError
+
+        filepath = tmp_path / "LICENSE"
+        filepath.write_text("original")
+        with pytest.raises(ValueError):
+            create_file(filepath, failing_content(), overwrite=True)
+        assert filepath.read_text() == "original"
+        assert list(tmp_path.iterdir()) == [filepath]
+
+
+class Test_Import_Scanner:
+    def create_package(self, tmp_path):
+        package_dirpath = tmp_path / "mypackage"
+        (package_dirpath / "sub").mkdir(parents=True)
+        (package_dirpath / "__init__.py").write_text("from .mypackage import *")
+        (package_dirpath / "mypackage.py").write_text(
+            "import os, json\n"
+            "from cleverdict import CleverDict\n"
+            "import keyring.backend\n"
+            "from . import helpers\n"
+            "import helpers\n"
+            "from sub import tools\n"
+            "def later():\n"
+            "    import not_installed_module\n"
+        )
+        (package_dirpath / "helpers.py").write_text("import mypackage")
+        (package_dirpath / "sub" / "tools.py").write_text("x = (")  # SyntaxError
+        (package_dirpath / "test_mypackage.py").write_text("import pytest")
+        return package_dirpath
+
+    def test_requirements(self, tmp_path):
+        requirements = scan_requirements(self.create_package(tmp_path))
+        assert requirements == ["cleverdict", "keyring", "not_installed_module"]
+
+    def test_cached_by_hash(self, tmp_path, monkeypatch):
+        package_dirpath = self.create_package(tmp_path)
+        cache_filepath = tmp_path / "import_cache.json"
+        first = scan_requirements(package_dirpath, cache_filepath)
+        imports.IMPORT_CACHE.clear()
+        parsed = []
+        original = imports.get_top_level_imports
+        monkeypatch.setattr(
+            imports,
+            "get_top_level_imports",
+            lambda source: parsed.append(source) or original(source),
+        )
+        assert scan_requirements(package_dirpath, cache_filepath) == first
+        assert parsed == []
+        (package_dirpath / "helpers.py").write_text("import mechanicalsoup")
+        assert "MechanicalSoup" in scan_requirements(package_dirpath, cache_filepath)
+        assert parsed == [b"import mechanicalsoup"]
+
+    def test_default_requirements(self, headless, tmp_path):
+        headless.responses.append(str(tmp_path))
+        package = Package("test", _break=True)
+        assert package.get_default_requirements() == "cleverdict"
+        (tmp_path / "test" / "test" / "test.py").write_text("import json")
+        assert package.get_default_requirements() == ""
+        (tmp_path / "test" / "test" / "test.py").write_text("import keyring")
+        assert package.get_default_requirements() == "keyring"
+
+
+class Test_Validation:
+    values = {
+        "name": "as_easy_as_pie",
+        "version": "0.1",
+        "description": "A test package",
+        "email": "testuser@example.com",
+        "url": "https://github.com/testuser/as_easy_as_pie",
+        "classifiers": "License :: OSI Approved :: MIT License",
+        "requirements": "cleverdict, packaging>=20; python_version >= '3.6'",
+    }
+
+    def test_valid(self):
+        assert validate_metadata(self.values) == {}
+
+    @pytest.mark.parametrize(
+        "attribute, value",
+        [
+            ("name", "-easy pie"),
+            ("version", "version 1"),
+            ("description", "Two\nlines"),
+            ("email", "testuser"),
+            ("url", "github.com/testuser"),
+            ("classifiers", "License :: Made Up"),
+            ("requirements", "cleverdict, "),
+            ("requirements", "cleverdict >> 1"),
+        ],
+    )
+    def test_invalid(self, attribute, value):
+        problems = validate_metadata({**self.values, attribute: value})
+        assert list(problems) == [attribute]
+
+    def test_classifier_with_comma(self):
+        cecill = [x for x in CLASSIFIER_LIST if x.endswith("(CeCILL-2.1)")][0]
+        classifiers = f"Development Status :: 3 - Alpha, {cecill}"
+        assert split_classifiers(classifiers)[1] == cecill
+        assert validate_metadata({**self.values, "classifiers": classifiers}) == {}
+        assert split_classifiers(cecill.replace(", ", ",")) == [cecill]
+
+    def test_missing_name_and_version(self):
+        problems = validate_metadata({})
+        assert list(problems) == ["name", "version"]
+
+    def test_cached(self):
+        validate_field.cache_clear()
+        validate_metadata(self.values)
+        validate_metadata(self.values)
+        assert validate_field.cache_info().hits == len(VALIDATORS)
+
+    def test_default_requirements(self, headless, tmp_path):
+        headless.responses.append(str(tmp_path))
+        package = Package("test", _break=True)
+        requirements = package.get_default_requirements()
+        assert not validate_field("requirements", requirements)
+
+    def test_upload_stopped(self, headless, tmp_path, monkeypatch):
+        """ Invalid metadata should be reported before any upload is attempted """
+        commands = []
+        monkeypatch.setattr(os, "system", lambda x: commands.append(x) or 1)
+        headless.responses.append(str(tmp_path))
+        package = Package("test", _break=True)
+        package.version = "not a version"
+        headless.responses.append("OK")
+        assert package.upload_with_twine("PyPI") is False
+        assert "PEP 440" in headless.calls[-1][1]
+        assert not commands
+
+
+class Test_Skeletons:
+    def test_files_created(self, create_package):
+        package = create_package("first")
+        package.create_license()
+        sfp = package.setup_filepath.parent
+        assert (sfp / "LICENSE").read_text() == package.license_text
+        assert "Test User" in package.license_text
+        assert "from .first import" in (sfp / "first" / "__init__.py").read_text()
+        assert "pip install first" in (sfp / "README.md").read_text()
+        assert (sfp / "first" / "first.py").is_file()
+        assert (sfp / "first" / "test_first.py").is_file()
+
+    def test_snapshot_reused(self, tmp_path, create_package):
+        create_package("first")
+        create_package("second")
+        skeletons_dirpath = Package.config_filepath.parent / "skeletons"
+        assert len(list(skeletons_dirpath.iterdir())) == 1
+        assert "pip install second" in (tmp_path / "second" / "README.md").read_text()
+        create_package("third", "Apache License 2.0")
+        assert len(list(skeletons_dirpath.iterdir())) == 2
+
+    def test_existing_files_preserved(self, create_package):
+        package = create_package("first")
+        readme = package.setup_filepath.parent / "README.md"
+        readme.write_text("My own README")
+        package.author = "New Author"
+        package.create_essential_files()
+        assert readme.read_text() == "My own README"
+        license_text = (package.setup_filepath.parent / "LICENSE").read_text()
+        assert "New Author" in license_text
+
+
+class Test_Watch:
+    def test_polling(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "existing.py").write_text("old")
+        watcher = PollingWatcher([(tmp_path, True)], interval=0.01)
+        assert watcher.read(0) == set()
+        (tmp_path / "sub" / "new.py").write_text("new")
+        (tmp_path / "existing.py").unlink()
+        (tmp_path / ".hidden").write_text("ignored")
+        expected = {tmp_path / "sub" / "new.py", tmp_path / "existing.py"}
+        assert watcher.read(1) == expected
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+    def test_inotify(self, tmp_path):
+        watcher = InotifyWatcher([(tmp_path, True)])
+        try:
+            (tmp_path / "sub").mkdir()
+            assert watcher.read(1) == set()  # New folder is watched, not reported
+            (tmp_path / "sub" / "new.py").write_text("new")
+            (tmp_path / "dist").mkdir()
+            (tmp_path / "dist" / "test-0.1.tar.gz").write_text("ignored")
+            assert wait_for_changes(watcher, 0.1, 1) == {tmp_path / "sub" / "new.py"}
+        finally:
+            watcher.close()
+
+    def test_debounce(self):
+        """ Changes arriving in quick succession should be one batch """
+
+        class FakeWatcher:
+            reads = [{Path("a")}, {Path("b")}, set(), {Path("c")}, set()]
+
+            def read(self, timeout=None):
+                return self.reads.pop(0)
+
+        watcher = FakeWatcher()
+        assert wait_for_changes(watcher) == {Path("a"), Path("b")}
+        assert wait_for_changes(watcher) == {Path("c")}
+
+    def test_classify(self, tmp_path):
+        config = tmp_path / "easyPyPI" / "config.json"
+        template = tmp_path / "templates" / "readme_template.md"
+        setup_dirpath = tmp_path / "test"
+        changes = {
+            config,
+            template,
+            setup_dirpath / "test" / "test.py",
+            setup_dirpath / "test.egg-info" / "PKG-INFO",
+            tmp_path / "easyPyPI" / "import_cache.json",
+        }
+        groups = classify_changes(changes, setup_dirpath, [config], [template])
+        assert groups == {
+            "metadata": [config],
+            "templates": [template],
+            "sources": [setup_dirpath / "test" / "test.py"],
+        }
+
+    def test_own_writes(self, tmp_path):
+        filepath = tmp_path / "setup.py"
+        filepath.write_text("generated")
+        written = {}
+        record_writes(written, [filepath])
+        assert is_own_write(filepath, written)
+        filepath.write_text("edited")
+        assert not is_own_write(filepath, written)
+
+
+class Test_Watch_Stages:
+    def groups(self, metadata=(), templates=(), sources=()):
+        return {
+            "metadata": list(metadata),
+            "templates": list(templates),
+            "sources": list(sources),
+        }
+
+    def test_metadata_change(self, tmp_path, monkeypatch, package):
+        monkeypatch.setattr(Package, "run_setup_py", lambda self: None)
+        config = json.loads(Package.config_filepath.read_text())
+        config["author"] = "New Author"
+        Package.config_filepath.write_text(json.dumps(config))
+        groups = self.groups(metadata=[Package.config_filepath])
+        assert package.process_changes(groups) == ["setup.py", "LICENSE", "sdist"]
+        assert "New Author" in (tmp_path / "test" / "LICENSE").read_text()
+        assert 'AUTHOR = "New Author"' in (tmp_path / "test" / "setup.py").read_text()
+        # Nothing changed, so nothing to do:
+        assert package.process_changes(groups) == []
+
+    def test_setup_field_change(self, tmp_path, package):
+        """ Fields not used in LICENSE shouldn't regenerate it """
+        lines = package.script_lines
+        setup_filepath = tmp_path / "test" / "setup.py"
+        lines = update_line(lines, "VERSION = ", "0.2") + ["# Custom line\n"]
+        setup_filepath.write_text("".join(lines))
+        groups = self.groups(metadata=[setup_filepath])
+        assert package.process_changes(groups, build=False) == ["setup.py"]
+        assert package.version == "0.2"
+        assert "# Custom line" in setup_filepath.read_text()
+
+    def test_license_change(self, tmp_path, package):
+        """ A new License classifier should regenerate LICENSE """
+        setup_filepath = tmp_path / "test" / "setup.py"
+        classifier = "License :: OSI Approved :: Apache Software License"
+        lines = update_line(package.script_lines, "CLASSIFIERS = ", classifier)
+        setup_filepath.write_text("".join(lines))
+        groups = self.groups(metadata=[setup_filepath])
+        outputs = package.process_changes(groups, build=False)
+        assert outputs == ["setup.py", "LICENSE"]
+        assert package.license_name_pypi == "Apache Software License"
+        assert "Apache License" in (tmp_path / "test" / "LICENSE").read_text()
+
+    def test_source_change(self, tmp_path, monkeypatch, package):
+        builds = []
+        monkeypatch.setattr(Package, "run_setup_py", lambda self: builds.append(1))
+        groups = self.groups(sources=[tmp_path / "test" / "test" / "test.py"])
+        assert package.process_changes(groups) == ["sdist"]
+        assert builds == [1]
+
+    def test_template_change(self, tmp_path, monkeypatch, package):
+        templates_dirpath = tmp_path / "templates"
+        shutil.copytree(Package.easypypi_dirpath, templates_dirpath)
+        monkeypatch.setattr(Package, "easypypi_dirpath", templates_dirpath)
+        readme_template = templates_dirpath / "readme_template.md"
+        readme_template.write_text("# {self.name} has a new README")
+        groups = self.groups(templates=[readme_template])
+        assert package.process_changes(groups, build=False) == ["README.md"]
+        readme = (tmp_path / "test" / "README.md").read_text()
+        assert readme == "# test has a new README"
+        # Edited again by a template change, so still safe to replace:
+        readme_template.write_text("# {self.name} has another new README")
+        assert package.process_changes(groups, build=False) == ["README.md"]
+
+    def test_template_change_edited(self, tmp_path, monkeypatch, package):
+        """ User code in former starter files should survive template edits """
+        templates_dirpath = tmp_path / "templates"
+        shutil.copytree(Package.easypypi_dirpath, templates_dirpath)
+        monkeypatch.setattr(Package, "easypypi_dirpath", templates_dirpath)
+        script_filepath = tmp_path / "test" / "test" / "test.py"
+        script_filepath.write_text("def main():\n    return 'user code'\n")
+        script_template = templates_dirpath / "script_template.py"
+        script_template.write_text("# New script template for {self.name}")
+        groups = self.groups(templates=[script_template])
+        assert package.process_changes(groups, build=False) == []
+        assert "user code" in script_filepath.read_text()
+
+    def test_watch(self, tmp_path, monkeypatch, package):
+        """ Own writes (e.g. setup.py, config.json) shouldn't trigger more work """
+        monkeypatch.setattr(Package, "run_setup_py", lambda self: None)
+        source = tmp_path / "test" / "test" / "test.py"
+        threading.Timer(0.2, lambda: source.write_text("import os")).start()
+        history = package.watch(debounce=0.1, timeout=1)
+        assert history == [["sdist"]]
+
+
+class Test_Copy_Files:
+    def create_sources(self, tmp_path):
+        source_dirpath = tmp_path / "source"
+        source_dirpath.mkdir()
+        for index in range(20):
+            (source_dirpath / f"data_{index}.json").write_text("x" * index * 1000)
+        destination = tmp_path / "destination"
+        destination.mkdir()
+        return sorted(source_dirpath.iterdir()), destination
+
+    def test_copy_file(self, tmp_path):
+        source = tmp_path / "big.bin"
+        source.write_bytes(os.urandom(3 * 1024 * 1024))
+        destination = tmp_path / "copy.bin"
+        copy_file(source, destination)
+        assert destination.read_bytes() == source.read_bytes()
+
+    def test_new_files(self, tmp_path):
+        sources, destination = self.create_sources(tmp_path)
+        results = copy_files(sources, destination)
+        assert results["copied"] == sources
+        assert all((destination / x.name).read_text() == x.read_text() for x in sources)
+
+    def test_unchanged_files_skipped(self, tmp_path):
+        sources, destination = self.create_sources(tmp_path)
+        copy_files(sources, destination)
+        results = copy_files(sources, destination)
+        assert results["copied"] == []
+        assert results["unchanged"] == sources
+
+    def test_single_overwrite_prompt(self, tmp_path):
+        """ Collisions should be resolved with one call, not one per file """
+        sources, destination = self.create_sources(tmp_path)
+        copy_files(sources, destination)
+        for source in sources[:5]:
+            source.write_text("changed")
+        calls = []
+        results = copy_files(
+            sources, destination, overwrite=lambda files: calls.append(files) or False
+        )
+        assert calls == [sources[:5]]
+        assert results["preserved"] == sources[:5]
+        assert (destination / sources[0].name).read_text() != "changed"
+        results = copy_files(sources, destination, overwrite=True)
+        assert results["copied"] == sources[:5]
+        assert (destination / sources[0].name).read_text() == "changed"
+
+    def test_cancel(self, tmp_path):
+        sources, destination = self.create_sources(tmp_path)
+        copy_files(sources, destination)
+        sources[0].write_text("changed")
+        assert copy_files(sources, destination, overwrite=lambda files: None) is None
+
+
+class Test_Package_Data_Report:
+    def create_package(self, tmp_path):
+        (tmp_path / "setup.py").write_text("# setup")
+        (tmp_path / "README.md").write_text("# readme")
+        (tmp_path / "notes.txt").write_text("not included")
+        package_dirpath = tmp_path / "test"
+        package_dirpath.mkdir()
+        (package_dirpath / "__init__.py").write_text("")
+        (package_dirpath / "data.csv").write_bytes(b"1,2,3\n" * 250000)
+        (package_dirpath / "copy.csv").write_bytes(b"1,2,3\n" * 250000)
+        (package_dirpath / "no_extension").write_text("not included")
+        (tmp_path / "build" / "lib").mkdir(parents=True)
+        (tmp_path / "build" / "lib" / "__init__.py").write_text("")
+        return tmp_path
+
+    def test_sdist_files(self, tmp_path):
+        setup_dirpath = self.create_package(tmp_path)
+        files = [
+            x.relative_to(setup_dirpath).as_posix()
+            for x in get_sdist_files(setup_dirpath, "test")
+        ]
+        assert sorted(files) == [
+            "README.md",
+            "setup.py",
+            "test/__init__.py",
+            "test/copy.csv",
+            "test/data.csv",
+        ]
+
+    def test_flags(self, tmp_path):
+        setup_dirpath = self.create_package(tmp_path)
+        report = get_package_data_report(setup_dirpath, "test")
+        flags = {x["path"].as_posix(): x["flags"] for x in report}
+        assert "large" in flags["test/data.csv"]
+        assert any(
+            "duplicate" in x for x in flags["test/data.csv"] + flags["test/copy.csv"]
+        )
+        assert flags["setup.py"] == []
+        assert all(x["compressed_size"] < x["size"] for x in report if x["flags"])
+
+    def test_empty_files(self, tmp_path):
+        """ Several empty __init__.py files are normal, not duplicates """
+        setup_dirpath = self.create_package(tmp_path)
+        (setup_dirpath / "test" / "sub").mkdir()
+        (setup_dirpath / "test" / "sub" / "__init__.py").write_text("")
+        report = get_package_data_report(setup_dirpath, "test")
+        flags = {x["path"].as_posix(): x["flags"] for x in report}
+        assert flags["test/__init__.py"] == flags["test/sub/__init__.py"] == []
+
+    def test_format(self, tmp_path):
+        report = get_package_data_report(self.create_package(tmp_path), "test")
+        assert "Total (5 files)" in format_package_data_report(report)
+
+
+def create_setup_py(dirpath, name, version):
+    """ Creates a minimal easyPyPI style setup.py from setup_template.py """
+    template = Package.easypypi_dirpath / "setup_template.py"
+    lines = template.read_text().splitlines(True)
+    lines = update_line(lines, "NAME = ", name)
+    lines = update_line(lines, "VERSION = ", version)
+    setup_filepath = dirpath / name / "setup.py"
+    setup_filepath.parent.mkdir(parents=True)
+    setup_filepath.write_text("".join(lines))
+    return setup_filepath
+
+
+class Test_Discovery:
+    def create_tree(self, root):
+        create_setup_py(root / "libs", "alpha", "1.0")
+        create_setup_py(root / "apps", "beta", "2.0")
+        (root / "apps" / "beta" / "pyproject.toml").write_text(
+            create_pyproject_text({"name": "beta", "version": "2.1"})
+        )
+        create_setup_py(root / "venv", "ignored", "0.1")
+        (root / "other").mkdir()
+        (root / "other" / "setup.py").write_text("from setuptools import setup")
+
+    def test_discover(self, tmp_path):
+        self.create_tree(tmp_path)
+        packages = discover_packages(tmp_path)
+        assert [(x["name"], x["version"]) for x in packages] == [
+            ("beta", "2.1"),  # pyproject.toml preferred to setup.py
+            ("alpha", "1.0"),
+        ]
+        assert packages[0]["path"].endswith("pyproject.toml")
+
+    def test_index(self, tmp_path, monkeypatch):
+        """ Only new or changed files should be read again """
+        root = tmp_path / "root"
+        self.create_tree(root)
+        index_filepath = tmp_path / "index.json"
+        first = discover_packages(root, index_filepath)
+        read = []
+        original = discovery.read_managed_metadata
+        monkeypatch.setattr(
+            discovery,
+            "read_managed_metadata",
+            lambda x: read.append(x.name) or original(x),
+        )
+        assert discover_packages(root, index_filepath) == first
+        assert read == []
+        create_setup_py(root / "libs", "gamma", "0.1")
+        packages = discover_packages(root, index_filepath)
+        assert read == ["setup.py"]
+        assert "gamma" in [x["name"] for x in packages]
+        assert len(json.loads(index_filepath.read_text())) == 5
+
+
+class Test_Dry_Run:
+    def test_estimate(self):
+        assert estimate_upload_seconds([]) == 0
+        seconds = estimate_upload_seconds([3000000, 1000000], bytes_per_second=2e6)
+        assert seconds == 2 + 2 * UPLOAD_OVERHEAD_SECONDS
+
+    def test_package(self, tmp_path, package):
+        """ Everything should be built, but no files changed in the package """
+        setup_dirpath = tmp_path / "test"
+        before = {x: get_file_hash(x) for x in setup_dirpath.rglob("*") if x.is_file()}
+        package.version = "0.2"  # Not saved in setup.py yet
+        report = package.dry_run()
+        after = {x: get_file_hash(x) for x in setup_dirpath.rglob("*") if x.is_file()}
+        assert after == before
+        assert report["problems"] == {}
+        assert list(report["stages"]) == ["load", "validate", "copy", "render", "build"]
+        assert list(report["artifacts"]) == ["test-0.2.tar.gz"]
+        assert report["upload_seconds"] > UPLOAD_OVERHEAD_SECONDS
+        assert "test-0.2" not in format_dry_run_report([report])  # Just sizes
+        assert "1 package(s)" in format_dry_run_report([report])
+        assert 'VERSION = "0.2"\n' not in package.script_lines
+
+    def test_batch(self, tmp_path):
+        for name, version in [("alpha", "1.0"), ("beta", "not a version")]:
+            create_setup_py(tmp_path, name, version)
+            (tmp_path / name / "README.md").write_text(f"# {name}")
+        results = dry_run_packages(discover_packages(tmp_path))
+        alpha, beta = results["reports"]["alpha"], results["reports"]["beta"]
+        assert list(alpha["artifacts"]) == ["alpha-1.0.tar.gz"]
+        assert list(beta["problems"]) == ["version"]
+        assert not list((tmp_path / "alpha").glob("dist"))
+        assert results["upload_seconds"] >= UPLOAD_OVERHEAD_SECONDS
+
+
+class Test_Readme:
+    @pytest.mark.parametrize(
+        "text, problem",
+        [
+            ("# Title\n\nSome text", None),
+            ("  \n", "README.md is empty"),
+            ("# {self.name}", "Template placeholders not replaced: {self.name}"),
+            ("![logo](logo.png)", None),
+            ("```python\nprint()\n", "A code block (```) isn't closed"),
+        ],
+    )
+    def test_offline_checks(self, text, problem, monkeypatch):
+        monkeypatch.setattr(readme, "readme_renderer", None)
+        problems = check_readme_text(text)
+        assert problems == [] if problem is None else problem in problems[0]
+
+    def test_warnings(self, tmp_path):
+        """ Images which won't display on PyPI shouldn't stop uploads """
+        text = "![logo](logo.png)\n![badge](https://example.com/badge.svg)"
+        assert get_readme_warnings(text) == [
+            "Relative image links don't display on PyPI: logo.png"
+        ]
+        filepath = tmp_path / "README.md"
+        filepath.write_text(text)
+        assert check_readme(filepath) == []
+
+    def test_cache(self, tmp_path, monkeypatch):
+        """ Unchanged READMEs shouldn't be checked again, even in a new session """
+        monkeypatch.setattr(readme, "README_CACHE", {})
+        monkeypatch.setattr(readme, "LOADED_CACHE_FILEPATHS", set())
+        filepath = tmp_path / "README.md"
+        filepath.write_text("# {self.name}")
+        cache_filepath = tmp_path / README_CACHE_FILENAME
+        assert check_readme(filepath, cache_filepath)
+        monkeypatch.setattr(readme, "README_CACHE", {})
+        monkeypatch.setattr(readme, "LOADED_CACHE_FILEPATHS", set())
+        checked = []
+        monkeypatch.setattr(
+            readme, "check_readme_text", lambda x: checked.append(x) or []
+        )
+        assert check_readme(filepath, cache_filepath)
+        assert checked == []
+        filepath.write_text("# Fixed")
+        assert check_readme(filepath, cache_filepath) == []
+        assert checked == ["# Fixed"]
+        assert len(json.loads(cache_filepath.read_text())) == 2
+
+    def test_cache_loaded_once(self, tmp_path, monkeypatch):
+        """ The cache file is read once per session, and old results pruned """
+        monkeypatch.setattr(readme, "README_CACHE", {})
+        monkeypatch.setattr(readme, "LOADED_CACHE_FILEPATHS", set())
+        monkeypatch.setattr(readme, "README_CACHE_SIZE", 2)
+        original = readme.check_readme_text
+        checked = []
+        monkeypatch.setattr(
+            readme, "check_readme_text", lambda x: checked.append(x) or original(x)
+        )
+        cache_filepath = tmp_path / README_CACHE_FILENAME
+        cache_filepath.write_text("{}")
+        filepath = tmp_path / "README.md"
+        for text in ["# One", "# Two", "# One", "# Three", "# One", "# Two"]:
+            filepath.write_text(text)
+            assert check_readme(filepath, cache_filepath) == []
+            cache_filepath.write_text("{}")  # Only read at the start of a session
+        # "# Two" was pruned as the least recently used when "# Three" was added:
+        assert checked == ["# One", "# Two", "# Three", "# Two"]
+        assert len(readme.README_CACHE) == 2
+
+    def test_encoding(self, tmp_path):
+        filepath = tmp_path / "README.md"
+        filepath.write_bytes("# Café".encode("cp1252"))
+        assert check_readme(filepath) == ["README.md isn't UTF-8 encoded"]
+        assert check_readme(tmp_path / "missing.md") == ["missing.md not found"]
+
+    def test_upload_with_twine(self, headless, tmp_path, package):
+        (tmp_path / "test" / "README.md").write_text("# {self.name}")
+        headless.responses.append("OK")
+        assert package.upload_with_twine("PyPI") is False
+        assert "{self.name}" in headless.calls[-1][1]
+
+
+class Test_Ledger:
+    def test_ledger(self, tmp_path):
+        ledger_filepath = tmp_path / LEDGER_FILENAME
+        assert not is_published(ledger_filepath, "test", "0.1")
+        sdist = tmp_path / "test-0.1.tar.gz"
+        sdist.write_bytes(b"x" * 1000)
+        record_upload(ledger_filepath, "Test", "0.1", "testpypi", sdist, 0, 2.0, False)
+        assert not is_published(ledger_filepath, "test", "0.1")
+        record_upload(ledger_filepath, "Test", "0.1", "testpypi", sdist, 60, 0.5, True)
+        assert is_published(ledger_filepath, "TEST", "0.1")
+        assert is_published(ledger_filepath, "test", "0.1", "testpypi")
+        assert not is_published(ledger_filepath, "test", "0.1", "pypi")
+        history = get_history(ledger_filepath, "test")
+        assert [x["success"] for x in history] == [0, 1]
+        assert history[1]["sha256"] == get_file_hash(sdist)
+        assert get_throughput(ledger_filepath) == [
+            {
+                "period": "1970-01-01",
+                "repository": "testpypi",
+                "uploads": 2,
+                "failures": 1,
+                "bytes": 1000,
+                "seconds": 0.5,
+                "bytes_per_second": 2000,
+            }
+        ]
+
+    def test_append_only(self, tmp_path):
+        ledger_filepath = tmp_path / LEDGER_FILENAME
+        record_upload(ledger_filepath, "test", "0.1", "pypi", None, 0, 1, True)
+        with closing(connect(ledger_filepath)) as connection:
+            with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+                connection.execute("DELETE FROM uploads")
+            with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+                connection.execute("UPDATE uploads SET success = 0")
+        assert is_published(ledger_filepath, "test", "0.1")
+
+    def test_publisher(self, tmp_path):
+        """ Packages already published shouldn't be built or uploaded again """
+        ledger_filepath = tmp_path / LEDGER_FILENAME
+        packages = [
+            {"name": "core", "version": "1.0", "requirements": []},
+            {"name": "app", "version": "1.0", "requirements": ["core"]},
+        ]
+        built = []
+
+        def build(package):
+            built.append(package["name"])
+            return package["name"]
+
+        upload = lambda package, artifact: package["name"] == "core"
+        with pytest.raises(ValueError, match="repository is required"):
+            publish_packages(packages, build, upload, ledger_filepath=ledger_filepath)
+        publish_packages(packages, build, upload, None, "testpypi", ledger_filepath)
+        assert is_published(ledger_filepath, "core", "1.0", "testpypi")
+        built.clear()
+        packages.append({"name": "unversioned", "requirements": []})
+        results = publish_packages(
+            packages, build, lambda *args: True, None, "testpypi", ledger_filepath
+        )
+        assert built == ["app"]
+        assert results["core"]["status"] == "already published"
+        assert results["app"]["status"] == "published"
+        assert results["unversioned"]["status"] == "skipped"
+        assert len(get_history(ledger_filepath)) == 3
+
+    def test_upload_with_twine(self, package):
+        ledger_filepath = Package.config_filepath.parent / LEDGER_FILENAME
+        record_upload(ledger_filepath, "test", "0.1", "pypi", None, 0, 1, True)
+        assert package.upload_with_twine("PyPI") is False
+
+
+class Test_Upload_Targets:
+    def test_local_targets(self, tmp_path):
+        sdist = tmp_path / "test-0.1.tar.gz"
+        sdist.write_bytes(b"test")
+        staging, production = tmp_path / "staging", tmp_path / "production"
+        targets = [staging, production.as_uri()]
+        assert get_local_index_dirpath(targets[1]) == production
+        assert get_local_index_dirpath("testpypi") is None
+        results = upload_to_targets([sdist], targets)
+        assert [x["status"] for x in results.values()] == ["published"] * 2
+        for index_dirpath in [staging, production]:
+            assert get_index_versions(index_dirpath, "test") == {"0.1"}
+
+    def test_concurrent(self, tmp_path):
+        """ Targets should be uploaded to at the same time, and independently """
+        barrier = threading.Barrier(3, timeout=5)
+
+        def upload(filepaths, target):
+            barrier.wait()
+            if target == "broken":
+                raise RuntimeError("Broken")
+            return True
+
+        results = upload_to_targets(["test.tar.gz"], ["a", "broken", "b"], upload)
+        assert {x: y["status"] for x, y in results.items()} == {
+            "a": "published",
+            "broken": "upload failed",
+            "b": "published",
+        }
+        assert "Broken" in format_target_report(results)
+
+    def test_package(self, tmp_path, package):
+        """ One build should be uploaded to each target, unless already there """
+        targets = [tmp_path / "staging", tmp_path / "production"]
+        results = package.upload_to_targets(targets)
+        assert [x["status"] for x in results.values()] == ["published"] * 2
+        sdists = list((tmp_path / "test" / "dist").glob("*.tar.gz"))
+        assert len(sdists) == 1
+        for index_dirpath in targets:
+            copied = index_dirpath / "test" / sdists[0].name
+            assert get_file_hash(copied) == get_file_hash(sdists[0])
+        shutil.rmtree(tmp_path / "test" / "dist")
+        package.upload_targets = [x.as_uri() for x in targets]
+        results = package.upload_to_targets()
+        assert [x["status"] for x in results.values()] == ["already published"] * 2
+        assert not (tmp_path / "test" / "dist").exists()  # Not built again
+        ledger_filepath = Package.config_filepath.parent / LEDGER_FILENAME
+        assert len(get_history(ledger_filepath, "test")) == 2
+
+    def test_confirm_pypi(self, headless, package):
+        """ PyPI is only a default target once confirmed """
+        headless.responses.append(None)
+        assert package.upload_to_targets() is False
+        ledger_filepath = Package.config_filepath.parent / LEDGER_FILENAME
+        record_upload(
+            ledger_filepath, "test", package.version, "testpypi", None, 0, 0, 1
+        )
+        headless.responses.append("No")
+        results = package.upload_to_targets()
+        assert list(results) == ["testpypi"]
+        assert "PyPI as well as Test PyPI" in headless.calls[-1][1]
+
+
+class Test_Publisher:
+    PACKAGES = [
+        {"name": "App", "requirements": ["core>=1.0", "cleverdict"]},
+        {"name": "core", "requirements": []},
+        {"name": "plugin", "requirements": "App, core"},
+        {"name": "unrelated", "requirements": ["core"]},
+        {"name": "standalone", "requirements": []},
+    ]
+
+    def test_waves(self):
+        graph = get_dependency_graph(self.PACKAGES)
+        assert graph["app"] == {"core"}  # cleverdict isn't being published
+        assert get_waves(graph) == [
+            ["core", "standalone"],
+            ["app", "unrelated"],
+            ["plugin"],
+        ]
+
+    def test_circular(self):
+        graph = {"a": {"b"}, "b": {"a"}, "c": set()}
+        with pytest.raises(ValueError, match="a, b"):
+            get_waves(graph)
+
+    def test_publish(self):
+        """ Uploads in each wave should run at the same time, in order """
+        barrier = threading.Barrier(2, timeout=5)
+        uploaded = []
+
+        def upload(package, artifact):
+            if package["name"] in ["core", "standalone"]:
+                barrier.wait()
+            uploaded.append(artifact)
+            return True
+
+        results = publish_packages(self.PACKAGES, lambda x: x["name"], upload)
+        assert {x["status"] for x in results.values()} == {"published"}
+        assert uploaded.index("plugin") > uploaded.index("App") > uploaded.index("core")
+
+    def test_failures(self):
+        """ Only dependents of a failed package should be skipped """
+
+        def build(package):
+            if package["name"] == "standalone":
+                raise RuntimeError("Broken")
+            return package["name"]
+
+        results = publish_packages(
+            self.PACKAGES, build, lambda package, artifact: artifact != "App"
+        )
+        assert {x: y["status"] for x, y in results.items()} == {
+            "standalone": "build failed",
+            "core": "published",
+            "app": "upload failed",
+            "unrelated": "published",
+            "plugin": "skipped",
+        }
+        assert results["plugin"]["error"] == "Requires unpublished: app"
+        assert "standalone" in format_publish_report(results)
+
+    @pytest.mark.parametrize("options", [[], ["--dry-run"]])
+    def test_cli_circular_dependency(self, tmp_path, options, caplog):
+        """ The cycle should be named, without a traceback """
+        for name, requirement in [("alpha", "beta"), ("beta", "alpha")]:
+            setup_filepath = create_setup_py(tmp_path, name, "1.0")
+            lines = setup_filepath.read_text().splitlines(True)
+            lines = update_line(lines, "REQUIREMENTS = ", requirement)
+            setup_filepath.write_text("".join(lines))
+        arguments = [str(tmp_path), "--index", str(tmp_path / "index.json")]
+        result = CliRunner().invoke(publisher_main, arguments + options)
+        assert result.exit_code == 1
+        assert isinstance(result.exception, SystemExit)
+        assert "Circular dependency between: alpha, beta" in caplog.text
+
+    def test_default_build_validates(self, tmp_path):
+        """ Invalid metadata should stop a package being built or uploaded """
+        create_setup_py(tmp_path, "alpha", "not a version")
+        (tmp_path / "alpha" / "README.md").write_text("# alpha")
+        uploaded = []
+        results = publish_packages(
+            discover_packages(tmp_path), upload=lambda *args: uploaded.append(args)
+        )
+        assert results["alpha"]["status"] == "build failed"
+        assert "version" in str(results["alpha"]["error"])
+        assert not list((tmp_path / "alpha").glob("dist"))
+        assert uploaded == []
+
+
+class Test_Pyproject:
+    values = {
+        "name": "test",
+        "version": "0.1",
+        "description": 'A "quoted" description \\ with backslash',
+        "license_name_github": "MIT License",
+        "author": "Test User",
+        "email": "testuser@example.com",
+        "url": "https://github.com/testuser/test",
+        "keywords": "test, keywords",
+        "classifiers": "License :: OSI Approved :: MIT License",
+        "requirements": "cleverdict, packaging>=20,",
+        "Github_username": "testuser",
+    }
+
+    def test_round_trip(self, tmp_path):
+        filepath = tmp_path / "pyproject.toml"
+        filepath.write_text(create_pyproject_text(self.values))
+        fields = read_pyproject_fields(filepath)
+        assert fields == {**self.values, "requirements": "cleverdict, packaging>=20"}
+
+    def test_other_tools_only(self, tmp_path):
+        filepath = tmp_path / "pyproject.toml"
+        filepath.write_text("[tool.black]\nline-length = 88\n")
+        assert "name" not in read_pyproject_fields(filepath)
+
+    def test_load_defaults(self, headless, tmp_path):
+        (tmp_path / "test").mkdir()
+        pyproject = tmp_path / "test" / "pyproject.toml"
+        pyproject.write_text(create_pyproject_text(self.values))
+        headless.responses.append(str(tmp_path))
+        package = Package("test", _break=True)
+        assert package.use_pyproject
+        assert package.author == "Test User"
+
+    def test_unmanaged_not_loaded(self, headless, tmp_path):
+        (tmp_path / "test").mkdir()
+        pyproject = tmp_path / "test" / "pyproject.toml"
+        pyproject.write_text('[project]\nname = "test"\nversion = "3.0"\n')
+        headless.responses.append(str(tmp_path))
+        package = Package("test", _break=True)
+        assert not package.get("use_pyproject")
+        assert package.version != "3.0"
+
+    def test_merge_keeps_customisations(self, tmp_path):
+        old_text = create_pyproject_text(self.values)
+        old_text = old_text.replace('"wheel"]', '"wheel", "cython"]')
+        old_text = old_text.replace(
+            "\n[project.urls]",
+            'requires-python = ">=3.8"\n\n'
+            '[project.optional-dependencies]\ntest = ["pytest"]\n\n[project.urls]',
+        )
+        old_text += "\n[tool.black]\nline-length = 100\n"
+        new_text = create_pyproject_text({**self.values, "version": "0.2"})
+        data = tomllib.loads(merge_pyproject_text(old_text, new_text))
+        assert data["project"]["version"] == "0.2"
+        assert data["project"]["requires-python"] == ">=3.8"
+        assert data["project"]["optional-dependencies"] == {"test": ["pytest"]}
+        assert data["build-system"]["requires"][-1] == "cython"
+        assert data["tool"]["black"] == {"line-length": 100}
+
+    def test_backup(self, tmp_path):
+        filepath = tmp_path / "pyproject.toml"
+        filepath.write_text(create_pyproject_text(self.values))
+        create_file(filepath, create_pyproject_text(self.values), overwrite=True)
+        assert (tmp_path / "pyproject - old.toml").is_file()
+
+    def test_release_plan(self, tmp_path):
+        filepath = tmp_path / "pyproject.toml"
+        text = create_pyproject_text(self.values) + "\n[tool.black]\nline-length = 1\n"
+        filepath.write_text(text)
+        plan = plan_releases([filepath], "Next Minor")
+        assert apply_release_plan(plan)
+        assert read_pyproject_fields(filepath)["version"] == "0.2.0"
+        assert filepath.read_text() == text.replace('"0.1"', '"0.2.0"', 1)
+
+    def test_build_sdist(self, tmp_path):
+        """ PEP 517 build without running (or needing) setup.py """
+        values = {**self.values, "requirements": ""}
+        (tmp_path / "pyproject.toml").write_text(create_pyproject_text(values))
+        (tmp_path / "README.md").write_text("# test")
+        (tmp_path / "LICENSE").write_text("MIT")
+        (tmp_path / "test").mkdir()
+        (tmp_path / "test" / "__init__.py").write_text("")
+        sdist_filepath = build_sdist(tmp_path)
+        assert sdist_filepath.name == "test-0.1.tar.gz"
+        assert sdist_filepath.is_file()
+
+
+class Test_Release_Plan:
+    def test_bump_version(self):
+        assert bump_version("0.0.1a1", "Next Alpha") == "0.0.1a2"
+        assert bump_version("0.0.1a1", "Next Release Candidate") == "0.0.1rc1"
+        assert bump_version("1.2.3", "minor") == "1.3.0"
+
+    def test_plan(self, tmp_path):
+        filepaths = [
+            create_setup_py(tmp_path, f"package_{index}", f"1.{index}.0")
+            for index in range(3)
+        ]
+        plan = plan_releases(filepaths, "Next Micro")
+        assert [x["next"] for x in plan] == ["1.0.1", "1.1.1", "1.2.1"]
+        assert not any(x["collision"] for x in plan)
+
+    def test_config_file(self, tmp_path):
+        config_filepath = tmp_path / "config.json"
+        config_filepath.write_text(json.dumps({"name": "test", "version": "0.1"}))
+        plan = plan_releases([config_filepath], "Next Major")
+        assert apply_release_plan(plan)
+        assert json.loads(config_filepath.read_text())["version"] == "1.0.0"
+
+    def test_collision(self, tmp_path):
+        filepaths = [
+            create_setup_py(tmp_path, "package_a", "1.0.0"),
+            create_setup_py(tmp_path, "package_b", "2.0.0"),
+        ]
+        index_dirpath = tmp_path / "index"
+        (index_dirpath / "package-b").mkdir(parents=True)
+        (index_dirpath / "package-b" / "package_b-2.0.1.tar.gz").write_text("")
+        plan = plan_releases(filepaths, "Next Micro", index_dirpath)
+        assert [x["collision"] for x in plan] == [False, True]
+        assert not apply_release_plan(plan)
+        assert read_name_and_version(filepaths[0]) == ("package_a", "1.0.0")
+
+    def test_unplannable(self, tmp_path):
+        filepaths = [
+            create_setup_py(tmp_path, "package_a", "1.0.0"),
+            create_setup_py(tmp_path, "package_b", ""),
+            create_setup_py(tmp_path, "package_c", "not a version"),
+        ]
+        plan = plan_releases(filepaths, "Next Micro")
+        assert [x["next"] for x in plan] == ["1.0.1", None, None]
+        assert plan[1]["error"] == "No version found"
+        assert plan[2]["error"].startswith("Invalid version")
+        assert not apply_release_plan(plan)
+        assert read_name_and_version(filepaths[0]) == ("package_a", "1.0.0")
+
+    def test_apply(self, tmp_path):
+        filepaths = [
+            create_setup_py(tmp_path, f"package_{index}", "0.1") for index in range(3)
+        ]
+        assert apply_release_plan(plan_releases(filepaths, "Next Minor"))
+        for filepath in filepaths:
+            assert read_name_and_version(filepath)[1] == "0.2.0"
+
+
+class Test_Local_Index:
+    def test_add_to_index(self, tmp_path):
+        dist_dirpath = tmp_path / "dist"
+        dist_dirpath.mkdir()
+        for filename in [
+            "As_Easy-0.1.tar.gz",
+            "as_easy-0.2-py3-none-any.whl",
+            "notes.txt",
+        ]:
+            (dist_dirpath / filename).write_text("")
+        index_dirpath = tmp_path / "index"
+        added = add_to_index(index_dirpath, dist_dirpath.iterdir())
+        assert len(added) == 2
+        assert all(x.parent.name == "as-easy" for x in added)
+        assert get_index_versions(index_dirpath, "as_easy") == {"0.1", "0.2"}
+        page = (index_dirpath / "as-easy" / "index.html").read_text()
+        assert 'href="As_Easy-0.1.tar.gz"' in page
+        assert 'href="as-easy/"' in (index_dirpath / "index.html").read_text()
+
+    def test_missing_project(self, tmp_path):
+        assert get_index_versions(tmp_path, "missing") == set()
+
+
+def create_wheel(dirpath, name, version, requires=()):
+    """ Creates a minimal wheel with just METADATA in dirpath """
+    filepath = dirpath / f"{name}-{version}-py3-none-any.whl"
+    lines = ["Metadata-Version: 2.1", f"Name: {name}", f"Version: {version}"]
+    lines += [f"Requires-Dist: {x}" for x in requires]
+    with zipfile.ZipFile(filepath, "w") as archive:
+        archive.writestr(f"{name}-{version}.dist-info/METADATA", "\n".join(lines))
+    return filepath
+
+
+class Test_Resolver:
+    def create_wheelhouse(self, tmp_path):
+        wheelhouse = tmp_path / "wheelhouse"
+        wheelhouse.mkdir()
+        create_wheel(wheelhouse, "alpha", "1.0", ["beta>=2"])
+        create_wheel(wheelhouse, "alpha", "2.0", ["beta>=3", "gamma; extra == 'all'"])
+        create_wheel(wheelhouse, "beta", "2.5")
+        create_wheel(wheelhouse, "beta", "3.1")
+        create_wheel(wheelhouse, "gamma", "1.0")
+        return wheelhouse
+
+    def test_resolved(self, tmp_path):
+        store = update_metadata_store([self.create_wheelhouse(tmp_path)])
+        results = resolve_requirements("alpha, beta", store)
+        assert results["resolved"] == {"alpha": "2.0", "beta": "3.1"}
+        assert not results["conflicts"] and not results["missing"]
+
+    def test_extras(self, tmp_path):
+        store = update_metadata_store([self.create_wheelhouse(tmp_path)])
+        results = resolve_requirements("alpha[all]", store)
+        assert "gamma" in results["resolved"]
+        # Extras requested after alpha was already resolved without them:
+        results = resolve_requirements("alpha, beta, alpha[all]", store)
+        assert "gamma" in results["resolved"]
+
+    def test_conflict(self, tmp_path):
+        store = update_metadata_store([self.create_wheelhouse(tmp_path)])
+        results = resolve_requirements("alpha>=2, beta<3", store)
+        assert len(results["conflicts"]) == 1
+        assert results["conflicts"][0].startswith("beta:")
+
+    def test_missing_and_invalid(self, tmp_path):
+        store = update_metadata_store([self.create_wheelhouse(tmp_path)])
+        results = resolve_requirements("delta, alpha >> 1,", store)
+        assert results["missing"] == {"delta": ["REQUIREMENTS"]}
+        assert len(results["invalid"]) == 1
+
+    def test_store_cached(self, tmp_path, monkeypatch):
+        """ Metadata should only be read from new or changed files """
+        wheelhouse = self.create_wheelhouse(tmp_path)
+        store_filepath = tmp_path / "metadata.json"
+        first = update_metadata_store([wheelhouse], store_filepath)
+        read = []
+        monkeypatch.setattr(resolver, "read_requires", lambda x: read.append(x) or [])
+        assert update_metadata_store([wheelhouse], store_filepath) == first
+        assert read == []
+        create_wheel(wheelhouse, "delta", "0.1")
+        update_metadata_store([wheelhouse], store_filepath)
+        assert [x.name for x in read] == ["delta-0.1-py3-none-any.whl"]
+
+    def test_package(self, headless, tmp_path):
+        headless.responses.append(str(tmp_path))
+        package = Package("test", _break=True)
+        self.create_wheelhouse(Package.config_filepath.parent)
+        package.requirements = "alpha, beta<3"
+        results = package.check_requirements()
+        assert results["conflicts"]
+
+
+class Test_Venv_Pool:
+    def test_target_pythons(self):
+        classifiers = (
+            "Development Status :: 3 - Alpha, "
+            "Programming Language :: Python :: 3, "
+            "Programming Language :: Python :: 3.8, "
+            "Programming Language :: Python :: 3.9, "
+            "Programming Language :: Python :: 3 :: Only, "
+            "Programming Language :: Python :: Implementation :: PyPy"
+        )
+        assert get_target_pythons(classifiers) == ["3.8", "3.9"]
+
+    def test_find_current_python(self):
+        version = "{}.{}".format(*sys.version_info[:2])
+        assert find_python(version) == sys.executable
+
+    def test_find_missing_python(self):
+        assert find_python("2.1") is None
+
+    def test_pool_failure(self, tmp_path, monkeypatch):
+        def create_pool_venv(venv_dirpath, python, wheelhouse_dirpath):
+            raise subprocess.CalledProcessError(1, "venv", stderr=b"No ensurepip")
+
+        monkeypatch.setattr(venvs, "create_pool_venv", create_pool_venv)
+        pool, errors = get_venv_pool(tmp_path, [CURRENT_PYTHON, "2.1"], tmp_path)
+        assert pool == {}
+        assert "No ensurepip" in errors[CURRENT_PYTHON]
+        assert errors["2.1"] == "Python not found"
+
+
+@instrumentation.timed
+def inner_stage():
+    return "inner"
+
+
+@instrumentation.timed
+def outer_stage(fail=False):
+    inner_stage()
+    if fail:
+        raise ValueError
+
+
+class Test_Instrumentation:
+    def setup_method(self):
+        self.sink = instrumentation.MemorySink()
+        instrumentation.enable(self.sink, summary=False)
+
+    def teardown_method(self):
+        instrumentation.disable()
+
+    def test_disabled(self):
+        instrumentation.disable()
+        assert inner_stage() == "inner"
+        assert self.sink.records == []
+
+    def test_nested_stages(self):
+        outer_stage()
+        inner, outer = self.sink.records
+        assert inner["stage"] == "inner_stage"
+        assert inner["parent"] == "outer_stage"
+        assert inner["depth"] == 1
+        assert outer["parent"] is None
+        assert outer["seconds"] >= inner["seconds"]
+
+    def test_error(self):
+        with pytest.raises(ValueError):
+            outer_stage(fail=True)
+        assert self.sink.records[-1]["error"] == "ValueError"
+
+    def test_json_lines(self, tmp_path):
+        filepath = tmp_path / "timings.jsonl"
+        instrumentation.SINKS.append(instrumentation.JSONLinesSink(filepath))
+        outer_stage()
+        outer_stage()
+        lines = filepath.read_text().splitlines()
+        stages = [json.loads(x)["stage"] for x in lines]
+        assert stages == ["inner_stage", "outer_stage"] * 2
+
+    def test_summary(self):
+        summary = instrumentation.SummarySink()
+        instrumentation.SINKS.append(summary)
+        for _ in range(3):
+            outer_stage()
+        table = summary.get_table()
+        assert table.splitlines()[1].startswith("outer_stage")
+        assert len(summary.timings["inner_stage"]) == 3
+
+
+class Test_Logging:
+    def teardown_method(self):
+        configure_logging()
+
+    def test_default_output(self, capsys):
+        configure_logging()
+        update_line(['VERSION = "0.1"\n'], "VERSION = ", "0.2")
+        assert '✓ Updated script line 1:\nVERSION = "0.2"' in capsys.readouterr().out
+
+    def test_quiet(self, capsys):
+        configure_logging(quiet=True)
+        update_line(['VERSION = "0.1"\n'], "VERSION = ", "0.2")
+        logger.warning("Warning")
+        assert capsys.readouterr().out == "Warning\n"
+
+    def test_lazy_formatting(self):
+        """ Messages nobody will see shouldn't be formatted at all """
+        configure_logging(quiet=True)
+
+        class Unformattable:
+            def __str__(self):
+                raise AssertionError("Formatted unnecessarily")
+
+        logger.info("%s", Unformattable())
+
+    def test_json_lines(self, tmp_path, capsys):
+        filepath = tmp_path / "easypypi.jsonl"
+        configure_logging(quiet=True, json_filepath=filepath)
+        update_line(['NAME = ""\n'], "NAME = ", "x" * 500)
+        logger.warning("\n ⚠  Warning")
+        configure_logging()
+        records = [json.loads(x) for x in filepath.read_text().splitlines()]
+        assert [x["level"] for x in records] == ["INFO", "WARNING"]
+        assert records[0]["function"] == "update_line"
+        assert len(records[0]["message"].splitlines()[-1]) == 400
+        assert records[1]["message"] == "⚠  Warning"
+        assert capsys.readouterr().out == "\n ⚠  Warning\n"
@@ -0,0 +1,126 @@
+"""
+Stand-ins for running easyPyPI without a screen or a real keyring, e.g. in
+automated tests:
+
+Package.ui = ScriptedUI("my_package", "/parent/folder")
+keyring.set_keyring(MemoryKeyring())
+
+See conftest.py for pytest fixtures which also use a temporary config file.
+"""
+
+from keyring.backend import KeyringBackend
+from keyring.credentials import SimpleCredential
+from keyring.errors import PasswordDeleteError
+
+
+class ScriptedUI:
+    """
+    Replacement for the PySimpleGUI popup functions used by Package.
+
+    Each popup returns the next of the scripted responses in turn, and is
+    recorded in .calls as (popup function name, message).
+
+    .Window can also replace PySimpleGUI.Window, in which case each read()
+    of a window returns the next response as (event, values).
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+        self.windows = []
+
+    def Window(self, title, layout=None, **kwargs):
+        window = ScriptedWindow(self, title)
+        self.windows.append(window)
+        return window
+
+    def respond(self, name, message):
+        self.calls.append((name, message))
+        if not self.responses:
+            raise AssertionError(f"Unexpected {name}: {message}")
+        return self.responses.pop(0)
+
+    def popup(self, *messages, **kwargs):
+        return self.respond("popup", " ".join(str(x) for x in messages))
+
+    def popup_get_text(self, message, **kwargs):
+        return self.respond("popup_get_text", message)
+
+    def popup_get_folder(self, message, **kwargs):
+        return self.respond("popup_get_folder", message)
+
+    def popup_get_file(self, message, **kwargs):
+        return self.respond("popup_get_file", message)
+
+    def popup_yes_no(self, *messages, **kwargs):
+        return self.respond("popup_yes_no", " ".join(str(x) for x in messages))
+
+
+class ScriptedElement:
+    """ Element of a ScriptedWindow, recording values it's updated with """
+
+    def __init__(self):
+        self.values = {}
+
+    def update(self, **kwargs):
+        self.values.update(kwargs)
+
+    def set_value(self, value):
+        self.values["value"] = value
+
+
+class ScriptedWindow:
+    """
+    Replacement for a PySimpleGUI window, created by ScriptedUI.Window.
+    Elements are created when first looked up e.g. window["name"].
+    """
+
+    def __init__(self, ui, title):
+        self.ui = ui
+        self.title = title
+        self.elements = {}
+        self.hidden = False
+
+    def __getitem__(self, key):
+        return self.elements.setdefault(key, ScriptedElement())
+
+    def read(self):
+        return self.ui.respond("read", self.title)
+
+    def hide(self):
+        self.hidden = True
+
+    def un_hide(self):
+        self.hidden = False
+
+    def close(self):
+        self.hidden = True
+
+
+class MemoryKeyring(KeyringBackend):
+    """ keyring backend which only stores passwords in memory """
+
+    priority = 1
+
+    def __init__(self):
+        super().__init__()
+        self.passwords = {}
+
+    def get_password(self, service, username):
+        return self.passwords.get((service, username))
+
+    def set_password(self, service, username, password):
+        self.passwords[(service, username)] = password
+
+    def delete_password(self, service, username):
+        try:
+            del self.passwords[(service, username)]
+        except KeyError:
+            raise PasswordDeleteError(f"No password for {username} on {service}")
+
+    def get_credential(self, service, username):
+        """ If username is None, returns the first credential for service """
+        for (stored_service, stored_username), password in self.passwords.items():
+            if stored_service == service and username in [None, stored_username]:
+                return SimpleCredential(stored_username, password)
+        return None
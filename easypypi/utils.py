@@ -24,6 +24,36 @@ SETUP_FIELDS = {
     "VERSION": "version",
 }
 
+# Derived Package artifacts regenerated by save_user_input, in the order they
+# must be rebuilt.  Keys are Package method names; values are the fields (or
+# earlier artifacts) each one depends on.
+ARTIFACT_DEPENDENCIES = {
+    "update_license_names": ["classifiers"],
+    "create_license": [
+        "update_license_names",
+        "author",
+        "description",
+        "email",
+        "name",
+    ],
+    "update_script_lines": ["update_license_names", *SETUP_FIELDS.values()],
+}
+
+# Main window input boxes;  Keys are Package attribute names, values are prompts
+INPUT_PROMPTS = {
+    "name": "Package Name (all lowercase, underscores if needed):",
+    "version": "Latest Version number:",
+    "Github_username": "Your Github (or other repository) Username:",
+    "PyPI_username": "Your PyPI Username:",
+    "Test_PyPI_username": "Your Test PyPI Username:",
+    "url": "Link to the Package Repository:",
+    "description": "Description (with escape characters for \\ \" ' etc.):",
+    "author": "Full Name of the Author:",
+    "email": "E-mail Address for the Author:",
+    "keywords": "Keywords (separated by a comma):",
+    "requirements": "Any additional packages/modules required:",
+}
+
 # Main groups of Classifiers for setup.py;  Values are input prompts
 GROUP_CLASSIFIERS = {
     "Development Status": "Classifiers (Development Status):",
@@ -34,13 +64,18 @@ GROUP_CLASSIFIERS = {
     "License :: OSI Approved ::": "Classifiers (License):",
 }
 
+# Classifier groups with more choices than this are shown in a filterable
+# Listbox rather than one Checkbox/Radio widget per classifier:
+LISTBOX_THRESHOLD = 50
+
 # Common replacements used to create final LICENSE text
 REPLACEMENTS = [
     "{self.author}",
     "{self.description}",
     "{self.email}",
     "{self.name}",
-    "{self.Github_username}" "{datetime.datetime.now()}",
+    "{self.Github_username}",
+    "{datetime.datetime.now()}",
 ]
 
 # Global keyword arguments for PySimpleGUI popups:
@@ -0,0 +1,154 @@
+"""
+Checks package metadata against the rules PyPI applies on upload, so that
+problems like an invalid version or unknown classifier are found before
+building or uploading anything.
+
+Each check is cached per value, so revalidating unchanged metadata is
+practically free.
+"""
+
+from .classifiers import CLASSIFIER_LIST
+from functools import lru_cache
+from packaging.requirements import InvalidRequirement
+from packaging.requirements import Requirement
+from packaging.version import InvalidVersion
+from packaging.version import Version
+import re
+
+CLASSIFIER_INDEX = frozenset(CLASSIFIER_LIST)
+# Classifiers which are split apart by a comma separated string, so need rejoining:
+COMMA_CLASSIFIERS = [x for x in CLASSIFIER_LIST if "," in x]
+
+# PEP 508 names: letters, digits, and . _ - (but not at the start or end)
+NAME_PATTERN = re.compile(r"^([A-Z0-9]|[A-Z0-9][A-Z0-9._-]*[A-Z0-9])$", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"^[^@\s,]+@[^@\s,]+\.[^@\s,]+$")
+URL_PATTERN = re.compile(r"^https?://\S+$")
+
+# Maximum length of the one line "Summary" on PyPI:
+DESCRIPTION_MAX_LENGTH = 512
+
+
+def split_items(text):
+    """ Returns: stripped items from a comma separated string, including blanks """
+    if isinstance(text, list):
+        return [x.strip() for x in text]
+    return [x.strip() for x in text.split(",")]
+
+
+def split_classifiers(text):
+    """
+    Returns: stripped classifiers from a comma separated string, rejoining
+    known classifiers which contain a comma e.g. CeCILL-2.1
+    """
+    classifiers = []
+    for item in split_items(text):
+        if classifiers and classifiers[-1] not in CLASSIFIER_INDEX:
+            joined = f"{classifiers[-1]}, {item}"
+            if any(x.startswith(joined) for x in COMMA_CLASSIFIERS):
+                classifiers[-1] = joined
+                continue
+        classifiers.append(item)
+    return classifiers
+
+
+def check_name(value):
+    if not NAME_PATTERN.match(value):
+        yield (
+            f"'{value}' isn't a valid package name; use letters, digits, "
+            "and . _ - (not at the start or end)"
+        )
+
+
+def check_version(value):
+    try:
+        Version(value)
+    except InvalidVersion:
+        yield f"'{value}' isn't a valid PEP 440 version e.g. 0.1 or 1.0.0a1"
+
+
+def check_description(value):
+    if "\n" in value or "\r" in value:
+        yield "Description must be a single line"
+    if len(value) > DESCRIPTION_MAX_LENGTH:
+        yield f"Description is longer than {DESCRIPTION_MAX_LENGTH} characters"
+
+
+def check_email(value):
+    if not EMAIL_PATTERN.match(value):
+        yield f"'{value}' isn't a valid email address"
+
+
+def check_url(value):
+    if not URL_PATTERN.match(value):
+        yield f"'{value}' isn't a valid http(s) URL"
+
+
+def check_classifiers(value):
+    for classifier in split_classifiers(value):
+        if not classifier:
+            yield "Empty classifier (check for a trailing comma)"
+        elif classifier not in CLASSIFIER_INDEX:
+            yield f"Unknown classifier: {classifier}"
+
+
+def check_requirements(value):
+    for requirement in split_items(value):
+        if not requirement:
+            yield "Empty requirement (check for a trailing comma)"
+            continue
+        try:
+            Requirement(requirement)
+        except InvalidRequirement as error:
+            yield f"'{requirement}' isn't a valid PEP 508 requirement: {error}"
+
+
+# Package attribute names (see SETUP_FIELDS) and how to check their values:
+VALIDATORS = {
+    "name": check_name,
+    "version": check_version,
+    "description": check_description,
+    "email": check_email,
+    "url": check_url,
+    "classifiers": check_classifiers,
+    "requirements": check_requirements,
+}
+
+
+@lru_cache(maxsize=1024)
+def validate_field(attribute, value):
+    """ Returns: tuple of problems with value, or () if it's valid """
+    validator = VALIDATORS.get(attribute)
+    if not validator or not value:
+        return ()
+    return tuple(validator(value))
+
+
+def validate_metadata(values):
+    """
+    values : Package or dictionary with Package attribute names as keys
+
+    Returns: dictionary of {attribute: problems} for invalid values only
+    """
+    problems = {}
+    for attribute in VALIDATORS:
+        value = values.get(attribute)
+        if isinstance(value, list):
+            value = ", ".join(value)
+        elif value is not None:
+            value = str(value)
+        results = validate_field(attribute, value)
+        if results:
+            problems[attribute] = results
+    for attribute in ["name", "version"]:
+        if not values.get(attribute):
+            problems[attribute] = (f"No {attribute} has been entered",)
+    return problems
+
+
+def format_validation_report(problems):
+    """ Returns: problems from validate_metadata as text, one per line """
+    return "\n".join(
+        f"{attribute}: {problem}"
+        for attribute, results in problems.items()
+        for problem in results
+    )
@@ -0,0 +1,293 @@
+"""
+Isolated virtual environments for checking that a package installs, without
+touching the current Python interpreter.
+
+Environments and a "wheelhouse" of dependency wheels are cached, so after the
+first run installs are fast and don't need network access.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Saved in each pooled environment, listing packages installed when created:
+BASELINE_FILENAME = "easypypi_baseline.txt"
+
+# e.g. "3.9", used when a package's Classifiers don't list any Python versions:
+CURRENT_PYTHON = "{}.{}".format(*sys.version_info[:2])
+
+# Environments share one wheelhouse, so only one fills it at a time:
+WHEELHOUSE_LOCK = threading.Lock()
+
+
+def get_venv_python(venv_dirpath):
+    """ Returns: path to the Python executable in a virtual environment """
+    if os.name == "nt":
+        return Path(venv_dirpath) / "Scripts" / "python.exe"
+    return Path(venv_dirpath) / "bin" / "python"
+
+
+def create_venv(venv_dirpath, python=None):
+    """
+    Creates a virtual environment, unless it already exists.
+
+    python : interpreter to create the environment with (default: current one)
+
+    Returns: path to the Python executable in the virtual environment
+    """
+    venv_python = get_venv_python(venv_dirpath)
+    if not venv_python.is_file():
+        subprocess.run(
+            [str(python or sys.executable), "-m", "venv", str(venv_dirpath)],
+            check=True,
+            capture_output=True,
+        )
+    return venv_python
+
+
+def run_pip(venv_python, *args):
+    """ Returns: completed subprocess after running pip with args """
+    return subprocess.run(
+        [str(venv_python), "-m", "pip", "--disable-pip-version-check", *args],
+        capture_output=True,
+        text=True,
+    )
+
+
+def fill_wheelhouse(venv_python, requirements, wheelhouse_dirpath):
+    """
+    Downloads/builds wheels for requirements (and their dependencies) into
+    wheelhouse_dirpath, reusing any already there.  Requires network access.
+    setuptools and wheel are always included so sdists can be built offline.
+    Returns: True if successful
+    """
+    with WHEELHOUSE_LOCK:
+        result = run_pip(
+            venv_python,
+            "wheel",
+            "--wheel-dir",
+            str(wheelhouse_dirpath),
+            "--find-links",
+            str(wheelhouse_dirpath),
+            "setuptools",
+            "wheel",
+            *requirements,
+        )
+    return result.returncode == 0
+
+
+def install_from_local_index(
+    venv_python, name, version, index_dirpath, wheelhouse_dirpath, requirements=()
+):
+    """
+    Installs name==version from a local simple index into a virtual
+    environment, with dependencies from wheelhouse_dirpath.  If dependencies
+    are missing from the wheelhouse they're fetched once, then reused.
+    Any previous install of name is removed first (e.g. if rebuilt without
+    changing version) but dependencies already installed are kept.
+
+    Returns: (True if installed successfully, seconds taken, pip output)
+    """
+    Path(wheelhouse_dirpath).mkdir(parents=True, exist_ok=True)
+    args = [
+        "install",
+        "--index-url",
+        Path(index_dirpath).resolve().as_uri(),
+        "--find-links",
+        str(wheelhouse_dirpath),
+        f"{name}=={version}",
+    ]
+    start = time.perf_counter()
+    run_pip(venv_python, "uninstall", "--yes", name)
+    result = run_pip(venv_python, *args)
+    if result.returncode and fill_wheelhouse(
+        venv_python, list(requirements), wheelhouse_dirpath
+    ):
+        # Retry now the wheelhouse is warm:
+        result = run_pip(venv_python, *args)
+    seconds = time.perf_counter() - start
+    return result.returncode == 0, seconds, result.stdout + result.stderr
+
+
+def get_target_pythons(classifiers):
+    """
+    Returns: Python versions (e.g. ["3.8", "3.9"]) from a comma separated
+    string of Classifiers such as "Programming Language :: Python :: 3.8"
+    """
+    prefix = "Programming Language :: Python :: "
+    versions = []
+    for classifier in classifiers.split(", "):
+        if not classifier.startswith(prefix):
+            continue
+        version = classifier[len(prefix) :]
+        if version.count(".") == 1 and version.replace(".", "").isdigit():
+            versions.append(version)
+    return versions
+
+
+def find_python(version):
+    """ Returns: path to a Python interpreter for version, or None if not found """
+    if version == CURRENT_PYTHON:
+        return sys.executable
+    if os.name == "nt":
+        command = ["py", f"-{version}"]
+    else:
+        command = [shutil.which(f"python{version}")]
+        if not command[0]:
+            return None
+    # Check it actually runs e.g. pyenv shims exist for uninstalled versions:
+    result = subprocess.run(
+        command + ["-c", "import sys; print(sys.executable)"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def get_installed(venv_python):
+    """ Returns: set of installed "package==version" lines """
+    result = run_pip(venv_python, "freeze", "--all")
+    return set(result.stdout.splitlines())
+
+
+def create_pool_venv(venv_dirpath, python, wheelhouse_dirpath):
+    """
+    Creates (or reuses) a virtual environment with pytest installed, and
+    records what's installed so reset_venv can restore it later.
+    Returns: path to the Python executable in the virtual environment
+    """
+    venv_python = create_venv(venv_dirpath, python)
+    baseline = Path(venv_dirpath) / BASELINE_FILENAME
+    if not baseline.is_file():
+        Path(wheelhouse_dirpath).mkdir(parents=True, exist_ok=True)
+        args = ["install", "--find-links", str(wheelhouse_dirpath), "pytest"]
+        if run_pip(venv_python, *args).returncode:
+            raise RuntimeError(f"Unable to install pytest in {venv_dirpath}")
+        baseline.write_text("\n".join(sorted(get_installed(venv_python))))
+    return venv_python
+
+
+def get_venv_pool(pool_dirpath, versions, wheelhouse_dirpath):
+    """
+    Creates (or reuses) one virtual environment per Python version, in
+    parallel.  Versions without a matching interpreter, or whose environment
+    can't be created, are skipped.
+
+    Returns: ({version: path to Python executable}, {version: error message})
+    """
+    pythons = {x: find_python(x) for x in versions}
+    errors = {k: "Python not found" for k, v in pythons.items() if not v}
+    pythons = {k: v for k, v in pythons.items() if v}
+    with ThreadPoolExecutor(max(len(pythons), 1)) as executor:
+        futures = {
+            version: executor.submit(
+                create_pool_venv,
+                Path(pool_dirpath) / f"python{version}",
+                python,
+                wheelhouse_dirpath,
+            )
+            for version, python in pythons.items()
+        }
+    pool = {}
+    for version, future in futures.items():
+        try:
+            pool[version] = future.result()
+        except subprocess.CalledProcessError as error:
+            stderr = error.stderr or b""
+            if isinstance(stderr, bytes):
+                stderr = stderr.decode(errors="replace")
+            errors[version] = f"Unable to create virtual environment: {stderr}"
+        except RuntimeError as error:
+            errors[version] = str(error)
+    return pool, errors
+
+
+def get_venv_python_dirpath(venv_python):
+    """ Returns: root folder of the virtual environment for venv_python """
+    return Path(venv_python).parent.parent
+
+
+def reset_venv(venv_python):
+    """
+    Returns a pooled virtual environment to its original state by removing
+    anything installed since it was created, which is much quicker than
+    creating a new one.
+    """
+    baseline = get_venv_python_dirpath(venv_python) / BASELINE_FILENAME
+    original = set(baseline.read_text().splitlines())
+    extras = get_installed(venv_python) - original
+    if extras:
+        names = [x.split("==")[0].split(" @ ")[0] for x in extras]
+        run_pip(venv_python, "uninstall", "--yes", *names)
+    missing = original - get_installed(venv_python)
+    if missing:
+        run_pip(venv_python, "install", "--no-deps", *missing)
+
+
+def verify_artifact(venv_python, artifact, name, wheelhouse_dirpath, requirements=()):
+    """
+    Resets a pooled virtual environment, installs a .tar.gz or .whl file
+    into it, then runs the package's test_{name}.py with pytest.
+
+    Returns: dictionary of {"installed", "tests_passed", "seconds", "output"}
+    """
+    start = time.perf_counter()
+    reset_venv(venv_python)
+    args = ["install", "--find-links", str(wheelhouse_dirpath), str(artifact)]
+    result = run_pip(venv_python, *args)
+    if result.returncode and fill_wheelhouse(
+        venv_python, list(requirements), wheelhouse_dirpath
+    ):
+        result = run_pip(venv_python, *args)
+    outcome = {
+        "installed": result.returncode == 0,
+        "tests_passed": False,
+        "output": result.stdout + result.stderr,
+    }
+    if outcome["installed"]:
+        # Run from an empty folder so the installed package is tested, not
+        # the source folder:
+        with tempfile.TemporaryDirectory() as dirpath:
+            result = subprocess.run(
+                [
+                    str(venv_python),
+                    "-m",
+                    "pytest",
+                    "--pyargs",
+                    f"{name}.test_{name}",
+                    "-q",
+                ],
+                capture_output=True,
+                text=True,
+                cwd=dirpath,
+            )
+        outcome["tests_passed"] = result.returncode == 0
+        outcome["output"] += result.stdout + result.stderr
+    outcome["seconds"] = time.perf_counter() - start
+    return outcome
+
+
+def verify_artifact_in_pool(pool, artifact, name, wheelhouse_dirpath, requirements=()):
+    """
+    Runs verify_artifact in every environment in the pool, in parallel.
+    Returns: dictionary of {version: verify_artifact results}
+    """
+    with ThreadPoolExecutor(max(len(pool), 1)) as executor:
+        futures = {
+            version: executor.submit(
+                verify_artifact,
+                venv_python,
+                artifact,
+                name,
+                wheelhouse_dirpath,
+                requirements,
+            )
+            for version, venv_python in pool.items()
+        }
+    return {version: future.result() for version, future in futures.items()}
@@ -0,0 +1,138 @@
+"""
+Version bumping for one or many packages, using pep440_version_utils.
+
+A release plan is calculated for all packages first, so that problems such as
+a version already published on a local index are found before any file is
+rewritten.
+"""
+
+from .local_index import get_index_versions
+from .logger import logger
+from .pyproject import PYPROJECT_FILENAME
+from .pyproject import read_pyproject_fields
+from .pyproject import set_pyproject_version
+from .shared_functions import create_file
+from .shared_functions import read_setup_fields
+from .shared_functions import update_line
+from packaging.version import InvalidVersion
+from pathlib import Path
+from pep440_version_utils import Version
+import json
+
+# Options for the "1) Upversion" ButtonMenu, and bump_version steps:
+VERSION_STEPS = [
+    "Next Alpha",
+    "Next Beta",
+    "Next Release Candidate",
+    "Next Micro",
+    "Next Minor",
+    "Next Major",
+]
+
+
+def bump_version(version, step):
+    """
+    Returns: next version string for step e.g. "Next Alpha", "micro", "release_candidate"
+    """
+    step = step.replace("Next ", "").lower().replace(" ", "_")
+    next_version = getattr(Version, f"next_{step}")
+    return str(next_version(Version(str(version))))
+
+
+def read_metadata_fields(filepath):
+    """
+    Reads metadata from setup.py, pyproject.toml, or an easyPyPI JSON config file.
+    Returns: dictionary with Package attribute names as keys
+    """
+    filepath = Path(filepath)
+    if filepath.suffix == ".json":
+        with open(filepath, "r") as file:
+            return json.load(file)
+    if filepath.name == PYPROJECT_FILENAME:
+        return read_pyproject_fields(filepath)
+    with open(filepath, "r") as file:
+        return read_setup_fields(file.readlines())
+
+
+def read_name_and_version(filepath):
+    """
+    Reads name and version from setup.py, pyproject.toml, or from an easyPyPI
+    JSON config file.
+    Returns: name, version
+    """
+    values = read_metadata_fields(filepath)
+    return values.get("name"), values.get("version")
+
+
+def plan_releases(filepaths, step, index_dirpath=None):
+    """
+    Calculates next versions for several packages in one pass.
+
+    filepaths : setup.py or config.json files to read current versions from
+    step : e.g. "Next Micro" (see VERSION_STEPS)
+    index_dirpath : local package index to check for versions already published
+
+    Returns: list of dictionaries, one per package:
+    {"filepath", "name", "current", "next", "collision", "error"} where next
+    is None and error explains why if a package has no valid version
+    """
+    plan = []
+    for filepath in filepaths:
+        name, current = read_name_and_version(filepath)
+        next_version = error = None
+        if not current:
+            error = "No version found"
+        else:
+            try:
+                next_version = bump_version(current, step)
+            except InvalidVersion:
+                error = f"Invalid version: {current}"
+        published = get_index_versions(index_dirpath, name) if index_dirpath else set()
+        plan.append(
+            {
+                "filepath": Path(filepath),
+                "name": name,
+                "current": current,
+                "next": next_version,
+                "collision": next_version in published,
+                "error": error,
+            }
+        )
+    return plan
+
+
+def apply_release_plan(plan):
+    """
+    Writes new versions for all packages in a release plan, but only if none
+    of them collide with a version already published or can't be planned.
+
+    Returns: True if files were updated, False otherwise
+    """
+    errors = [f"{x['filepath']}: {x['error']}" for x in plan if x["error"]]
+    if errors:
+        logger.warning("\n ⚠  Unable to plan releases for:\n  %s", "\n  ".join(errors))
+        return False
+    collisions = [f"{x['name']} {x['next']}" for x in plan if x["collision"]]
+    if collisions:
+        logger.warning("\n ⚠  Versions already published:\n  %s", ", ".join(collisions))
+        return False
+    updates = {}
+    for release in plan:
+        filepath = release["filepath"]
+        if filepath.suffix == ".json":
+            with open(filepath, "r") as file:
+                values = json.load(file)
+            values["version"] = release["next"]
+            updates[filepath] = json.dumps(values, indent=4)
+        elif filepath.name == PYPROJECT_FILENAME:
+            with open(filepath, "r") as file:
+                text = file.read()
+            updates[filepath] = set_pyproject_version(text, release["next"])
+        else:
+            with open(filepath, "r") as file:
+                lines = file.readlines()
+            updates[filepath] = update_line(lines, "VERSION = ", release["next"])
+    # Everything has been read and updated in memory, so now write in one go:
+    for filepath, content in updates.items():
+        create_file(filepath, content, overwrite=True)
+    return True
@@ -0,0 +1,236 @@
+"""
+File watching for Package.watch, using inotify on Linux (via ctypes, so no
+extra dependencies) with a polling fallback everywhere else.
+
+Watchers are given a list of (folder, recursive) pairs and their .read method
+returns the set of paths changed since the last read.  wait_for_changes
+collects bursts of changes (e.g. an editor saving several files) into one
+batch, and classify_changes sorts them by which pipeline stages they affect.
+"""
+
+from .logger import logger
+from .shared_functions import get_file_hash
+from pathlib import Path
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# Seconds without further changes before a batch of changes is processed:
+DEBOUNCE_SECONDS = 0.5
+POLL_SECONDS = 1.0
+
+# Folders created by building/installing which shouldn't trigger anything:
+IGNORE_DIRNAMES = ["build", "dist", "venv", "__pycache__"]
+
+# inotify event masks (see "man inotify"):
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (then name)
+
+
+def is_ignored(name):
+    """ Returns: True for hidden files/folders, temporary files, and build output """
+    return (
+        name.startswith(".")
+        or name in IGNORE_DIRNAMES
+        or name.endswith((".egg-info", ".tmp", "~"))
+    )
+
+
+class PollingWatcher:
+    """ Detects changes by comparing file sizes and modification times """
+
+    def __init__(self, watches, interval=POLL_SECONDS):
+        self.watches = [(Path(x), recursive) for x, recursive in watches]
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        """ Returns: {filepath: (modification time, size)} for watched files """
+        snapshot = {}
+        for root, recursive in self.watches:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [x for x in dirnames if recursive and not is_ignored(x)]
+                for filename in filenames:
+                    if is_ignored(filename):
+                        continue
+                    filepath = Path(dirpath) / filename
+                    try:
+                        stat = filepath.stat()
+                    except FileNotFoundError:
+                        continue
+                    snapshot[filepath] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read(self, timeout=None):
+        """
+        Waits up to timeout seconds (or forever if None) for changes.
+        Returns: set of changed, created or deleted Paths
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changes = {
+                x
+                for x in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(x) != self.snapshot.get(x)
+            }
+            self.snapshot = snapshot
+            if changes:
+                return changes
+            if deadline is None:
+                time.sleep(self.interval)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """ Linux only;  Events are delivered by the kernel rather than polled """
+
+    def __init__(self, watches):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self.roots = []
+        self.dirpaths = {}  # {watch descriptor: (folder, recursive)}
+        for dirpath, recursive in watches:
+            self.roots.append(Path(dirpath))
+            self.add_watch(Path(dirpath), recursive)
+
+    def add_watch(self, dirpath, recursive):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), INOTIFY_MASK)
+        if wd < 0:
+            logger.debug("Unable to watch %s", dirpath)
+            return
+        self.dirpaths[wd] = (dirpath, recursive)
+        if not recursive:
+            return
+        for path in dirpath.iterdir():
+            if path.is_dir() and not is_ignored(path.name):
+                self.add_watch(path, recursive)
+
+    def read(self, timeout=None):
+        """
+        Waits up to timeout seconds (or forever if None) for changes.
+        Returns: set of changed, created or deleted Paths
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = b""
+        while True:
+            try:
+                data += os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changes.update(self.roots)  # Events lost, so assume everything
+                continue
+            if wd not in self.dirpaths or is_ignored(name):
+                continue
+            dirpath, recursive = self.dirpaths[wd]
+            path = dirpath / name
+            if mask & IN_ISDIR:
+                if recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_watch(path, recursive)
+                continue
+            changes.add(path)
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+def get_watcher(watches, polling=False):
+    """
+    Returns: InotifyWatcher if available (i.e. on Linux) and polling is False,
+    otherwise PollingWatcher
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(watches)
+        except (OSError, AttributeError, TypeError) as error:
+            logger.info("\n ⓘ  inotify unavailable (%s); polling instead.", error)
+    return PollingWatcher(watches)
+
+
+def wait_for_changes(watcher, debounce=DEBOUNCE_SECONDS, timeout=None):
+    """
+    Waits for changes, then keeps collecting them until there have been none
+    for debounce seconds.
+
+    timeout : seconds to wait for the first change (None = wait forever)
+
+    Returns: set of changed Paths, or an empty set if timeout is reached
+    """
+    changes = watcher.read(timeout)
+    while changes:
+        more = watcher.read(debounce)
+        if not more:
+            break
+        changes |= more
+    return changes
+
+
+def record_writes(written, filepaths):
+    """ Remembers file hashes, so is_own_write can ignore our own changes """
+    for filepath in filepaths:
+        written[Path(filepath)] = get_file_hash(filepath)
+
+
+def is_own_write(filepath, written):
+    """ Returns: True if filepath is unchanged since recorded in written """
+    filepath = Path(filepath)
+    try:
+        return filepath in written and get_file_hash(filepath) == written[filepath]
+    except FileNotFoundError:
+        return False
+
+
+def classify_changes(changes, setup_dirpath, metadata_filepaths, template_filepaths):
+    """
+    Sorts changed paths by the pipeline stages they affect:
+
+    metadata : config.json, setup.py or pyproject.toml -> metadata file & LICENSE
+    templates : easyPyPI templates -> files created from them
+    sources : anything else in the package -> .tar.gz
+
+    Returns: {"metadata": [...], "templates": [...], "sources": [...]}
+    """
+    groups = {"metadata": [], "templates": [], "sources": []}
+    setup_dirpath = Path(setup_dirpath)
+    for path in sorted(changes):
+        if path in metadata_filepaths:
+            groups["metadata"].append(path)
+        elif path in template_filepaths:
+            groups["templates"].append(path)
+        elif path == setup_dirpath or setup_dirpath in path.parents:
+            parts = path.relative_to(setup_dirpath).parts
+            if not any(is_ignored(x) for x in parts):
+                groups["sources"].append(path)
+    return groups
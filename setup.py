@@ -16,7 +16,7 @@ EMAIL = "peter@southwestlondon.tv"
 URL = "https://github.com/Pfython/easypypi"
 KEYWORDS = "easypypi, Peter Fison, Pfython, pip, package, publish, share, build, deploy, Python"
 CLASSIFIERS = "Development Status :: 5 - Production/Stable, Intended Audience :: Developers, Operating System :: OS Independent, Programming Language :: Python :: 3.6, Programming Language :: Python :: 3.7, Programming Language :: Python :: 3.8, Programming Language :: Python :: 3.9, Topic :: Documentation, Topic :: Software Development, Topic :: Software Development :: Build Tools, Topic :: Software Development :: Documentation, Topic :: Software Development :: Libraries :: Python Modules, Topic :: Software Development :: Version Control, Topic :: Software Development :: Version Control :: Git, Topic :: System :: Archiving :: Packaging, Topic :: System :: Installation/Setup, Topic :: System :: Software Distribution, Topic :: Utilities, License :: OSI Approved :: MIT License"
-REQUIREMENTS = "cleverdict, pysimplegui, click, twine, keyring, mechanicalsoup, pep440_version_utils"
+REQUIREMENTS = "cleverdict, pysimplegui, click, twine, keyring, mechanicalsoup, packaging, pep440_version_utils, tomli; python_version < '3.11'"
 
 
 def comma_split(text: str):